@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Benchmark ``raster_tiler.py`` on synthetic rasters.
+
+A synthetic raster of configurable size, data type, band count and block
+layout is written straight to a GeoTIFF (tiled or striped) one row of blocks
+at a time, so setup memory stays bounded however large the raster. The tiler is then run over every combination of the requested
+options (workers, compression, aligned vs. unaligned grid, copied vs.
+virtual tiles), each case in a fresh process so peak memory is measured in
+isolation. Wall time, MB/s, tile count and peak RSS go into a JSON report
+that can be compared between machines, GDAL versions and branches.
+
+Example:
+    python benchmarks/bench_raster_tiler.py --width 8192 --height 8192 \\
+        --dtype UInt16 --block 256 --workers 1,4 --compress LZW,DEFLATE \\
+        --output bench_tiler.json
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from osgeo import gdal  # noqa: E402
+
+import raster_tiler  # noqa: E402
+
+# array typecodes for the supported GDAL data types
+TYPECODES = {"Byte": "B", "UInt16": "H", "Int16": "h", "Float32": "f"}
+# Distinct rows generated per band; the raster cycles through them
+PATTERN_ROWS = 61
+
+
+@dataclass(frozen=True)
+class RasterSpec:
+    """Shape and layout of a synthetic raster."""
+
+    width: int
+    height: int
+    bands: int = 1
+    dtype: str = "Byte"
+    block: Optional[int] = 256  # None writes a striped GeoTIFF
+
+    @property
+    def layout(self) -> str:
+        return f"tiled {self.block}x{self.block}" if self.block else "striped"
+
+    @property
+    def source_bytes(self) -> int:
+        return (self.width * self.height * self.bands
+                * gdal.GetDataTypeSize(gdal.GetDataTypeByName(self.dtype)) // 8)
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    """One combination of tiler options."""
+
+    workers: int
+    compress: str
+    align: bool
+    virtual: bool
+
+
+def _pattern_row(spec: RasterSpec, band: int, row: int) -> array:
+    """A smooth gradient with pseudo-random noise, so compression is realistic."""
+    typecode = TYPECODES[spec.dtype]
+    seed = (row * 7919 + band * 104729) & 0xFFFF
+    values = []
+    for x in range(spec.width):
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        values.append(((x + row * 3) // 4 + band * 17 + (seed >> 16) % 8) % 251)
+    return array(typecode, values)
+
+
+def make_synthetic_raster(path: str, spec: RasterSpec) -> str:
+    """Write ``spec`` as a GeoTIFF at ``path``, one row of blocks at a time.
+
+    Only one swath (a row of blocks, or 256 rows when striped) is held in
+    memory, so rasters larger than RAM can be generated.
+    """
+    if spec.dtype not in TYPECODES:
+        raise ValueError(f"Unsupported dtype {spec.dtype}; use one of {sorted(TYPECODES)}")
+    options = ["COMPRESS=NONE"]
+    if spec.block:
+        options += ["TILED=YES", f"BLOCKXSIZE={spec.block}",
+                    f"BLOCKYSIZE={spec.block}"]
+    if spec.source_bytes >= 4 * 1024 ** 3:
+        options.append("BIGTIFF=YES")
+    out = gdal.GetDriverByName("GTiff").Create(
+        path, spec.width, spec.height, spec.bands,
+        gdal.GetDataTypeByName(spec.dtype), options=options,
+    )
+    if out is None:
+        raise RuntimeError(f"Failed to create {path}")
+    out.SetGeoTransform((500000.0, 1.0, 0.0, 7000000.0, 0.0, -1.0))
+    rows = {b: [_pattern_row(spec, b, r).tobytes() for r in range(PATTERN_ROWS)]
+            for b in range(1, spec.bands + 1)}
+    # All bands of a swath are written together so pixel-interleaved blocks
+    # are completed once instead of being re-read for every band
+    swath_rows = spec.block or 256
+    for y in range(0, spec.height, swath_rows):
+        n = min(swath_rows, spec.height - y)
+        for b in range(1, spec.bands + 1):
+            data = b"".join(rows[b][(y + i) % PATTERN_ROWS] for i in range(n))
+            out.GetRasterBand(b).WriteRaster(0, y, spec.width, n, data)
+        out.FlushCache()
+    out = None
+    return path
+
+
+def _run_case(input_path: str, case: BenchCase, max_size_mb: float) -> Dict:
+    """Run one tiling job; executed in a fresh process per case."""
+    output_dir = tempfile.mkdtemp(prefix="bench_tiles_")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            report = raster_tiler.tile_raster(
+                input_path, output_dir, max_size_mb=max_size_mb,
+                compress=case.compress, workers=case.workers,
+                align_to_blocks=case.align, virtual=case.virtual,
+            )
+            wall = time.perf_counter() - start
+        peaks = list(report.worker_peak_rss.values())
+        own = raster_tiler._peak_rss()
+        if own is not None:
+            peaks.append(own)
+        return {
+            "wall_s": round(wall, 4),
+            "mb_per_s": round(report.source_bytes / (1024 * 1024) / wall, 2),
+            "tiles": report.tiles,
+            "bytes_written": report.bytes_written,
+            "peak_rss_mb": round(max(peaks) / (1024 * 1024), 1) if peaks else None,
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_benchmark(spec: RasterSpec, cases: Sequence[BenchCase],
+                  max_size_mb: float = 50.0, repeat: int = 1,
+                  work_dir: Optional[str] = None) -> Dict:
+    """Generate the raster once and run every case ``repeat`` times.
+
+    The fastest repetition of each case is reported.
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="bench_tiler_")
+    source = os.path.join(work_dir, "synthetic.tif")
+    start = time.perf_counter()
+    make_synthetic_raster(source, spec)
+    generated_in = time.perf_counter() - start
+
+    context = multiprocessing.get_context("spawn")
+    results: List[Dict] = []
+    try:
+        for case in cases:
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    runs.append(pool.submit(_run_case, source, case, max_size_mb).result())
+            best = min(runs, key=lambda r: r["wall_s"])
+            results.append({**asdict(case), **best})
+            print(f"{case}: {best['wall_s']:.2f}s, {best['mb_per_s']:.1f} MB/s, "
+                  f"{best['tiles']} tiles, peak {best['peak_rss_mb']} MB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "environment": {
+            "gdal": gdal.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "raster": {**asdict(spec), "layout": spec.layout,
+                   "source_mb": round(spec.source_bytes / (1024 * 1024), 1),
+                   "generated_in_s": round(generated_in, 2)},
+        "max_size_mb": max_size_mb,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def build_cases(workers: Sequence[int], compress: Sequence[str],
+                align: Sequence[bool], virtual: Sequence[bool]) -> List[BenchCase]:
+    """Every combination of the options; compression is irrelevant to VRT tiles."""
+    cases = []
+    for w, c, a, v in itertools.product(workers, compress, align, virtual):
+        if v and c != compress[0]:
+            continue
+        cases.append(BenchCase(w, c, a, v))
+    return cases
+
+
+def _csv(kind):
+    return lambda text: [kind(item) for item in text.split(",") if item]
+
+
+def _bools(text: str) -> List[bool]:
+    return [item.strip().lower() in ("1", "yes", "true", "on") for item in text.split(",")]
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark raster_tiler.py")
+    parser.add_argument("--width", type=int, default=4096)
+    parser.add_argument("--height", type=int, default=4096)
+    parser.add_argument("--bands", type=int, default=1)
+    parser.add_argument("--dtype", choices=sorted(TYPECODES), default="Byte")
+    parser.add_argument("--block", default="256",
+                        help='Block size of the tiled source, or "strip" (default: 256)')
+    parser.add_argument("--max-size", type=float, default=8.0,
+                        help="Tile size limit in MB (default: 8)")
+    parser.add_argument("--workers", type=_csv(int), default=[1, 4],
+                        help="Comma-separated worker counts (default: 1,4)")
+    parser.add_argument("--compress", type=_csv(str), default=["LZW", "DEFLATE"],
+                        help="Comma-separated codecs (default: LZW,DEFLATE)")
+    parser.add_argument("--align", type=_bools, default=[True, False],
+                        help="Aligned grid values to test (default: true,false)")
+    parser.add_argument("--virtual", type=_bools, default=[False, True],
+                        help="Virtual tile values to test (default: false,true)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Repetitions per case; the fastest is kept")
+    parser.add_argument("--output", default="bench_raster_tiler.json",
+                        help="JSON report path")
+    args = parser.parse_args(argv)
+
+    block = None if args.block == "strip" else int(args.block)
+    spec = RasterSpec(args.width, args.height, args.bands, args.dtype, block)
+    cases = build_cases(args.workers, args.compress, args.align, args.virtual)
+    report = run_benchmark(spec, cases, max_size_mb=args.max_size,
+                           repeat=args.repeat)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
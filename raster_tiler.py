@@ -2,21 +2,760 @@
 """Split a raster into smaller tiles with approximate size limit.
 
 This script uses GDAL to cut an input raster into a grid of tiles so that
-no tile exceeds roughly ``max_size_mb``. The script estimates tile size
-based purely on pixel count and data type; compression or metadata can
-cause small deviations from the target size.
+no tile exceeds roughly ``max_size_mb``. By default the script estimates
+tile size purely on pixel count and data type, so compressed tiles come out
+well below the target. With ``--estimate-compression`` a few sample windows
+are compressed in memory (``/vsimem/``) to measure the real compression
+ratio, tiles are sized from it, and the estimate is compared with the
+actual tile sizes after the run.
+
+By default the tile grid is snapped to multiples of the source's internal
+block size (``--no-align`` disables this), so each block is decoded by a
+single tile instead of being re-read by its neighbours. The expected read
+amplification of the grid is reported before tiling starts.
+
+With ``--virtual`` no pixel data is copied: each tile is a small VRT that
+references its window of the source raster, and ``tiles_index.json`` lists
+the ``srcWin`` of every tile. GDAL-based tools (including raster2pgsql and
+the GeoIFSC uploader) read those VRTs directly from the source.
+
+``--profile cog`` writes Cloud-Optimized GeoTIFFs instead of plain
+GeoTIFFs: internally tiled, with internal overviews, a predictor suited to
+the data type and multithreaded compression. On GDAL builds without the COG
+driver an equivalent tiled GeoTIFF with internal overviews is written.
+
+``--skip-empty`` leaves out windows whose pixels are all nodata (typical at
+the edges of rotated or irregular mosaics), checked through the driver's
+sparse-block information when available or a NumPy read of the window;
+``--skip-constant`` also drops single-valued windows. Skipped windows are
+listed in ``skipped_tiles.json``.
+
+Every finished tile is recorded in ``manifest.jsonl`` (window, file name,
+size and SHA-256). Tiles are written under a ``.part`` name and renamed when
+complete, so ``--resume`` can rerun an interrupted job and write only the
+tiles that are missing or do not match the manifest.
+
+``--memory-budget`` caps the memory of the whole run: each worker gets an
+equal share, split between GDAL's block cache and its copy buffer, and the
+peak RSS of every worker is reported at the end.
+
+``iter_tiles`` exposes the same grid as a generator of tiles encoded in
+memory, either as PostGIS raster WKB or as GeoTIFF images built in
+``/vsimem/``, so a raster can be split and loaded into PostGIS in a single
+pass without intermediate files.
+
+Tiles can be written by a pool of worker processes (``--workers``); each
+worker opens its own handle to the source dataset. Output names depend only
+on the tile grid, so the result is identical for any number of workers.
 
 Example:
-    python raster_tiler.py input.tif output_folder --max-size 50
+    python raster_tiler.py input.tif output_folder --max-size 50 --workers 4
 """
 
 import os
+import hashlib
+import json
 import math
+import struct
+import sys
+import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
 from osgeo import gdal
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+INDEX_FILE = "tiles_index.json"
+SKIPPED_FILE = "skipped_tiles.json"
+MANIFEST_FILE = "manifest.jsonl"
+# Tiles are written under this suffix and renamed once complete
+PARTIAL_SUFFIX = ".part"
+# Smallest copy buffer worth giving a worker under --memory-budget
+MIN_SWATH_BYTES = 1024 * 1024
+# Safety factor applied to the sampled compression ratio
+COMPRESSION_MARGIN = 1.15
+
+PROFILES = ("gtiff", "cog")
+COG_BLOCK_SIZE = 512
+# Codecs for which a horizontal/floating-point predictor helps
+PREDICTOR_CODECS = {"LZW", "DEFLATE", "ZSTD", "LZMA"}
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """GDAL driver and creation options used to write tiles."""
+
+    driver: str
+    creation_options: Tuple[str, ...]
+    build_overviews: bool = False
+
+
+def output_profile(profile: str, compress: str, data_type: int,
+                   threads: int = 1) -> OutputProfile:
+    """Build the output profile for ``profile`` ("gtiff" or "cog")."""
+    compress = compress.upper()
+    if profile == "gtiff":
+        return OutputProfile("GTiff", (f"COMPRESS={compress}",))
+    if profile != "cog":
+        raise ValueError(f"Unknown profile: {profile}")
+
+    use_predictor = compress in PREDICTOR_CODECS
+    num_threads = f"NUM_THREADS={max(1, threads)}"
+    if gdal.GetDriverByName("COG") is not None:
+        options = [f"COMPRESS={compress}", f"BLOCKSIZE={COG_BLOCK_SIZE}",
+                   "OVERVIEWS=AUTO", num_threads]
+        if use_predictor:
+            options.append("PREDICTOR=YES")
+        return OutputProfile("COG", tuple(options))
+
+    # Older GDAL: tiled GeoTIFF, overviews built into the file after writing
+    is_float = gdal.GetDataTypeName(data_type).startswith(("Float", "CFloat"))
+    options = [f"COMPRESS={compress}", "TILED=YES",
+               f"BLOCKXSIZE={COG_BLOCK_SIZE}", f"BLOCKYSIZE={COG_BLOCK_SIZE}",
+               num_threads]
+    if use_predictor:
+        options.append(f"PREDICTOR={3 if is_float else 2}")
+    return OutputProfile("GTiff", tuple(options), build_overviews=True)
+
+
+def overview_levels(width: int, height: int,
+                    block_size: int = COG_BLOCK_SIZE) -> List[int]:
+    """Power-of-two overview factors until the overview fits in one block."""
+    levels = []
+    factor = 2
+    while max(width, height) / (factor // 2) > block_size:
+        levels.append(factor)
+        factor *= 2
+    return levels
+
+
+@dataclass(frozen=True)
+class TileWindow:
+    """Pixel window of the source raster that becomes one tile."""
+
+    row: int
+    col: int
+    x_off: int
+    y_off: int
+    width: int
+    height: int
+
+    @property
+    def name(self) -> str:
+        return self.filename(".tif")
+
+    def filename(self, extension: str) -> str:
+        return f"tile_{self.row:03d}_{self.col:03d}{extension}"
+
+    @property
+    def src_win(self) -> List[int]:
+        return [self.x_off, self.y_off, self.width, self.height]
+
+
+@dataclass
+class TilingReport:
+    """Aggregate statistics of a tiling run."""
+
+    tiles: int
+    bytes_written: int
+    source_bytes: int
+    elapsed: float
+    workers: int
+    max_tile_bytes: int = 0
+    target_tile_bytes: int = 0
+    estimated_ratio: Optional[float] = None
+    # Uncompressed size of the windows actually written as tiles
+    tile_source_bytes: int = 0
+    skipped: int = 0
+    resumed: int = 0
+    memory: Optional["MemoryPlan"] = None
+    # Peak resident set size (bytes) of each worker process, by pid
+    worker_peak_rss: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def actual_ratio(self) -> float:
+        """Bytes written per uncompressed byte of the windows written.
+
+        Skipped windows are left out so the ratio compares with the estimate.
+        """
+        return self.bytes_written / self.tile_source_bytes if self.tile_source_bytes else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        """Source data processed per second, in MB."""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.source_bytes / (1024 * 1024) / self.elapsed
+
+    @property
+    def tiles_per_s(self) -> float:
+        return self.tiles / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        notes = []
+        if self.skipped:
+            notes.append(f"{self.skipped} empty skipped")
+        if self.resumed:
+            notes.append(f"{self.resumed} resumed")
+        detail = f" ({', '.join(notes)})" if notes else ""
+        return (
+            f"{self.tiles} tiles{detail}, "
+            f"{self.bytes_written / (1024 * 1024):.1f} MB written "
+            f"in {self.elapsed:.2f}s with {self.workers} worker(s): "
+            f"{self.mb_per_s:.1f} MB/s, {self.tiles_per_s:.1f} tiles/s"
+        )
+
+    def estimate_summary(self) -> str:
+        """Compare the compression estimate with the sizes actually written."""
+        mb = 1024 * 1024
+        predicted = (f"{self.estimated_ratio:.3f}" if self.estimated_ratio is not None
+                     else "1.000 (uncompressed)")
+        return (
+            f"Compression ratio predicted {predicted}, actual {self.actual_ratio:.3f}; "
+            f"largest tile {self.max_tile_bytes / mb:.1f} MB of "
+            f"{self.target_tile_bytes / mb:.1f} MB target"
+        )
+
+    def memory_summary(self) -> str:
+        """Peak RSS of each worker, next to its budget when one was set."""
+        mb = 1024 * 1024
+        if not self.worker_peak_rss:
+            return "Peak RSS per worker: not available on this platform"
+        peaks = ", ".join(f"{rss / mb:.0f} MB"
+                          for _, rss in sorted(self.worker_peak_rss.items()))
+        budget = (f" (budget {self.memory.per_worker_bytes / mb:.0f} MB each)"
+                  if self.memory is not None else "")
+        return f"Peak RSS per worker: {peaks}{budget}"
+
+
+@dataclass
+class GridPlan:
+    """Tile dimensions chosen for a raster and their expected read cost."""
+
+    xsize: int
+    ysize: int
+    tile_width: int
+    tile_height: int
+    block_width: int
+    block_height: int
+    aligned: bool
+
+    @property
+    def windows(self) -> List["TileWindow"]:
+        return plan_windows(self.xsize, self.ysize, self.tile_width, self.tile_height)
+
+    @property
+    def read_amplification(self) -> float:
+        """Ratio of source pixels decoded to pixels written, assuming no block cache."""
+        amp_x = _axis_amplification(self.xsize, self.tile_width, self.block_width)
+        amp_y = _axis_amplification(self.ysize, self.tile_height, self.block_height)
+        return amp_x * amp_y
+
+    def describe(self) -> str:
+        mode = "block-aligned" if self.aligned else "unaligned"
+        return (
+            f"{mode} grid of {self.tile_width}x{self.tile_height} tiles over "
+            f"{self.block_width}x{self.block_height} blocks, expected read "
+            f"amplification {self.read_amplification:.2f}x"
+        )
+
+
+def _axis_amplification(size: int, tile: int, block: int) -> float:
+    """Decoded/needed ratio along one axis: each tile decodes whole blocks."""
+    decoded = 0
+    for start in range(0, size, tile):
+        end = min(start + tile, size)
+        first_block = (start // block) * block
+        last_block_end = min(math.ceil(end / block) * block, size)
+        decoded += last_block_end - first_block
+    return decoded / size
+
+
+def plan_grid(xsize: int, ysize: int, bytes_per_pixel: float, max_size_mb: float,
+              block_size: Sequence[int] = (0, 0), align: bool = True) -> GridPlan:
+    """Choose tile dimensions that keep each tile under ``max_size_mb``.
+
+    With ``align`` the width and height are multiples of the block size
+    (or the full raster extent), picking the largest such tile that fits the
+    size budget and preferring square tiles on ties. If a single block
+    already exceeds the budget, the square unaligned grid is used.
+    """
+    max_bytes = int(max_size_mb * 1024 * 1024)
+    pixels_per_tile = int(max_bytes // bytes_per_pixel)
+    if pixels_per_tile <= 0:
+        raise ValueError("max_size_mb too small for this raster's format")
+
+    block_width = min(block_size[0] or xsize, xsize)
+    block_height = min(block_size[1] or ysize, ysize)
+
+    tile_size = int(math.sqrt(pixels_per_tile))
+    if tile_size == 0:
+        raise ValueError("Computed tile size is zero")
+    square = GridPlan(xsize, ysize, min(tile_size, xsize), min(tile_size, ysize),
+                      block_width, block_height, aligned=False)
+    if not align or block_width * block_height > pixels_per_tile:
+        return square
+
+    candidates = []
+    for multiple in range(1, math.ceil(xsize / block_width) + 1):
+        width = min(multiple * block_width, xsize)
+        rows_of_blocks = pixels_per_tile // (width * block_height)
+        if rows_of_blocks == 0:
+            break
+        height = min(rows_of_blocks * block_height, ysize)
+        candidates.append((width, height))
+        if width == xsize:
+            break
+
+    # Among tiles within 10% of the largest area, take the squarest one
+    max_area = max(w * h for w, h in candidates)
+    width, height = min(
+        ((w, h) for w, h in candidates if w * h >= 0.9 * max_area),
+        key=lambda c: (max(c) / min(c), -c[0] * c[1]),
+    )
+    return GridPlan(xsize, ysize, width, height, block_width, block_height,
+                    aligned=True)
+
+
+@dataclass(frozen=True)
+class MemoryPlan:
+    """How a ``--memory-budget`` is split inside each worker process."""
+
+    per_worker_bytes: int
+    cache_bytes: int   # GDAL block cache (GDAL_CACHEMAX)
+    swath_bytes: int   # copy buffer (GDAL_SWATH_SIZE) and strip reads
+
+    def strip_rows(self, width: int, bytes_per_sample: int) -> int:
+        """Rows of a ``width``-pixel band that fit in the copy buffer."""
+        return max(1, self.swath_bytes // max(1, width * bytes_per_sample))
+
+    def describe(self) -> str:
+        mb = 1024 * 1024
+        return (
+            f"{self.per_worker_bytes / mb:.0f} MB per worker: "
+            f"{self.cache_bytes / mb:.0f} MB block cache, "
+            f"{self.swath_bytes / mb:.0f} MB copy buffer"
+        )
+
+
+def plan_memory(budget_mb: float, workers: int, tile_width: int,
+                block_size: Sequence[int], bytes_per_pixel: int) -> MemoryPlan:
+    """Split ``budget_mb`` between workers, then between cache and copy buffer.
+
+    Half of each worker's share goes to the block cache, raised (up to three
+    quarters) to hold one row of the blocks a tile spans so that no block is
+    decoded twice for the same tile. The rest bounds GDAL's copy buffer and
+    the strips read when checking for empty windows.
+    """
+    per_worker = int(budget_mb * 1024 * 1024) // workers
+    block_width, block_height = block_size
+    block_row = (math.ceil(tile_width / block_width) * block_width
+                 * block_height * bytes_per_pixel)
+    cache = max(per_worker // 2, min(block_row, per_worker * 3 // 4))
+    swath = per_worker - cache
+    if swath < MIN_SWATH_BYTES:
+        raise ValueError(
+            f"Memory budget of {budget_mb} MB is too small for {workers} worker(s)"
+        )
+    return MemoryPlan(per_worker, cache, swath)
+
+
+def sample_windows(xsize: int, ysize: int, samples: int,
+                   size: int) -> List[TileWindow]:
+    """Spread ``samples`` windows of ``size`` pixels deterministically over a raster."""
+    width, height = min(size, xsize), min(size, ysize)
+    windows = []
+    for i in range(samples):
+        fx = (i + 0.5) / samples
+        fy = (i * 0.618 + 0.5) % 1.0  # golden-ratio stride decorrelates the axes
+        x_off = int(fx * (xsize - width))
+        y_off = int(fy * (ysize - height))
+        windows.append(TileWindow(0, i, x_off, y_off, width, height))
+    return windows
+
+
+def estimate_compression_ratio(ds, profile: OutputProfile,
+                               samples: int = 8, sample_size: int = 512) -> float:
+    """Measure compressed/raw size by encoding sample windows in ``/vsimem/``."""
+    bands = ds.RasterCount
+    dtype_size = gdal.GetDataTypeSize(ds.GetRasterBand(1).DataType) // 8
+    raw = compressed = 0
+    for i, window in enumerate(sample_windows(ds.RasterXSize, ds.RasterYSize,
+                                              samples, sample_size)):
+        mem_path = f"/vsimem/raster_tiler_sample_{os.getpid()}_{i}.tif"
+        out_ds = gdal.Translate(mem_path, ds, format=profile.driver,
+                                srcWin=window.src_win,
+                                creationOptions=list(profile.creation_options))
+        if out_ds is None:
+            raise RuntimeError("Failed to encode compression sample")
+        out_ds = None
+        compressed += gdal.VSIStatL(mem_path).size
+        gdal.Unlink(mem_path)
+        raw += window.width * window.height * bands * dtype_size
+    # No sample measured: fall back to sizing tiles as uncompressed
+    return compressed / raw if raw else 1.0
+
+
+def plan_windows(xsize: int, ysize: int, tile_width: int,
+                 tile_height: int) -> List[TileWindow]:
+    """Return the tile windows covering a ``xsize`` x ``ysize`` raster, row-major."""
+    cols = math.ceil(xsize / tile_width)
+    rows = math.ceil(ysize / tile_height)
+    windows = []
+    for row in range(rows):
+        for col in range(cols):
+            x_off = col * tile_width
+            y_off = row * tile_height
+            width = tile_width if x_off + tile_width <= xsize else xsize - x_off
+            height = tile_height if y_off + tile_height <= ysize else ysize - y_off
+            windows.append(TileWindow(row, col, x_off, y_off, width, height))
+    return windows
+
+
+def write_window_index(path: str, source: str, xsize: int, ysize: int,
+                       windows: Sequence[TileWindow], extension: str) -> None:
+    """Write a JSON index mapping each tile name to its source window."""
+    index = {
+        "source": source,
+        "xsize": xsize,
+        "ysize": ysize,
+        "tiles": [
+            {"name": w.filename(extension), "row": w.row, "col": w.col,
+             "src_win": w.src_win}
+            for w in windows
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(index, fh, indent=1)
+
+
+def read_window_index(path: str) -> Dict:
+    """Load an index written by ``write_window_index``."""
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def classify_block(array, nodata: Optional[float],
+                   skip_constant: bool = False) -> Optional[str]:
+    """Return "nodata" or "constant" if a band's pixels can be skipped, else None."""
+    if nodata is not None:
+        is_nodata = np.isnan(array) if math.isnan(nodata) else array == nodata
+        if is_nodata.all():
+            return "nodata"
+    if skip_constant and array.size and array.min() == array.max():
+        return "constant"
+    return None
+
+
+def _coverage_reason(band, window: TileWindow,
+                     nodata: Optional[float]) -> Optional[str]:
+    """Use the driver's sparse-block information when it reports no data at all."""
+    if not hasattr(band, "GetDataCoverageStatus"):
+        return None
+    flags, _ = band.GetDataCoverageStatus(*window.src_win)
+    if flags != gdal.GDAL_DATA_COVERAGE_STATUS_EMPTY:
+        return None
+    # Empty blocks read back as nodata, or as zeros when nodata is unset
+    return "nodata" if nodata is not None else "constant"
+
+
+def _read_band_reason(band, window: TileWindow, nodata: Optional[float],
+                      skip_constant: bool, strip_rows: int) -> Optional[str]:
+    """Classify a band window strip by strip, stopping at the first data."""
+    reasons = set()
+    value = None
+    for y_off in range(window.y_off, window.y_off + window.height, strip_rows):
+        rows = min(strip_rows, window.y_off + window.height - y_off)
+        array = band.ReadAsArray(window.x_off, y_off, window.width, rows)
+        reason = classify_block(array, nodata, skip_constant)
+        if reason is None:
+            return None
+        if reason == "constant":
+            if value is not None and array.flat[0] != value:
+                return None
+            value = array.flat[0]
+        reasons.add(reason)
+        if len(reasons) > 1:
+            return None
+    return reasons.pop() if reasons else None
+
+
+def window_skip_reason(ds, window: TileWindow, skip_constant: bool = False,
+                       strip_rows: Optional[int] = None) -> Optional[str]:
+    """Decide whether ``window`` holds only nodata (or constant) pixels.
+
+    Sparse-aware drivers answer through ``GetDataCoverageStatus`` without
+    decoding anything; otherwise each band is read as NumPy arrays of at
+    most ``strip_rows`` rows (the whole window by default). Without a nodata
+    value a band only qualifies as ``constant``.
+    """
+    reasons = set()
+    for i in range(1, ds.RasterCount + 1):
+        band = ds.GetRasterBand(i)
+        nodata = band.GetNoDataValue()
+        if nodata is None and not skip_constant:
+            return None
+        reason = _coverage_reason(band, window, nodata)
+        if reason is None:
+            if not NUMPY_AVAILABLE:
+                return None
+            reason = _read_band_reason(band, window, nodata, skip_constant,
+                                       strip_rows or window.height)
+        if reason is None or (reason == "constant" and not skip_constant):
+            return None
+        reasons.add(reason)
+    return "constant" if "constant" in reasons else "nodata"
+
+
+def write_skipped_manifest(path: str, skipped: Sequence[Tuple[TileWindow, str]],
+                           extension: str) -> None:
+    """Record the windows that were not written and why."""
+    manifest = [
+        {"name": w.filename(extension), "row": w.row, "col": w.col,
+         "src_win": w.src_win, "reason": reason}
+        for w, reason in skipped
+    ]
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1)
+
+
+@dataclass
+class TileResult:
+    """Outcome of one window: a tile written to disk or a skipped window."""
+
+    window: TileWindow
+    size: int = 0
+    checksum: Optional[str] = None
+    skipped: Optional[str] = None
+    # Process that produced the result and its peak RSS in bytes
+    worker: Optional[int] = None
+    peak_rss: Optional[int] = None
+
+    def record(self, extension: str) -> Dict:
+        """Manifest entry describing this result."""
+        entry = {"name": self.window.filename(extension), "row": self.window.row,
+                 "col": self.window.col, "src_win": self.window.src_win}
+        if self.skipped is not None:
+            entry["skipped"] = self.skipped
+        else:
+            entry["size"] = self.size
+            entry["sha256"] = self.checksum
+        return entry
+
+    @classmethod
+    def from_record(cls, window: TileWindow, entry: Dict) -> "TileResult":
+        return cls(window, size=entry.get("size", 0),
+                   checksum=entry.get("sha256"), skipped=entry.get("skipped"))
+
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TileManifest:
+    """Append-only JSON Lines record of finished windows.
+
+    The first line holds the run settings. Each following line is appended
+    only after its tile was renamed into place, so an entry never refers to
+    a partial file; a line cut short by an interruption is ignored on load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def load(self) -> Tuple[Optional[Dict], Dict[str, Dict]]:
+        """Return the stored settings and the entries keyed by tile name."""
+        settings, entries = None, {}
+        try:
+            fh = open(self.path, encoding="utf-8")
+        except FileNotFoundError:
+            return settings, entries
+        with fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "settings" in record:
+                    settings = record["settings"]
+                elif "name" in record:
+                    entries[record["name"]] = record
+        return settings, entries
+
+    def rewrite(self, settings: Dict, entries: Iterable[Dict]) -> None:
+        """Atomically replace the manifest with ``settings`` and ``entries``."""
+        self.close()
+        tmp_path = self.path + PARTIAL_SUFFIX
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(json.dumps({"settings": settings}) + "\n")
+            for entry in entries:
+                fh.write(json.dumps(entry) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+
+    def append(self, entry: Dict) -> None:
+        if self._fh is None:
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def tile_is_complete(entry: Dict, window: TileWindow, output_dir: str,
+                     verify_checksum: bool = False) -> bool:
+    """Check a manifest entry against its window and the file on disk."""
+    if entry.get("src_win") != window.src_win:
+        return False
+    if entry.get("skipped"):
+        return True
+    try:
+        size = os.path.getsize(os.path.join(output_dir, entry["name"]))
+    except OSError:
+        return False
+    if size != entry.get("size"):
+        return False
+    return (not verify_checksum
+            or file_checksum(os.path.join(output_dir, entry["name"])) == entry.get("sha256"))
+
+
+def _remove_partial_files(output_dir: str, windows: Iterable[TileWindow],
+                          extension: str) -> None:
+    """Delete tiles of this plan left half-written by an interrupted run.
+
+    Only the temporary names this tool writes are touched; other ``.part``
+    files in ``output_dir`` are left alone.
+    """
+    names = [w.filename(extension) + PARTIAL_SUFFIX for w in windows]
+    names.append(MANIFEST_FILE + PARTIAL_SUFFIX)
+    for name in names:
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+def _peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes, where supported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Per-process dataset handle, opened once by ``_init_worker``.
+_worker_ds = None
+# Memory plan of this worker and the GDAL settings it replaced
+_worker_memory: Optional[MemoryPlan] = None
+_saved_gdal_settings: Optional[Tuple[int, Optional[str]]] = None
+
+
+def _init_worker(input_path: str, memory: Optional[MemoryPlan] = None) -> None:
+    global _worker_ds, _worker_memory, _saved_gdal_settings
+    if memory is not None:
+        _saved_gdal_settings = (gdal.GetCacheMax(),
+                                gdal.GetConfigOption("GDAL_SWATH_SIZE"))
+        gdal.SetCacheMax(memory.cache_bytes)
+        gdal.SetConfigOption("GDAL_SWATH_SIZE", str(memory.swath_bytes))
+    _worker_memory = memory
+    _worker_ds = gdal.Open(input_path)
+    if _worker_ds is None:
+        raise RuntimeError(f"Unable to open {input_path}")
+
+
+def _close_worker() -> None:
+    global _worker_ds, _worker_memory, _saved_gdal_settings
+    _worker_ds = None
+    if _saved_gdal_settings is not None:
+        # In-process runs must not leave the caller's GDAL settings changed
+        cache_max, swath = _saved_gdal_settings
+        gdal.SetCacheMax(cache_max)
+        gdal.SetConfigOption("GDAL_SWATH_SIZE", swath)
+        _saved_gdal_settings = None
+    _worker_memory = None
+
+
+def _write_tile(window: TileWindow, output_dir: str,
+                profile: OutputProfile, virtual: bool = False,
+                skip_empty: bool = False,
+                skip_constant: bool = False) -> TileResult:
+    """Write one tile from the worker's dataset.
+
+    The tile is written under a temporary name and renamed when complete, so
+    an interrupted run never leaves a truncated tile under its final name.
+    """
+    if skip_empty or skip_constant:
+        strip_rows = None
+        if _worker_memory is not None:
+            sample_size = gdal.GetDataTypeSize(
+                _worker_ds.GetRasterBand(1).DataType) // 8
+            strip_rows = _worker_memory.strip_rows(window.width, sample_size)
+        reason = window_skip_reason(_worker_ds, window, skip_constant, strip_rows)
+        if reason is not None:
+            return TileResult(window, skipped=reason, worker=os.getpid(),
+                              peak_rss=_peak_rss())
+    if virtual:
+        out_path = os.path.join(output_dir, window.filename(".vrt"))
+        out_ds = gdal.Translate(out_path + PARTIAL_SUFFIX, _worker_ds,
+                                format="VRT", srcWin=window.src_win)
+    else:
+        out_path = os.path.join(output_dir, window.name)
+        out_ds = gdal.Translate(
+            out_path + PARTIAL_SUFFIX,
+            _worker_ds,
+            format=profile.driver,
+            srcWin=window.src_win,
+            creationOptions=list(profile.creation_options)
+        )
+    if out_ds is None:
+        raise RuntimeError(f"Failed to write {out_path}")
+    # VRT windows only reference the source; building overviews on them
+    # would write an external .ovr next to the temporary name
+    if profile.build_overviews and not virtual:
+        levels = overview_levels(window.width, window.height)
+        if levels:
+            out_ds.BuildOverviews("AVERAGE", levels)
+    out_ds = None  # flush and close
+    os.replace(out_path + PARTIAL_SUFFIX, out_path)
+    return TileResult(window, size=os.path.getsize(out_path),
+                      checksum=file_checksum(out_path), worker=os.getpid(),
+                      peak_rss=_peak_rss())
+
+
 def tile_raster(input_path: str, output_dir: str, max_size_mb: float = 50.0,
-                compress: str = "LZW") -> None:
+                compress: str = "LZW", workers: int = 1,
+                align_to_blocks: bool = True, virtual: bool = False,
+                estimate_compression: bool = False,
+                compression_samples: int = 8,
+                profile: str = "gtiff", skip_empty: bool = False,
+                skip_constant: bool = False, resume: bool = False,
+                verify_checksums: bool = False,
+                memory_budget_mb: Optional[float] = None) -> TilingReport:
     """Cut ``input_path`` into tiles saved inside ``output_dir``.
 
     Parameters
@@ -29,48 +768,309 @@ def tile_raster(input_path: str, output_dir: str, max_size_mb: float = 50.0,
         Maximum size in megabytes for each tile. Default is 50MB.
     compress : str, optional
         Compression method passed to GDAL (e.g. "LZW", "DEFLATE").
+    workers : int, optional
+        Number of worker processes writing tiles. Default is 1 (in-process).
+    align_to_blocks : bool, optional
+        Snap tile dimensions to multiples of the source block size.
+    virtual : bool, optional
+        Write VRT windows referencing the source (and ``tiles_index.json``)
+        instead of copying pixel data.
+    estimate_compression : bool, optional
+        Size tiles from the compression ratio measured on sample windows.
+    compression_samples : int, optional
+        Number of sample windows used by ``estimate_compression``.
+    profile : str, optional
+        "gtiff" (plain GeoTIFF, default) or "cog" (Cloud-Optimized GeoTIFF
+        with internal tiling, overviews, predictor and threaded compression).
+    skip_empty : bool, optional
+        Do not write windows whose pixels are all nodata; they are listed in
+        ``skipped_tiles.json``.
+    skip_constant : bool, optional
+        Also skip windows where every band holds a single value.
+    resume : bool, optional
+        Keep tiles recorded in ``manifest.jsonl`` by a previous run with the
+        same settings and only write the missing ones.
+    verify_checksums : bool, optional
+        When resuming, also compare each kept tile's SHA-256 with the
+        manifest instead of only its size.
+    memory_budget_mb : float, optional
+        Total memory for all workers. Each worker gets an equal share, split
+        between GDAL's block cache and its copy buffer; empty-window checks
+        read strips that fit the buffer. By default GDAL's own cache
+        settings are used.
+
+    Returns
+    -------
+    TilingReport
+        Tile count, bytes written and aggregate throughput of the run.
     """
+    if os.path.exists(input_path):
+        # VRT tiles must keep pointing at the source from any directory
+        input_path = os.path.abspath(input_path)
     ds = gdal.Open(input_path)
     if ds is None:
         raise RuntimeError(f"Unable to open {input_path}")
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
 
     xsize = ds.RasterXSize
     ysize = ds.RasterYSize
     bands = ds.RasterCount
     dtype_size = gdal.GetDataTypeSize(ds.GetRasterBand(1).DataType) // 8
     bytes_per_pixel = bands * dtype_size
+    block_size = ds.GetRasterBand(1).GetBlockSize()
+    # Split the CPUs between worker processes for threaded compression
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    out_profile = output_profile(profile, compress,
+                                 ds.GetRasterBand(1).DataType, threads)
 
-    max_bytes = int(max_size_mb * 1024 * 1024)
-    pixels_per_tile = max_bytes // bytes_per_pixel
-    if pixels_per_tile <= 0:
-        raise ValueError("max_size_mb too small for this raster's format")
+    ratio = None
+    if estimate_compression and not virtual:
+        ratio = estimate_compression_ratio(ds, out_profile,
+                                           samples=compression_samples)
+        print(f"Estimated compression ratio: {ratio:.3f}")
+    ds = None
 
-    tile_size = int(math.sqrt(pixels_per_tile))
-    if tile_size == 0:
-        raise ValueError("Computed tile size is zero")
+    # Pad the measured ratio: samples may compress better than the full raster
+    effective_bpp = bytes_per_pixel * min(1.0, ratio * COMPRESSION_MARGIN) \
+        if ratio is not None else bytes_per_pixel
+    plan = plan_grid(xsize, ysize, effective_bpp, max_size_mb,
+                     block_size=block_size, align=align_to_blocks)
+    print(f"Planned {plan.describe()}")
+    memory = None
+    if memory_budget_mb is not None:
+        memory = plan_memory(memory_budget_mb, workers, plan.tile_width,
+                             (plan.block_width, plan.block_height),
+                             bytes_per_pixel)
+        print(f"Memory budget: {memory.describe()}")
+    windows = plan.windows
+    n = len(windows)
+    extension = ".vrt" if virtual else ".tif"
 
-    cols = math.ceil(xsize / tile_size)
-    rows = math.ceil(ysize / tile_size)
+    settings = {
+        "source": input_path, "tile_size": [plan.tile_width, plan.tile_height],
+        "profile": profile, "compress": compress.upper(), "virtual": virtual,
+        "skip_empty": skip_empty, "skip_constant": skip_constant,
+    }
+    manifest = TileManifest(os.path.join(output_dir, MANIFEST_FILE))
+    _remove_partial_files(output_dir, windows, extension)
+    done: Dict[TileWindow, TileResult] = {}
+    if resume:
+        previous, entries = manifest.load()
+        if previous is not None and previous != settings:
+            raise ValueError("The existing manifest was written with different "
+                             "settings; rerun without --resume")
+        for window in windows:
+            entry = entries.get(window.filename(extension))
+            if entry and tile_is_complete(entry, window, output_dir,
+                                          verify_checksums):
+                done[window] = TileResult.from_record(window, entry)
+        print(f"Resuming: {len(done)} of {n} windows already done")
+    manifest.rewrite(settings, (r.record(extension) for r in done.values()))
+    pending = [w for w in windows if w not in done]
+    n_pending = len(pending)
 
-    for row in range(rows):
-        for col in range(cols):
-            x_off = col * tile_size
-            y_off = row * tile_size
-            width = tile_size if x_off + tile_size <= xsize else xsize - x_off
-            height = tile_size if y_off + tile_size <= ysize else ysize - y_off
-
-            out_name = f"tile_{row:03d}_{col:03d}.tif"
-            out_path = os.path.join(output_dir, out_name)
-            gdal.Translate(
-                out_path,
-                ds,
-                srcWin=[x_off, y_off, width, height],
-                creationOptions=[f"COMPRESS={compress}"]
-            )
-            print(f"Generated {out_path}")
-
-
-def main():
+    start = time.perf_counter()
+    try:
+        if workers == 1 or n_pending == 0:
+            _init_worker(input_path, memory)
+            try:
+                results = (_write_tile(w, output_dir, out_profile, virtual,
+                                       skip_empty, skip_constant)
+                           for w in pending)
+                _collect(results, output_dir, extension, manifest, done)
+            finally:
+                _close_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(input_path, memory)) as pool:
+                # map() yields results in submission order, keeping output deterministic
+                results = pool.map(_write_tile, pending, [output_dir] * n_pending,
+                                   [out_profile] * n_pending, [virtual] * n_pending,
+                                   [skip_empty] * n_pending,
+                                   [skip_constant] * n_pending,
+                                   chunksize=max(1, n_pending // (workers * 8)))
+                _collect(results, output_dir, extension, manifest, done)
+    finally:
+        manifest.close()
+
+    # Compact the appended entries into grid order
+    final = [done[w] for w in windows]
+    manifest.rewrite(settings, (r.record(extension) for r in final))
+    skipped = [(r.window, r.skipped) for r in final if r.skipped is not None]
+    tiles = [r for r in final if r.skipped is None]
+    peak_rss: Dict[int, int] = {}
+    for r in final:
+        if r.worker is not None and r.peak_rss is not None:
+            peak_rss[r.worker] = max(peak_rss.get(r.worker, 0), r.peak_rss)
+    if skip_empty or skip_constant:
+        write_skipped_manifest(os.path.join(output_dir, SKIPPED_FILE),
+                               skipped, extension)
+    if virtual:
+        write_window_index(os.path.join(output_dir, INDEX_FILE), input_path,
+                           xsize, ysize, [r.window for r in tiles], extension)
+    elapsed = time.perf_counter() - start
+    tile_pixels = sum(r.window.width * r.window.height for r in tiles)
+
+    return TilingReport(
+        tiles=len(tiles),
+        bytes_written=sum(r.size for r in tiles),
+        source_bytes=xsize * ysize * bytes_per_pixel,
+        elapsed=elapsed,
+        workers=workers,
+        max_tile_bytes=max((r.size for r in tiles), default=0),
+        target_tile_bytes=int(max_size_mb * 1024 * 1024),
+        estimated_ratio=ratio,
+        tile_source_bytes=tile_pixels * bytes_per_pixel,
+        skipped=len(skipped),
+        resumed=n - n_pending,
+        memory=memory,
+        worker_peak_rss=peak_rss,
+    )
+
+
+def _collect(results: Iterable[TileResult], output_dir: str, extension: str,
+             manifest: TileManifest, done: Dict[TileWindow, TileResult]) -> None:
+    for result in results:
+        path = os.path.join(output_dir, result.window.filename(extension))
+        manifest.append(result.record(extension))
+        done[result.window] = result
+        if result.skipped is not None:
+            print(f"Skipped {path} ({result.skipped})")
+        else:
+            print(f"Generated {path}")
+
+
+# PostGIS raster pixel types by GDAL data type name, with struct codes
+POSTGIS_PIXEL_TYPES = {
+    "Int8": (3, "b"), "Byte": (4, "B"), "Int16": (5, "h"), "UInt16": (6, "H"),
+    "Int32": (7, "i"), "UInt32": (8, "I"), "Float32": (10, "f"),
+    "Float64": (11, "d"),
+}
+WKB_HAS_NODATA = 0x40
+TILE_ENCODINGS = ("wkb", "gtiff")
+
+
+@dataclass(frozen=True)
+class EncodedTile:
+    """One window of the source encoded in memory."""
+
+    window: TileWindow
+    data: bytes
+    encoding: str
+
+
+def postgis_raster_wkb(ds, window: TileWindow, srid: int = 0) -> bytes:
+    """Encode ``window`` of ``ds`` as PostGIS raster WKB (in-db bands).
+
+    The result is what the ``raster`` type accepts as input (hex-encoded),
+    so tiles can be loaded with ``COPY`` without raster2pgsql.
+    """
+    if window.width > 0xFFFF or window.height > 0xFFFF:
+        raise ValueError("PostGIS raster tiles are limited to 65535 pixels per side")
+    order = "<" if sys.byteorder == "little" else ">"
+    gt = ds.GetGeoTransform()
+    origin_x = gt[0] + window.x_off * gt[1] + window.y_off * gt[2]
+    origin_y = gt[3] + window.x_off * gt[4] + window.y_off * gt[5]
+    parts = [struct.pack(
+        order + "BHHddddddiHH",
+        1 if order == "<" else 0, 0, ds.RasterCount,
+        gt[1], gt[5], origin_x, origin_y, gt[2], gt[4],
+        srid, window.width, window.height,
+    )]
+    for i in range(1, ds.RasterCount + 1):
+        band = ds.GetRasterBand(i)
+        type_name = gdal.GetDataTypeName(band.DataType)
+        if type_name not in POSTGIS_PIXEL_TYPES:
+            raise ValueError(f"Data type {type_name} has no PostGIS raster equivalent")
+        pixel_type, code = POSTGIS_PIXEL_TYPES[type_name]
+        nodata = band.GetNoDataValue()
+        flags = pixel_type | (WKB_HAS_NODATA if nodata is not None else 0)
+        value = nodata if nodata is not None else 0
+        if code not in "fd":
+            value = int(value)
+        parts.append(struct.pack(order + "B" + code, flags, value))
+        # ReadRaster returns pixels in native byte order, matching the header
+        parts.append(band.ReadRaster(*window.src_win))
+    return b"".join(parts)
+
+
+def _encode_gtiff(ds, window: TileWindow, profile: OutputProfile) -> bytes:
+    """Encode ``window`` with the output profile entirely in ``/vsimem/``."""
+    mem_path = f"/vsimem/raster_tiler_{os.getpid()}_{window.name}"
+    out_ds = gdal.Translate(mem_path, ds, format=profile.driver,
+                            srcWin=window.src_win,
+                            creationOptions=list(profile.creation_options))
+    if out_ds is None:
+        raise RuntimeError(f"Failed to encode {window.name}")
+    out_ds = None
+    try:
+        size = gdal.VSIStatL(mem_path).size
+        fh = gdal.VSIFOpenL(mem_path, "rb")
+        try:
+            return bytes(gdal.VSIFReadL(1, size, fh))
+        finally:
+            gdal.VSIFCloseL(fh)
+    finally:
+        gdal.Unlink(mem_path)
+
+
+def iter_tiles(input_path: str, tile_size: Optional[Tuple[int, int]] = None,
+               max_size_mb: float = 50.0, encoding: str = "wkb",
+               srid: int = 0, compress: str = "LZW", profile: str = "gtiff",
+               align_to_blocks: bool = True, skip_empty: bool = False,
+               skip_constant: bool = False) -> Iterator[EncodedTile]:
+    """Yield the tiles of ``input_path`` encoded in memory, in grid order.
+
+    Nothing is written to disk, so a raster can be split and consumed (for
+    example loaded into PostGIS) in a single pass.
+
+    Parameters
+    ----------
+    tile_size : tuple of int, optional
+        Fixed ``(width, height)`` of each tile. By default the grid is
+        planned from ``max_size_mb`` like ``tile_raster``.
+    encoding : str, optional
+        "wkb" for PostGIS raster WKB (default) or "gtiff" for a GeoTIFF (or
+        COG, with ``profile="cog"``) file image built in ``/vsimem/``.
+    srid : int, optional
+        SRID stored in WKB tiles.
+    """
+    if encoding not in TILE_ENCODINGS:
+        raise ValueError(f"Unknown encoding: {encoding}")
+    ds = gdal.Open(input_path)
+    if ds is None:
+        raise RuntimeError(f"Unable to open {input_path}")
+    xsize, ysize = ds.RasterXSize, ds.RasterYSize
+    band = ds.GetRasterBand(1)
+    if tile_size is not None:
+        windows = plan_windows(xsize, ysize, *tile_size)
+    else:
+        bytes_per_pixel = ds.RasterCount * gdal.GetDataTypeSize(band.DataType) // 8
+        windows = plan_grid(xsize, ysize, bytes_per_pixel, max_size_mb,
+                            block_size=band.GetBlockSize(),
+                            align=align_to_blocks).windows
+    out_profile = output_profile(profile, compress, band.DataType)
+
+    for window in windows:
+        if (skip_empty or skip_constant) and \
+                window_skip_reason(ds, window, skip_constant) is not None:
+            continue
+        if encoding == "wkb":
+            data = postgis_raster_wkb(ds, window, srid)
+        else:
+            data = _encode_gtiff(ds, window, out_profile)
+        yield EncodedTile(window, data, encoding)
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def main(argv: Optional[Sequence[str]] = None):
     parser = argparse.ArgumentParser(description="Split a raster into tiles")
     parser.add_argument("input_raster", help="Path to the input raster")
     parser.add_argument("output_dir", help="Existing directory for tiles")
@@ -78,12 +1078,52 @@ def main():
                         help="Max tile size in MB (default: 50)")
     parser.add_argument("--compress", default="LZW",
                         help="Compression method (default: LZW)")
-    args = parser.parse_args()
+    parser.add_argument("--profile", choices=PROFILES, default="gtiff",
+                        help="Output profile: plain GeoTIFF or Cloud-Optimized "
+                             "GeoTIFF (default: gtiff)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes writing tiles (default: 1)")
+    parser.add_argument("--no-align", dest="align", action="store_false",
+                        help="Do not snap tiles to the source block size")
+    parser.add_argument("--estimate-compression", action="store_true",
+                        help="Size tiles from the compression ratio measured "
+                             "on sample windows")
+    parser.add_argument("--samples", type=_positive_int, default=8,
+                        help="Sample windows for --estimate-compression (default: 8)")
+    parser.add_argument("--virtual", action="store_true",
+                        help="Write VRT windows referencing the source instead "
+                             "of copying pixels")
+    parser.add_argument("--skip-empty", action="store_true",
+                        help="Do not write tiles whose pixels are all nodata")
+    parser.add_argument("--skip-constant", action="store_true",
+                        help="Also skip tiles where every band has a single value")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep tiles recorded in manifest.jsonl by an "
+                             "interrupted run and write only the missing ones")
+    parser.add_argument("--verify-checksums", action="store_true",
+                        help="With --resume, check kept tiles' SHA-256 "
+                             "instead of only their size")
+    parser.add_argument("--memory-budget", type=float, default=None,
+                        metavar="MB",
+                        help="Total memory for all workers, split into GDAL "
+                             "block cache and copy buffers (default: GDAL's)")
+    args = parser.parse_args(argv)
 
-    tile_raster(args.input_raster, args.output_dir,
-                max_size_mb=args.max_size, compress=args.compress)
+    report = tile_raster(args.input_raster, args.output_dir,
+                         max_size_mb=args.max_size, compress=args.compress,
+                         workers=args.workers, align_to_blocks=args.align,
+                         virtual=args.virtual,
+                         estimate_compression=args.estimate_compression,
+                         compression_samples=args.samples,
+                         profile=args.profile, skip_empty=args.skip_empty,
+                         skip_constant=args.skip_constant, resume=args.resume,
+                         verify_checksums=args.verify_checksums,
+                         memory_budget_mb=args.memory_budget)
+    print(report.summary())
+    if not args.virtual:
+        print(report.estimate_summary())
+    print(report.memory_summary())
 
 
 if __name__ == "__main__":
     main()
-
@@ -24,10 +24,26 @@ def classFactory(iface):
     return GeoIFSCPlugin(iface)
 
 # Expor classes do módulo de gerenciamento de usuários
-from .db_manager import DBManager  # noqa: E402
-from .role_manager import RoleManager  # noqa: E402
 from .models import User, Group  # noqa: E402
 
+# DBManager e RoleManager dependem de psycopg2; são carregados sob demanda
+# para não pesar na inicialização do plugin no QGIS.
+_LAZY_EXPORTS = {
+    "DBManager": ".db_manager",
+    "RoleManager": ".role_manager",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
 __all__ = [
     "classFactory",
     "DBManager",
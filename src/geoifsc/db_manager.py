@@ -1,26 +1,90 @@
 """Data Access Object for PostgreSQL roles."""
-from typing import List, Optional
+import itertools
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
 
 import psycopg2
 from psycopg2 import sql
 
-from .models import User, Group
+from .models import User, Group, TablePrivilege
+from .prepared_statements import DEFAULT_CACHE_SIZE, PreparedStatementCache
+from .role_graph import RoleGraph
+
+# Máximo de roles por lista em um GRANT/REVOKE em lote
+MEMBERSHIP_CHUNK_SIZE = 500
+# Linhas trazidas do servidor por ida ao banco nos cursores nomeados
+USER_ITERSIZE = 2000
+# Mesmo filtro de list_users; "%%" porque estas consultas têm parâmetros
+_USER_QUERY = """
+    SELECT rolname, rolvaliduntil, rolcanlogin
+    FROM pg_roles
+    WHERE rolname NOT LIKE 'pg_%%' AND rolname <> 'postgres'
+"""
+_cursor_ids = itertools.count(1)
+
+
+def _chunks(items: Sequence[str], size: int) -> Iterator[Sequence[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
 class DBManager:
-    """Encapsula operações no banco para usuários e grupos."""
+    """
+    Encapsula operações no banco para usuários e grupos.
 
-    def __init__(self, connection):
+    Com ``prepared_statements=True`` as consultas frequentes são preparadas
+    uma vez por sessão (``PreparedStatementCache``). A opção é desativada por
+    padrão porque poolers em modo transação (ex.: PgBouncer com
+    ``pool_mode = transaction``) não preservam comandos preparados entre
+    transações; ative-a apenas com conexões diretas ao PostgreSQL.
+    """
+
+    def __init__(
+        self,
+        connection,
+        prepared_statements: bool = False,
+        statement_cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
         if connection is None:
             raise ValueError("Conexão inválida")
         self.conn = connection
+        self.statements = (
+            PreparedStatementCache(statement_cache_size) if prepared_statements else None
+        )
+
+    def _execute(self, cur, key: str, query: str, params: Sequence = ()) -> None:
+        """Executa uma consulta frequente, preparada quando o cache está ativo."""
+        if self.statements is not None:
+            self.statements.execute(cur, key, query, params)
+        else:
+            cur.execute(query, tuple(params))
+
+    # ---------------------- Savepoints ----------------------
+
+    def savepoint(self, name: str) -> None:
+        """Cria um savepoint na transação corrente."""
+        with self.conn.cursor() as cur:
+            cur.execute(sql.SQL("SAVEPOINT {}").format(sql.Identifier(name)))
+
+    def release_savepoint(self, name: str) -> None:
+        """Libera um savepoint, mantendo o que foi feito após ele."""
+        with self.conn.cursor() as cur:
+            cur.execute(sql.SQL("RELEASE SAVEPOINT {}").format(sql.Identifier(name)))
+
+    def rollback_to_savepoint(self, name: str) -> None:
+        """Desfaz o que foi feito após o savepoint, sem abortar a transação."""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("ROLLBACK TO SAVEPOINT {}").format(sql.Identifier(name))
+            )
 
     # ---------------------- Métodos de Usuário ----------------------
 
     def find_user_by_name(self, username: str) -> Optional[User]:
         """Busca usuário pelo nome."""
         with self.conn.cursor() as cur:
-            cur.execute(
+            self._execute(
+                cur,
+                "find_user_by_name",
                 """
                 SELECT rolname, rolvaliduntil, rolcanlogin
                 FROM pg_roles
@@ -56,8 +120,9 @@ class DBManager:
             if "can_login" in fields:
                 action = "LOGIN" if fields["can_login"] else "NOLOGIN"
                 cur.execute(
-                    sql.SQL("ALTER ROLE {} %s").format(sql.Identifier(username)),
-                    [sql.SQL(action)],
+                    sql.SQL("ALTER ROLE {} {}").format(
+                        sql.Identifier(username), sql.SQL(action)
+                    )
                 )
 
     def delete_user(self, username: str) -> None:
@@ -68,15 +133,61 @@ class DBManager:
     def list_users(self) -> List[str]:
         """Lista usuários de acordo com filtros padrão."""
         with self.conn.cursor() as cur:
-            cur.execute(
+            self._execute(cur, "list_users", _USER_QUERY + " ORDER BY rolname")
+            return [row[0] for row in cur.fetchall()]
+
+    @staticmethod
+    def _user_from_row(row) -> User:
+        return User(username=row[0], valid_until=row[1], can_login=row[2])
+
+    def iter_users(self, itersize: int = USER_ITERSIZE) -> Iterator[User]:
+        """
+        Percorre os usuários com um cursor nomeado (do lado do servidor).
+
+        As linhas chegam em lotes de ``itersize``, sem montar a lista inteira
+        em memória. Requer uma transação aberta (o padrão do psycopg2).
+        """
+        name = f"geoifsc_users_{next(_cursor_ids)}"
+        with self.conn.cursor(name=name) as cur:
+            cur.itersize = itersize
+            cur.execute(_USER_QUERY + " ORDER BY rolname", ())
+            for row in cur:
+                yield self._user_from_row(row)
+
+    def list_users_page(self, after: Optional[str] = None, limit: int = 500) -> List[User]:
+        """
+        Página de usuários em ordem de nome, a partir de ``after`` (exclusivo).
+
+        Paginação por chave: cada página custa o mesmo independentemente da
+        posição; passe o nome do último usuário como ``after`` da próxima.
+        """
+        with self.conn.cursor() as cur:
+            if after is None:
+                cur.execute(_USER_QUERY + " ORDER BY rolname LIMIT %s", (limit,))
+            else:
+                cur.execute(
+                    _USER_QUERY + " AND rolname > %s ORDER BY rolname LIMIT %s",
+                    (after, limit),
+                )
+            return [self._user_from_row(row) for row in cur.fetchall()]
+
+    def find_users(self, usernames: Iterable[str]) -> Dict[str, User]:
+        """Busca vários usuários em uma consulta; nomes inexistentes ficam de fora."""
+        names = list(dict.fromkeys(usernames))
+        if not names:
+            return {}
+        with self.conn.cursor() as cur:
+            self._execute(
+                cur,
+                "find_users",
                 """
-                SELECT rolname
+                SELECT rolname, rolvaliduntil, rolcanlogin
                 FROM pg_roles
-                WHERE rolname NOT LIKE 'pg_%' AND rolname <> 'postgres'
-                ORDER BY rolname
-                """
+                WHERE rolname = ANY(%s)
+                """,
+                (names,),
             )
-            return [row[0] for row in cur.fetchall()]
+            return {row[0]: self._user_from_row(row) for row in cur.fetchall()}
 
     # ---------------------- Métodos de Grupo ----------------------
 
@@ -105,10 +216,143 @@ class DBManager:
                 )
             )
 
+    def load_role_graph(self) -> RoleGraph:
+        """Carrega todos os roles e associações diretas em uma única consulta."""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT r.rolname, r.rolcanlogin, r.rolvaliduntil,
+                       ARRAY(
+                           SELECT g.rolname
+                           FROM pg_auth_members m
+                           JOIN pg_roles g ON m.roleid = g.oid
+                           WHERE m.member = r.oid
+                       )
+                FROM pg_roles r
+                """
+            )
+            return RoleGraph(cur.fetchall())
+
+    def add_users_to_groups(
+        self,
+        usernames: Sequence[str],
+        group_names: Sequence[str],
+        chunk_size: int = MEMBERSHIP_CHUNK_SIZE,
+    ) -> int:
+        """
+        Adiciona todos os usuários a todos os grupos com ``GRANT g1, g2 TO u1, u2``.
+
+        As listas são divididas em blocos de ``chunk_size`` roles; retorna o
+        número de comandos executados.
+        """
+        return self._batch_membership("GRANT {} TO {}", usernames, group_names, chunk_size)
+
+    def remove_users_from_groups(
+        self,
+        usernames: Sequence[str],
+        group_names: Sequence[str],
+        chunk_size: int = MEMBERSHIP_CHUNK_SIZE,
+    ) -> int:
+        """Remove todos os usuários de todos os grupos com ``REVOKE ... FROM ...`` em lote."""
+        return self._batch_membership("REVOKE {} FROM {}", usernames, group_names, chunk_size)
+
+    def _batch_membership(
+        self,
+        template: str,
+        usernames: Sequence[str],
+        group_names: Sequence[str],
+        chunk_size: int,
+    ) -> int:
+        usernames = list(dict.fromkeys(usernames))
+        group_names = list(dict.fromkeys(group_names))
+        statements = 0
+        with self.conn.cursor() as cur:
+            for groups in _chunks(group_names, chunk_size):
+                for users in _chunks(usernames, chunk_size):
+                    cur.execute(
+                        sql.SQL(template).format(
+                            sql.SQL(", ").join(map(sql.Identifier, groups)),
+                            sql.SQL(", ").join(map(sql.Identifier, users)),
+                        )
+                    )
+                    statements += 1
+        return statements
+
+    # ---------------------- Privilégios ----------------------
+
+    def grant_select_on_tables(
+        self,
+        schema: str,
+        tables: Sequence[str],
+        roles: Sequence[str],
+        chunk_size: int = MEMBERSHIP_CHUNK_SIZE,
+    ) -> int:
+        """
+        Concede USAGE no esquema e SELECT nas tabelas com ``GRANT SELECT ON
+        TABLE t1, t2 TO g1, g2``, em blocos; retorna o número de comandos.
+        """
+        role_list = sql.SQL(", ").join(map(sql.Identifier, dict.fromkeys(roles)))
+        statements = 1
+        with self.conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("GRANT USAGE ON SCHEMA {} TO {}").format(
+                    sql.Identifier(schema), role_list
+                )
+            )
+            for chunk in _chunks(list(dict.fromkeys(tables)), chunk_size):
+                cur.execute(
+                    sql.SQL("GRANT SELECT ON TABLE {} TO {}").format(
+                        sql.SQL(", ").join(sql.Identifier(schema, t) for t in chunk),
+                        role_list,
+                    )
+                )
+                statements += 1
+        return statements
+
+    def grant_default_select(self, schema: str, roles: Sequence[str]) -> None:
+        """Concede USAGE no esquema e SELECT nas tabelas que o usuário atual criar nele."""
+        role_list = sql.SQL(", ").join(map(sql.Identifier, dict.fromkeys(roles)))
+        with self.conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("GRANT USAGE ON SCHEMA {} TO {}").format(
+                    sql.Identifier(schema), role_list
+                )
+            )
+            cur.execute(
+                sql.SQL(
+                    "ALTER DEFAULT PRIVILEGES IN SCHEMA {} GRANT SELECT ON TABLES TO {}"
+                ).format(sql.Identifier(schema), role_list)
+            )
+
+    def list_raster_table_privileges(self) -> List[TablePrivilege]:
+        """
+        Privilégios efetivos nas tabelas raster (``raster_columns`` do PostGIS).
+
+        Tabelas sem ACL explícita retornam os privilégios padrão do dono.
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT DISTINCT rc.r_table_schema, rc.r_table_name,
+                       COALESCE(g.rolname, 'PUBLIC'), a.privilege_type
+                FROM raster_columns rc
+                JOIN pg_namespace n ON n.nspname = rc.r_table_schema
+                JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = rc.r_table_name
+                CROSS JOIN LATERAL aclexplode(
+                    COALESCE(c.relacl, acldefault('r', c.relowner))
+                ) a
+                LEFT JOIN pg_roles g ON g.oid = a.grantee
+                ORDER BY 1, 2, 3, 4
+                """
+            )
+            return [TablePrivilege(*row) for row in cur.fetchall()]
+
     def list_group_members(self, group_name: str) -> List[str]:
         """Lista membros de um grupo."""
         with self.conn.cursor() as cur:
-            cur.execute(
+            self._execute(
+                cur,
+                "list_group_members",
                 """
                 SELECT r.rolname
                 FROM pg_auth_members m
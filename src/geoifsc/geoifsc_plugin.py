@@ -11,7 +11,8 @@ from qgis.PyQt.QtCore import QTranslator, QCoreApplication, QLocale
 import builtins, sys
 from qgis.core import QgsMessageLog, Qgis
 
-from .raster_upload_dialog import RasterUploadDialog
+# O diálogo de upload (controlador, serviço, psycopg2 e widgets) é importado
+# apenas em run_raster_upload para não pesar na inicialização do QGIS.
 
 
 class GeoIFSCPlugin:
@@ -42,6 +43,7 @@ class GeoIFSCPlugin:
         # Variáveis de menu e ações
         self.menu = None
         self.actions = []
+        self.dialog = None
     
     def initGui(self):
         """Inicializa interface gráfica do plugin."""
@@ -88,13 +90,24 @@ class GeoIFSCPlugin:
             
             self.menu = None
             self.actions = []
+        
+        if self.dialog is not None:
+            self.dialog.shutdown()
+            self.dialog.close()
+            self.dialog.deleteLater()
+            self.dialog = None
     
     def run_raster_upload(self):
         """Executa diálogo de upload de raster de forma não bloqueante para manter o console acessível."""
         try:
-            # Armazena referência para não ser coletado e abre de forma não modal
-            self.dialog = RasterUploadDialog()
+            # Cria o diálogo apenas no primeiro uso e reutiliza a instância
+            # (mantém a referência para não ser coletado; abre não modal)
+            if self.dialog is None:
+                from .raster_upload_dialog import RasterUploadDialog
+                self.dialog = RasterUploadDialog()
             self.dialog.show()
+            self.dialog.raise_()
+            self.dialog.activateWindow()
         except Exception as e:
             from qgis.core import QgsMessageLog, Qgis
             QgsMessageLog.logMessage(
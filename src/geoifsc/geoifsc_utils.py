@@ -8,6 +8,7 @@ import shutil
 import subprocess
 import time
 import re
+import zipfile
 from typing import List, Optional, Tuple
 
 import psycopg2
@@ -210,3 +211,53 @@ def compute_next_suffix(base_name: str, existing_names: List[str]) -> str:
                 pass
     next_num = max(nums) + 1 if nums else 1
     return f"{base_name}_{next_num}"
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Cita um identificador SQL para uso em scripts enviados ao psql.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value: str) -> str:
+    """
+    Cita um literal de texto SQL para uso em scripts enviados ao psql.
+    """
+    return "'" + value.replace("'", "''") + "'"
+
+
+_VSIZIP_PATTERN = re.compile(r"^/vsizip/(.+?\.zip)/(.+)$", re.IGNORECASE)
+
+
+def is_gdal_virtual_path(path: str) -> bool:
+    """
+    Indica se o caminho usa um sistema de arquivos virtual do GDAL (/vsi...).
+    """
+    return path.startswith("/vsi")
+
+
+def vsizip_path(archive_path: str, member: str) -> str:
+    """
+    Monta o caminho GDAL (/vsizip/) para um arquivo dentro de um .zip.
+    """
+    archive = os.path.abspath(archive_path).replace(os.sep, "/")
+    return f"/vsizip/{archive}/{member}"
+
+
+def raster_path_size(path: str) -> int:
+    """
+    Retorna o tamanho em bytes de um raster, inclusive membros de .zip.
+
+    Raises:
+        OSError: se o arquivo (ou membro do arquivo compactado) não existir
+    """
+    match = _VSIZIP_PATTERN.match(path)
+    if match:
+        archive, member = match.groups()
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                return zf.getinfo(member).file_size
+        except (KeyError, zipfile.BadZipFile) as e:
+            raise OSError(f"Membro não encontrado em {archive}: {member}") from e
+    return os.path.getsize(path)
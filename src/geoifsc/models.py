@@ -1,6 +1,6 @@
 """Data models for user management."""
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
@@ -17,3 +17,32 @@ class Group:
     """Representa um grupo do PostgreSQL."""
 
     name: str
+
+
+@dataclass
+class TablePrivilege:
+    """Privilégio concedido a um role sobre uma tabela."""
+
+    schema: str
+    table: str
+    grantee: str
+    privilege: str
+
+
+@dataclass
+class NewUser:
+    """Dados de um usuário a ser criado em lote."""
+
+    username: str
+    password: str
+    valid_until: Optional[str] = None
+    groups: List[str] = field(default_factory=list)
+
+
+@dataclass
+class BulkUserResult:
+    """Resultado da criação de um usuário em lote."""
+
+    username: str
+    created: bool
+    error: Optional[str] = None
@@ -0,0 +1,104 @@
+"""
+Cache de comandos preparados por conexão.
+
+As consultas frequentes do ``DBManager`` são preparadas uma vez por sessão
+(``PREPARE``) e depois apenas executadas (``EXECUTE``), evitando que o
+servidor as analise e planeje a cada chamada. O cache tem tamanho limitado
+(LRU, com ``DEALLOCATE`` do comando descartado), é refeito quando a conexão
+do cursor muda de sessão no servidor (reconexão ou troca de conexão) e conta
+acertos e falhas.
+
+Comandos preparados pertencem à sessão do servidor: não use o cache atrás de
+poolers em modo transação (ex.: PgBouncer com ``pool_mode = transaction``),
+que podem executar cada transação em outra sessão.
+"""
+
+import itertools
+from collections import OrderedDict
+from typing import Dict, Sequence, Tuple
+
+from psycopg2 import sql
+
+DEFAULT_CACHE_SIZE = 32
+
+
+def to_positional(query: str) -> Tuple[str, int]:
+    """Converte marcadores ``%s`` do psycopg2 em ``$1..$n`` para o PREPARE."""
+    parts = query.split("%s")
+    text = parts[0]
+    for number, part in enumerate(parts[1:], start=1):
+        text += f"${number}{part}"
+    return text.replace("%%", "%"), len(parts) - 1
+
+
+class PreparedStatementCache:
+    """Comandos preparados da sessão corrente, com descarte LRU."""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        if max_size < 1:
+            raise ValueError("max_size deve ser ao menos 1")
+        self.max_size = max_size
+        self._statements: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._names = itertools.count(1)
+        self._session = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de uso do cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._statements),
+        }
+
+    def clear(self) -> None:
+        """Esquece os comandos preparados (sem DEALLOCATE)."""
+        self._statements.clear()
+
+    def _check_session(self, cur) -> None:
+        # Comandos preparados pertencem à sessão: a chave vem da conexão do
+        # cursor em uso, de modo que reconexões e trocas de conexão os refazem
+        conn = cur.connection
+        session = (id(conn), conn.get_backend_pid())
+        if session != self._session:
+            self._session = session
+            self.clear()
+
+    def execute(self, cur, key: str, query: str, params: Sequence = ()) -> None:
+        """
+        Executa ``query`` (com marcadores ``%s``) como comando preparado.
+
+        ``key`` identifica a consulta no cache; na primeira execução da
+        sessão o comando é preparado.
+        """
+        self._check_session(cur)
+        entry = self._statements.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._statements.move_to_end(key)
+        else:
+            self.misses += 1
+            text, count = to_positional(query)
+            name = f"geoifsc_stmt_{next(self._names)}"
+            cur.execute(
+                sql.SQL("PREPARE {} AS ").format(sql.Identifier(name)) + sql.SQL(text)
+            )
+            entry = (name, count)
+            self._statements[key] = entry
+            if len(self._statements) > self.max_size:
+                _, (old_name, _) = self._statements.popitem(last=False)
+                cur.execute(sql.SQL("DEALLOCATE {}").format(sql.Identifier(old_name)))
+                self.evictions += 1
+
+        name, count = entry
+        if count:
+            placeholders = sql.SQL(", ").join(sql.Placeholder() * count)
+            cur.execute(
+                sql.SQL("EXECUTE {} ({})").format(sql.Identifier(name), placeholders),
+                tuple(params),
+            )
+        else:
+            cur.execute(sql.SQL("EXECUTE {}").format(sql.Identifier(name)))
@@ -0,0 +1,205 @@
+"""
+Agregação de progresso entre threads com publicação em taxa fixa.
+
+Workers registram o andamento de cada arquivo com chamadas baratas e
+thread-safe; uma thread publicadora entrega, no máximo ``rate_hz`` vezes por
+segundo, um único ``ProgressSnapshot`` para a interface. Assim o loop de
+eventos do Qt recebe um sinal por intervalo, independentemente de quantos
+workers ou atualizações por tile existam.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterable, Optional
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_SUCCESS = "success"
+STATE_ERROR = "error"
+
+FINISHED_STATES = (STATE_SUCCESS, STATE_ERROR)
+
+
+@dataclass
+class FileProgress:
+    """Estado de progresso de um arquivo."""
+
+    path: str
+    state: str = STATE_PENDING
+    fraction: float = 0.0
+    bytes_total: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class ProgressSnapshot:
+    """Retrato consolidado do progresso de um lote.
+
+    ``files`` contém apenas os arquivos alterados desde o retrato anterior;
+    o consumidor mantém o estado acumulado, o que mantém cada publicação
+    barata mesmo com dezenas de milhares de arquivos.
+    """
+
+    percentage: int
+    files_completed: int
+    files_failed: int
+    total_files: int
+    files: Dict[str, FileProgress] = field(default_factory=dict)
+    throughput: float = 0.0  # bytes por segundo
+    eta: Optional[float] = None  # segundos restantes
+    elapsed: float = 0.0
+    finished: bool = False
+
+
+class ProgressAggregator:
+    """Coleta atualizações de qualquer número de workers e publica retratos."""
+
+    def __init__(
+        self,
+        publish: Callable[[ProgressSnapshot], None],
+        rate_hz: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz deve ser positivo")
+        self._publish = publish
+        self._interval = 1.0 / rate_hz
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._files: Dict[str, FileProgress] = {}
+        self._changed: Dict[str, FileProgress] = {}
+        self._total_weight = 0.0
+        self._done_weight = 0.0
+        self._total_bytes = 0
+        self._done_bytes = 0.0
+        self._completed = 0
+        self._failed = 0
+        self._started_at = clock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------------- Registro de progresso ----------------------
+
+    def start_batch(self, files: Iterable[str], sizes: Optional[Dict[str, int]] = None) -> None:
+        """Registra os arquivos do lote e seus tamanhos (quando conhecidos)."""
+        sizes = sizes or {}
+        with self._lock:
+            self._files = {
+                path: FileProgress(path=path, bytes_total=max(0, sizes.get(path, 0)))
+                for path in files
+            }
+            self._changed = {}
+            self._total_bytes = sum(f.bytes_total for f in self._files.values())
+            self._total_weight = float(sum(self._weight(f) for f in self._files.values()))
+            self._done_weight = 0.0
+            self._done_bytes = 0.0
+            self._completed = 0
+            self._failed = 0
+            self._started_at = self._clock()
+            self._dirty = True
+
+    def file_started(self, path: str) -> None:
+        """Marca o início do processamento de um arquivo."""
+        with self._lock:
+            entry = self._entry(path)
+            entry.state = STATE_RUNNING
+            self._mark(entry)
+
+    def file_progress(self, path: str, fraction: float) -> None:
+        """Atualiza a fração concluída (0..1) de um arquivo em andamento."""
+        with self._lock:
+            entry = self._entry(path)
+            self._advance(entry, fraction)
+            self._mark(entry)
+
+    def file_finished(self, path: str, success: bool, error: Optional[str] = None) -> None:
+        """Marca a conclusão de um arquivo, com sucesso ou erro."""
+        with self._lock:
+            entry = self._entry(path)
+            if entry.state in FINISHED_STATES:
+                return
+            self._advance(entry, 1.0)
+            entry.state = STATE_SUCCESS if success else STATE_ERROR
+            entry.error = error
+            if success:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._mark(entry)
+
+    # ---------------------- Publicação ----------------------
+
+    def snapshot(self, finished: bool = False) -> ProgressSnapshot:
+        """Monta um retrato do estado atual e zera a lista de alterações."""
+        with self._lock:
+            elapsed = max(self._clock() - self._started_at, 0.0)
+            done, total = self._done_weight, self._total_weight
+            percentage = int(done * 100 / total) if total else (100 if finished else 0)
+            throughput = self._done_bytes / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if done > 0 and elapsed > 0:
+                eta = (total - done) * elapsed / done
+            changed = {path: replace(entry) for path, entry in self._changed.items()}
+            self._changed = {}
+            self._dirty = False
+            return ProgressSnapshot(
+                percentage=min(percentage, 100),
+                files_completed=self._completed,
+                files_failed=self._failed,
+                total_files=len(self._files),
+                files=changed,
+                throughput=throughput,
+                eta=eta,
+                elapsed=elapsed,
+                finished=finished,
+            )
+
+    def start(self) -> None:
+        """Inicia a thread que publica retratos em taxa fixa."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="geoifsc-progress", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Encerra a publicação periódica e envia o retrato final."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._publish(self.snapshot(finished=True))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            if self._dirty:
+                self._publish(self.snapshot())
+
+    # ---------------------- Auxiliares (com lock adquirido) ----------------------
+
+    def _entry(self, path: str) -> FileProgress:
+        entry = self._files.get(path)
+        if entry is None:
+            entry = FileProgress(path=path)
+            self._files[path] = entry
+            self._total_weight += self._weight(entry)
+        return entry
+
+    def _weight(self, entry: FileProgress) -> float:
+        # Pondera por bytes quando o lote inteiro tem tamanho conhecido
+        return float(entry.bytes_total) if self._total_bytes else 1.0
+
+    def _advance(self, entry: FileProgress, fraction: float) -> None:
+        fraction = min(max(fraction, 0.0), 1.0)
+        delta = fraction - entry.fraction
+        if delta <= 0:
+            return
+        entry.fraction = fraction
+        self._done_weight += delta * self._weight(entry)
+        self._done_bytes += delta * entry.bytes_total
+
+    def _mark(self, entry: FileProgress) -> None:
+        self._changed[entry.path] = entry
+        self._dirty = True
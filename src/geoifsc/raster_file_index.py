@@ -0,0 +1,249 @@
+"""
+Índice de arquivos raster selecionados para upload.
+
+Mantém as linhas da lista de arquivos, com ordenação e filtro em memória,
+e a sondagem de metadados (tamanho, dimensões, bandas, CRS) via GDAL.
+Não depende de Qt: o modelo da interface (``raster_file_model``) delega a
+este índice, que permanece rápido mesmo com 100 mil linhas.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .geoifsc_utils import raster_path_size
+
+try:
+    from osgeo import gdal, osr
+    GDAL_AVAILABLE = True
+except ImportError:
+    GDAL_AVAILABLE = False
+
+# Tamanho de tile usado pelo uploader (raster2pgsql -t 512x512)
+UPLOAD_TILE_SIZE = 512
+# Cabeçalho aproximado de cada tile no formato raster do PostGIS (bytes)
+TILE_HEADER_BYTES = 61
+BAND_HEADER_BYTES = 9
+
+COLUMN_NAME = 0
+COLUMN_SIZE = 1
+COLUMN_DIMENSIONS = 2
+COLUMN_BANDS = 3
+COLUMN_CRS = 4
+COLUMN_TABLE_SIZE = 5
+
+COLUMN_TITLES = [
+    "Arquivo", "Tamanho", "Dimensões", "Bandas", "CRS", "Tabela (estim.)"
+]
+
+
+@dataclass
+class RasterFileInfo:
+    """Metadados de um arquivo raster exibidos na lista de seleção."""
+
+    path: str
+    size: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    bands: Optional[int] = None
+    crs: Optional[str] = None
+    estimated_table_bytes: Optional[int] = None
+    probed: bool = False
+    error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+def format_bytes(value: Optional[int]) -> str:
+    """Formata um tamanho em bytes para exibição."""
+    if value is None:
+        return ""
+    size = float(value)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def estimate_table_bytes(
+    width: int,
+    height: int,
+    bands: int,
+    bytes_per_sample: int,
+    tile_size: int = UPLOAD_TILE_SIZE
+) -> int:
+    """
+    Estima o tamanho da tabela PostGIS gerada pelo raster2pgsql.
+
+    Considera os pixels sem compressão e o cabeçalho de cada tile/banda.
+    """
+    tiles = -(-width // tile_size) * -(-height // tile_size)
+    pixels = width * height * bands * bytes_per_sample
+    headers = tiles * (TILE_HEADER_BYTES + bands * BAND_HEADER_BYTES)
+    return pixels + headers
+
+
+def probe_raster(path: str) -> RasterFileInfo:
+    """Lê os metadados de um raster sem carregar os pixels."""
+    info = RasterFileInfo(path=path, probed=True)
+    try:
+        info.size = raster_path_size(path)
+    except OSError as e:
+        info.error = str(e)
+    if not GDAL_AVAILABLE:
+        return info
+
+    try:
+        ds = gdal.Open(path)
+        if ds is None:
+            info.error = info.error or "GDAL não conseguiu abrir o arquivo"
+            return info
+        info.width = ds.RasterXSize
+        info.height = ds.RasterYSize
+        info.bands = ds.RasterCount
+        srs = ds.GetSpatialRef() if hasattr(ds, "GetSpatialRef") else None
+        if srs is None and ds.GetProjection():
+            srs = osr.SpatialReference(wkt=ds.GetProjection())
+        if srs is not None:
+            code = srs.GetAuthorityCode(None)
+            name = srs.GetAuthorityName(None)
+            info.crs = f"{name}:{code}" if code and name else srs.GetName()
+        if info.bands:
+            sample = gdal.GetDataTypeSize(ds.GetRasterBand(1).DataType) // 8
+            info.estimated_table_bytes = estimate_table_bytes(
+                info.width, info.height, info.bands, sample
+            )
+    except Exception as e:
+        info.error = str(e)
+    finally:
+        ds = None
+    return info
+
+
+def _sort_key(column: int) -> Callable[[RasterFileInfo], tuple]:
+    # Linhas ainda não sondadas ficam agrupadas no início (ordem crescente)
+    if column == COLUMN_NAME:
+        return lambda info: (info.name.lower(),)
+    if column == COLUMN_SIZE:
+        return lambda info: (info.size is not None, info.size or 0)
+    if column == COLUMN_DIMENSIONS:
+        return lambda info: (
+            info.width is not None, (info.width or 0) * (info.height or 0)
+        )
+    if column == COLUMN_BANDS:
+        return lambda info: (info.bands is not None, info.bands or 0)
+    if column == COLUMN_CRS:
+        return lambda info: (info.crs is not None, info.crs or "")
+    if column == COLUMN_TABLE_SIZE:
+        return lambda info: (
+            info.estimated_table_bytes is not None, info.estimated_table_bytes or 0
+        )
+    raise ValueError(f"Coluna inválida: {column}")
+
+
+class RasterFileIndex:
+    """Linhas da lista de arquivos com filtro e ordenação em memória."""
+
+    def __init__(self):
+        self._rows: List[RasterFileInfo] = []
+        self._positions: Dict[str, int] = {}
+        self._view: List[int] = []
+        self._view_positions: Optional[Dict[int, int]] = None
+        self._filter = ""
+        self._sort_column: Optional[int] = None
+        self._sort_descending = False
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    @property
+    def total(self) -> int:
+        """Número de arquivos, incluindo os ocultos pelo filtro."""
+        return len(self._rows)
+
+    def paths(self) -> List[str]:
+        """Caminhos de todos os arquivos, na ordem de inserção."""
+        return [info.path for info in self._rows]
+
+    @property
+    def in_insertion_order(self) -> bool:
+        """Indica se as linhas visíveis seguem a ordem de inserção (sem filtro/ordenação)."""
+        return not self._filter and self._sort_column is None
+
+    def new_paths(self, paths: Iterable[str]) -> List[str]:
+        """Filtra ``paths`` mantendo apenas caminhos ainda não presentes."""
+        seen = set()
+        result = []
+        for path in paths:
+            if path not in self._positions and path not in seen:
+                seen.add(path)
+                result.append(path)
+        return result
+
+    def set_files(self, paths: Iterable[str]) -> None:
+        """Substitui a lista de arquivos, mantendo os metadados já sondados."""
+        probed = {info.path: info for info in self._rows if info.probed}
+        self._rows = []
+        self._positions = {}
+        self.add_files(paths)
+        for position, info in enumerate(self._rows):
+            cached = probed.get(info.path)
+            if cached is not None:
+                self._rows[position] = cached
+
+    def add_files(self, paths: Iterable[str]) -> int:
+        """Acrescenta arquivos ainda não presentes; retorna quantos entraram."""
+        added = 0
+        for path in paths:
+            if path in self._positions:
+                continue
+            self._positions[path] = len(self._rows)
+            self._rows.append(RasterFileInfo(path=path))
+            added += 1
+        if added:
+            self._rebuild_view()
+        return added
+
+    def row(self, view_row: int) -> RasterFileInfo:
+        """Retorna a linha visível na posição ``view_row``."""
+        return self._rows[self._view[view_row]]
+
+    def update(self, info: RasterFileInfo) -> Optional[int]:
+        """Grava metadados sondados; retorna a linha visível afetada (se houver)."""
+        position = self._positions.get(info.path)
+        if position is None:
+            return None
+        self._rows[position] = info
+        if self._view_positions is None:
+            self._view_positions = {pos: i for i, pos in enumerate(self._view)}
+        return self._view_positions.get(position)
+
+    def set_filter(self, text: str) -> None:
+        """Mostra apenas arquivos cujo nome contém ``text`` (sem diferenciar caixa)."""
+        self._filter = text.strip().lower()
+        self._rebuild_view()
+
+    def sort(self, column: int, descending: bool = False) -> None:
+        """Ordena as linhas visíveis pela coluna indicada."""
+        self._sort_column = column
+        self._sort_descending = descending
+        self._rebuild_view()
+
+    def _rebuild_view(self) -> None:
+        if self._filter:
+            needle = self._filter
+            view = [
+                pos for pos, info in enumerate(self._rows)
+                if needle in info.name.lower()
+            ]
+        else:
+            view = list(range(len(self._rows)))
+        if self._sort_column is not None:
+            key = _sort_key(self._sort_column)
+            rows = self._rows
+            view.sort(key=lambda pos: key(rows[pos]), reverse=self._sort_descending)
+        self._view = view
+        self._view_positions = None
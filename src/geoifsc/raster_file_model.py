@@ -0,0 +1,160 @@
+"""
+Modelo Qt da lista de arquivos raster do diálogo de upload.
+
+As linhas são desenhadas sob demanda pela view; os metadados de cada arquivo
+só são sondados quando a linha fica visível, em um pool de threads, e
+preenchidos na interface assim que ficam prontos.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Set
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from .raster_file_index import (
+    COLUMN_BANDS, COLUMN_CRS, COLUMN_DIMENSIONS, COLUMN_NAME, COLUMN_SIZE,
+    COLUMN_TABLE_SIZE, COLUMN_TITLES, RasterFileIndex, RasterFileInfo,
+    format_bytes, probe_raster,
+)
+
+
+class RasterFileTableModel(QAbstractTableModel):
+    """Lista virtualizada de arquivos com colunas de metadados em segundo plano."""
+
+    # Emitido pelas threads de sondagem; entregue na thread da interface
+    _probe_finished = pyqtSignal(int, object)
+
+    def __init__(self, parent=None, probe_workers: int = 4):
+        super().__init__(parent)
+        self._index = RasterFileIndex()
+        self._pending: Set[str] = set()
+        self._generation = 0
+        self._probe_workers = probe_workers
+        # Criado sob demanda; encerrado em shutdown() e recriado se a lista voltar a ser exibida
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._probe_finished.connect(self._on_probe_finished)
+
+    # ---------------------- API do diálogo ----------------------
+
+    def set_files(self, paths: Iterable[str]) -> None:
+        """Substitui os arquivos exibidos."""
+        self.beginResetModel()
+        self._generation += 1
+        self._pending.clear()
+        self._index.set_files(paths)
+        self.endResetModel()
+
+    def add_files(self, paths: Iterable[str]) -> int:
+        """Acrescenta arquivos à lista; retorna quantos eram novos."""
+        paths = self._index.new_paths(paths)
+        if not paths:
+            return 0
+        if self._index.in_insertion_order:
+            # Inserção no fim preserva rolagem e seleção durante varreduras
+            first = len(self._index)
+            self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+            self._index.add_files(paths)
+            self.endInsertRows()
+        else:
+            self.beginResetModel()
+            self._index.add_files(paths)
+            self.endResetModel()
+        return len(paths)
+
+    def paths(self) -> List[str]:
+        """Caminhos de todos os arquivos, na ordem de seleção."""
+        return self._index.paths()
+
+    def total_files(self) -> int:
+        """Número de arquivos, incluindo os ocultos pelo filtro."""
+        return self._index.total
+
+    def set_filter(self, text: str) -> None:
+        """Filtra as linhas pelo nome do arquivo."""
+        self.beginResetModel()
+        self._index.set_filter(text)
+        self.endResetModel()
+
+    def shutdown(self) -> None:
+        """Descarta sondagens pendentes e encerra as threads do pool."""
+        self._generation += 1
+        self._pending.clear()
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------------- QAbstractTableModel ----------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._index)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_TITLES)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMN_TITLES[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        info = self._index.row(index.row())
+        if role == Qt.ToolTipRole:
+            return info.error or info.path
+        if role == Qt.TextAlignmentRole and index.column() != COLUMN_NAME:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role != Qt.DisplayRole:
+            return None
+        if not info.probed:
+            self._request_probe(info.path)
+        return self._display(info, index.column())
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.beginResetModel()
+        self._index.sort(column, descending=order == Qt.DescendingOrder)
+        self.endResetModel()
+
+    # ---------------------- Sondagem ----------------------
+
+    def _request_probe(self, path: str) -> None:
+        if path in self._pending:
+            return
+        self._pending.add(path)
+        generation = self._generation
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._probe_workers, thread_name_prefix="geoifsc-probe"
+            )
+        future = self._executor.submit(probe_raster, path)
+        future.add_done_callback(
+            lambda f: self._probe_finished.emit(generation, f.result())
+            if not f.cancelled() and f.exception() is None
+            else None
+        )
+
+    def _on_probe_finished(self, generation: int, info: RasterFileInfo) -> None:
+        if generation != self._generation:
+            return
+        self._pending.discard(info.path)
+        row = self._index.update(info)
+        if row is not None:
+            self.dataChanged.emit(
+                self.index(row, COLUMN_SIZE), self.index(row, COLUMN_TABLE_SIZE)
+            )
+
+    @staticmethod
+    def _display(info: RasterFileInfo, column: int):
+        if column == COLUMN_NAME:
+            return info.name
+        if column == COLUMN_SIZE:
+            return format_bytes(info.size)
+        if column == COLUMN_DIMENSIONS:
+            return f"{info.width} × {info.height}" if info.width is not None else ""
+        if column == COLUMN_BANDS:
+            return "" if info.bands is None else str(info.bands)
+        if column == COLUMN_CRS:
+            return info.crs or ""
+        if column == COLUMN_TABLE_SIZE:
+            return format_bytes(info.estimated_table_bytes)
+        return None
@@ -0,0 +1,228 @@
+"""
+Varredura de pastas em busca de arquivos raster.
+
+Percorre diretórios com ``os.scandir`` em uma thread de fundo, filtra por
+extensão (e opcionalmente por abertura no GDAL), expande arquivos ``.zip``
+em caminhos ``/vsizip/`` e entrega os resultados em lotes, com suporte a
+cancelamento.
+"""
+
+import os
+import threading
+import zipfile
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .geoifsc_utils import vsizip_path
+
+try:
+    from osgeo import gdal
+    GDAL_AVAILABLE = True
+except ImportError:
+    GDAL_AVAILABLE = False
+
+RASTER_EXTENSIONS = frozenset({
+    ".tif", ".tiff", ".vrt", ".img", ".jp2", ".jpg", ".jpeg", ".png",
+    ".gif", ".bmp", ".asc",
+})
+ARCHIVE_EXTENSIONS = frozenset({".zip"})
+
+
+def _extension(name: str) -> str:
+    return os.path.splitext(name)[1].lower()
+
+
+def is_raster_candidate(name: str) -> bool:
+    """Indica se o nome tem extensão de raster ou de arquivo compactado."""
+    ext = _extension(name)
+    return ext in RASTER_EXTENSIONS or ext in ARCHIVE_EXTENSIONS
+
+
+def gdal_can_open(path: str) -> bool:
+    """Verifica (silenciosamente) se o GDAL consegue abrir o raster."""
+    if not GDAL_AVAILABLE:
+        return True
+    gdal.PushErrorHandler("CPLQuietErrorHandler")
+    try:
+        return gdal.OpenEx(path, gdal.OF_RASTER) is not None
+    except Exception:
+        return False
+    finally:
+        gdal.PopErrorHandler()
+
+
+def _archive_members(archive_path: str) -> Iterator[str]:
+    try:
+        with zipfile.ZipFile(archive_path) as zf:
+            names = sorted(
+                info.filename for info in zf.infolist()
+                if not info.is_dir() and _extension(info.filename) in RASTER_EXTENSIONS
+            )
+    except (OSError, zipfile.BadZipFile):
+        return
+    for name in names:
+        yield vsizip_path(archive_path, name)
+
+
+def iter_raster_paths(
+    roots: Iterable[str],
+    cancel_event: Optional[threading.Event] = None,
+    check_openable: bool = True,
+) -> Iterator[str]:
+    """
+    Gera caminhos de raster encontrados sob ``roots`` (pastas ou arquivos).
+
+    Pastas são percorridas recursivamente sem seguir links simbólicos;
+    arquivos ``.zip`` são expandidos nos membros raster que contêm.
+    """
+    def cancelled() -> bool:
+        return cancel_event is not None and cancel_event.is_set()
+
+    def emit_file(path: str) -> Iterator[str]:
+        ext = _extension(path)
+        if ext in ARCHIVE_EXTENSIONS:
+            candidates = _archive_members(path)
+        elif ext in RASTER_EXTENSIONS:
+            candidates = iter((path,))
+        else:
+            return
+        for candidate in candidates:
+            if cancelled():
+                return
+            if not check_openable or gdal_can_open(candidate):
+                yield candidate
+
+    for root in roots:
+        if cancelled():
+            return
+        if not os.path.isdir(root):
+            yield from emit_file(root)
+            continue
+
+        stack = [root]
+        while stack:
+            if cancelled():
+                return
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and is_raster_candidate(entry.name):
+                        yield from emit_file(entry.path)
+                except OSError:
+                    continue
+                if cancelled():
+                    return
+            # Empilha em ordem reversa para visitar as subpastas em ordem alfabética
+            stack.extend(reversed(subdirs))
+
+
+def scan_in_batches(
+    roots: Iterable[str],
+    on_batch: Callable[[List[str]], None],
+    batch_size: int = 500,
+    cancel_event: Optional[threading.Event] = None,
+    check_openable: bool = True,
+) -> int:
+    """Executa a varredura entregando lotes a ``on_batch``; retorna o total."""
+    batch: List[str] = []
+    total = 0
+    for path in iter_raster_paths(roots, cancel_event, check_openable):
+        batch.append(path)
+        if len(batch) >= batch_size:
+            on_batch(batch)
+            total += len(batch)
+            batch = []
+    if batch and not (cancel_event and cancel_event.is_set()):
+        on_batch(batch)
+        total += len(batch)
+    return total
+
+
+class RasterFolderScanner(QObject):
+    """
+    Executa a varredura em thread separada e emite lotes via sinais Qt.
+
+    Cada varredura recebe um identificador, enviado junto com os sinais.
+    Lotes já enfileirados de uma varredura cancelada ou substituída continuam
+    chegando à interface; quem os recebe deve descartá-los com
+    ``is_active``. Uma varredura cancelada não impede que outra comece
+    enquanto sua thread termina.
+    """
+
+    batch_found = pyqtSignal(int, list)  # identificador da varredura, caminhos
+    scan_finished = pyqtSignal(int, int, bool)  # identificador, total encontrado, cancelado
+
+    def __init__(self, batch_size: int = 500, check_openable: bool = True):
+        super().__init__()
+        self.batch_size = batch_size
+        self.check_openable = check_openable
+        self._cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Threads de varreduras canceladas que ainda não terminaram
+        self._stopping: List[threading.Thread] = []
+        self._scan_id = 0
+
+    @property
+    def scan_id(self) -> int:
+        """Identificador da varredura mais recente."""
+        return self._scan_id
+
+    def is_running(self) -> bool:
+        """Indica se há uma varredura em andamento."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def is_current(self, scan_id: int) -> bool:
+        """Indica se ``scan_id`` é a varredura mais recente (mesmo que cancelada)."""
+        return scan_id == self._scan_id
+
+    def is_active(self, scan_id: int) -> bool:
+        """Indica se lotes de ``scan_id`` ainda devem ser aceitos."""
+        return self.is_current(scan_id) and not self._cancel_event.is_set()
+
+    def scan(self, roots: List[str]) -> bool:
+        """Inicia a varredura; retorna False se outra (não cancelada) estiver em andamento."""
+        if self.is_running():
+            if not self._cancel_event.is_set():
+                return False
+            self._stopping.append(self._thread)
+        self._stopping = [thread for thread in self._stopping if thread.is_alive()]
+        self._scan_id += 1
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._worker, args=(self._scan_id, list(roots), self._cancel_event),
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def cancel(self) -> None:
+        """Solicita o cancelamento da varredura em andamento."""
+        self._cancel_event.set()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> bool:
+        """Cancela a varredura e aguarda as threads; retorna False se alguma não terminou a tempo."""
+        self.cancel()
+        threads = self._stopping + ([self._thread] if self._thread is not None else [])
+        for thread in threads:
+            thread.join(timeout)
+        self._stopping = [thread for thread in self._stopping if thread.is_alive()]
+        return not self._stopping and not self.is_running()
+
+    def _worker(self, scan_id: int, roots: List[str], cancel_event: threading.Event) -> None:
+        total = scan_in_batches(
+            roots,
+            lambda batch: self.batch_found.emit(scan_id, batch),
+            batch_size=self.batch_size,
+            cancel_event=cancel_event,
+            check_openable=self.check_openable,
+        )
+        self.scan_finished.emit(scan_id, total, cancel_event.is_set())
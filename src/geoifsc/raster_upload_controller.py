@@ -15,10 +15,9 @@ class RasterUploadController(QObject):
     
     connection_tested = pyqtSignal(bool, str)
     schemas_loaded = pyqtSignal(list)
-    upload_progress = pyqtSignal(int)
+    upload_snapshot = pyqtSignal(object)
     upload_started = pyqtSignal()
     upload_completed = pyqtSignal()
-    file_processing_started = pyqtSignal(str)
     file_processing_success = pyqtSignal(str)
     file_processing_error = pyqtSignal(str, str)
     log_message = pyqtSignal(str)
@@ -31,8 +30,7 @@ class RasterUploadController(QObject):
     
     def _setup_connections(self):
         """Configura conexões de sinais do serviço."""
-        self._uploader_service.progress_updated.connect(self.upload_progress.emit)
-        self._uploader_service.file_upload_started.connect(self.file_processing_started.emit)
+        self._uploader_service.progress_snapshot.connect(self.upload_snapshot.emit)
         self._uploader_service.file_upload_success.connect(self.file_processing_success.emit)
         self._uploader_service.file_upload_error.connect(self.file_processing_error.emit)
         self._uploader_service.upload_completed.connect(self.upload_completed.emit)
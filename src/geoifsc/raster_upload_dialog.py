@@ -12,7 +12,7 @@ from typing import List, Optional
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QGroupBox,
     QPushButton, QLabel, QLineEdit, QSpinBox, QCheckBox, QComboBox,
-    QListWidget, QPlainTextEdit, QProgressBar, QScrollArea,
+    QTableView, QHeaderView, QPlainTextEdit, QProgressBar, QScrollArea,
     QWidget, QFileDialog, QSplitter, QFrame, QSizePolicy, QMessageBox
 )
 from PyQt5.QtCore import Qt, pyqtSlot, pyqtSignal
@@ -29,8 +29,12 @@ try:
 except ImportError:
     QGIS_AVAILABLE = False
 
+from .raster_file_model import RasterFileTableModel
+from .raster_scanner import RASTER_EXTENSIONS, RasterFolderScanner
 from .raster_upload_controller import RasterUploadController
-from .raster_upload_params import ConnectionParams, RasterUploadParams
+from .raster_upload_params import (
+    ConnectionParams, GRANT_MODE_DEFAULT_PRIVILEGES, GRANT_MODE_TABLES, RasterUploadParams
+)
 
 
 class ConnectionContainer(QGroupBox):
@@ -385,7 +389,9 @@ class HelpPanel(QFrame):
 <b>1. Selecionar Arquivos:</b><br>
 • Clique em "Selecionar Rasters"<br>
 • Formatos: TIFF, JPEG, PNG, etc.<br>
-• Seleção múltipla permitida<br><br>
+• Seleção múltipla permitida<br>
+• "Selecionar Pasta" ou arrastar pastas busca rasters recursivamente<br>
+• Arquivos .vrt e rasters dentro de .zip são reconhecidos<br><br>
 
 <b>2. Configurar Conexão:</b><br>
 • Selecione uma conexão do QGIS<br>
@@ -444,9 +450,12 @@ class RasterUploadDialog(QDialog):
         # Tornar diálogo não-modal para não bloquear o console Python do QGIS
         self.setModal(False)
         self.controller = RasterUploadController()
-        self.selected_files: List[str] = []
+        self.folder_scanner = RasterFolderScanner()
+        self._current_upload_file: Optional[str] = None
         self._setup_ui()
         self._connect_signals()
+        # Aceita pastas, rasters e .zip arrastados para o diálogo
+        self.setAcceptDrops(True)
         self.setWindowTitle("Enviar Raster → PostGIS")
         self.resize(1200, 800)
     
@@ -497,17 +506,54 @@ class RasterUploadDialog(QDialog):
         self.select_files_btn.clicked.connect(self._select_files)
         btn_layout.addWidget(self.select_files_btn)
         
+        self.select_folder_btn = QPushButton("Selecionar Pasta")
+        self.select_folder_btn.setToolTip(
+            "Busca rasters recursivamente (inclui .vrt e arquivos dentro de .zip)"
+        )
+        self.select_folder_btn.clicked.connect(self._select_folder)
+        btn_layout.addWidget(self.select_folder_btn)
+        
+        self.cancel_scan_btn = QPushButton("Cancelar Busca")
+        self.cancel_scan_btn.clicked.connect(self.folder_scanner.cancel)
+        self.cancel_scan_btn.setVisible(False)
+        btn_layout.addWidget(self.cancel_scan_btn)
+        
         self.clear_selection_btn = QPushButton("Limpar Seleção")
         self.clear_selection_btn.clicked.connect(self._clear_selection)
         btn_layout.addWidget(self.clear_selection_btn)
         
         btn_layout.addStretch()
+        
+        self.files_filter_edit = QLineEdit()
+        self.files_filter_edit.setPlaceholderText("Filtrar por nome...")
+        self.files_filter_edit.setClearButtonEnabled(True)
+        self.files_filter_edit.textChanged.connect(self._on_files_filter_changed)
+        btn_layout.addWidget(self.files_filter_edit)
         layout.addLayout(btn_layout)
         
-        # Lista de arquivos
-        self.files_list = QListWidget()
-        self.files_list.setMaximumHeight(150)
-        layout.addWidget(self.files_list)
+        # Lista de arquivos (modelo/view: só as linhas visíveis são desenhadas
+        # e sondadas, o que mantém a lista fluida com dezenas de milhares de tiles)
+        self.files_model = RasterFileTableModel(self)
+        self.files_view = QTableView()
+        self.files_view.setModel(self.files_model)
+        self.files_view.setSortingEnabled(True)
+        self.files_view.setSelectionBehavior(QTableView.SelectRows)
+        self.files_view.setWordWrap(False)
+        self.files_view.setMinimumHeight(150)
+        self.files_view.setMaximumHeight(250)
+        vertical_header = self.files_view.verticalHeader()
+        vertical_header.setVisible(False)
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(20)
+        horizontal_header = self.files_view.horizontalHeader()
+        horizontal_header.setSectionResizeMode(QHeaderView.Interactive)
+        horizontal_header.setStretchLastSection(True)
+        horizontal_header.resizeSection(0, 260)
+        layout.addWidget(self.files_view)
+        
+        self.files_count_label = QLabel("Nenhum arquivo selecionado")
+        self.files_count_label.setStyleSheet("color: gray;")
+        layout.addWidget(self.files_count_label)
         
         parent_layout.addWidget(group)
     
@@ -564,6 +610,17 @@ class RasterUploadDialog(QDialog):
             info_label.setStyleSheet("color: gray; font-style: italic;")
             layout.addWidget(info_label, 3, 2)
         
+        # Grupos que recebem SELECT nas tabelas criadas
+        layout.addWidget(QLabel("Conceder SELECT a:"), 4, 0)
+        self.grant_groups_edit = QLineEdit()
+        self.grant_groups_edit.setPlaceholderText("Grupos separados por vírgula (opcional)")
+        layout.addWidget(self.grant_groups_edit, 4, 1, 1, 2)
+        
+        self.grant_default_check = QCheckBox(
+            "Aplicar como privilégio padrão do esquema (inclui tabelas futuras)"
+        )
+        layout.addWidget(self.grant_default_check, 5, 0, 1, 3)
+        
         parent_layout.addWidget(group)
     
     def _get_srid_value(self) -> int:
@@ -646,10 +703,9 @@ class RasterUploadDialog(QDialog):
     
     def _connect_signals(self):
         """Conecta sinais do controlador."""
-        self.controller.upload_progress.connect(self._on_upload_progress)
+        self.controller.upload_snapshot.connect(self._on_upload_snapshot)
         self.controller.upload_started.connect(self._on_upload_started)
         self.controller.upload_completed.connect(self._on_upload_completed)
-        self.controller.file_processing_started.connect(self._on_file_started)
         self.controller.file_processing_success.connect(self._on_file_success)
         self.controller.file_processing_error.connect(self._on_file_error)
         self.controller.log_message.connect(self._on_log_message)
@@ -658,37 +714,104 @@ class RasterUploadDialog(QDialog):
         # Conecta sinais para atualizar estado do botão "Enviar Rasters"
         self.controller.connection_tested.connect(lambda success, msg: self._update_upload_button_state())
         self.controller.schemas_loaded.connect(lambda schemas: self._update_upload_button_state())
+        
+        # Varredura de pastas em segundo plano
+        self.folder_scanner.batch_found.connect(self._on_scan_batch)
+        self.folder_scanner.scan_finished.connect(self._on_scan_finished)
     
     @pyqtSlot()
     def _select_files(self):
         """Seleciona arquivos raster."""
-        file_filter = "Raster Files (*.tif *.tiff *.jpg *.jpeg *.png *.gif *.bmp);;All Files (*)"
+        patterns = " ".join(f"*{ext}" for ext in sorted(RASTER_EXTENSIONS))
+        file_filter = f"Raster Files ({patterns});;All Files (*)"
         files, _ = QFileDialog.getOpenFileNames(
             self, "Selecionar Arquivos Raster", "", file_filter
         )
         
         if files:
-            self.selected_files = files
-            self._update_files_list()
+            self.folder_scanner.cancel()
+            self.files_model.set_files(files)
+            self._update_files_count()
             self._update_upload_button_state()
     
+    @pyqtSlot()
+    def _select_folder(self):
+        """Seleciona uma pasta e busca rasters nela recursivamente."""
+        folder = QFileDialog.getExistingDirectory(self, "Selecionar Pasta com Rasters")
+        if folder:
+            self._start_scan([folder])
+    
+    def _start_scan(self, roots: List[str]):
+        """Inicia a busca de rasters em segundo plano."""
+        if not self.folder_scanner.scan(roots):
+            self._log("Uma busca de arquivos já está em andamento")
+            return
+        self._log(f"Buscando rasters em: {', '.join(roots)}")
+        self.cancel_scan_btn.setVisible(True)
+    
+    @pyqtSlot(int, list)
+    def _on_scan_batch(self, scan_id: int, paths: List[str]):
+        """Acrescenta um lote de arquivos encontrados pela busca."""
+        # Lotes de uma busca cancelada (ex.: pela limpeza da lista) ainda
+        # podem estar na fila de eventos
+        if not self.folder_scanner.is_active(scan_id):
+            return
+        self.files_model.add_files(paths)
+        self._update_files_count()
+        self._update_upload_button_state()
+    
+    @pyqtSlot(int, int, bool)
+    def _on_scan_finished(self, scan_id: int, total: int, cancelled: bool):
+        """Finaliza a busca de arquivos."""
+        if not self.folder_scanner.is_current(scan_id):
+            return
+        self.cancel_scan_btn.setVisible(False)
+        status = "cancelada" if cancelled else "concluída"
+        self._log(f"Busca de rasters {status}: {total} arquivo(s) encontrado(s)")
+    
+    def dragEnterEvent(self, event):
+        """Aceita arquivos e pastas arrastados."""
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+        else:
+            super().dragEnterEvent(event)
+    
+    def dropEvent(self, event):
+        """Busca rasters nos arquivos e pastas soltos no diálogo."""
+        roots = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if roots:
+            event.acceptProposedAction()
+            self._start_scan(roots)
+    
     @pyqtSlot()
     def _clear_selection(self):
         """Limpa seleção de arquivos."""
-        self.selected_files.clear()
-        self._update_files_list()
+        self.folder_scanner.cancel()
+        self.files_model.set_files([])
+        self._update_files_count()
         self._update_upload_button_state()
     
-    def _update_files_list(self):
-        """Atualiza lista de arquivos selecionados."""
-        self.files_list.clear()
-        for file_path in self.selected_files:
-            filename = Path(file_path).name
-            self.files_list.addItem(f"{filename} ({file_path})")
+    def _update_files_count(self):
+        """Atualiza contagem de arquivos exibidos/selecionados."""
+        total = self.files_model.total_files()
+        shown = self.files_model.rowCount()
+        if not total:
+            text = "Nenhum arquivo selecionado"
+        elif shown == total:
+            text = f"{total} arquivo(s) selecionado(s)"
+        else:
+            text = f"{shown} de {total} arquivo(s) exibidos"
+        self.files_count_label.setText(text)
+    
+    @pyqtSlot(str)
+    def _on_files_filter_changed(self, text: str):
+        """Filtra a lista de arquivos pelo nome."""
+        self.files_model.set_filter(text)
+        self._update_files_count()
     
     def _update_upload_button_state(self):
         """Atualiza estado do botão de upload."""
-        has_files = bool(self.selected_files)
+        has_files = self.files_model.total_files() > 0
         connection = self.connection_container.get_connection_params()
         has_connection = connection is not None
         
@@ -703,11 +826,18 @@ class RasterUploadDialog(QDialog):
             return
         
         params = RasterUploadParams(
-            raster_files=self.selected_files.copy(),
+            raster_files=self.files_model.paths(),
             connection=connection,
             table_name_prefix=self.table_prefix_edit.text().strip(),
             srid=self._get_srid_value(),
-            overwrite=self.overwrite_check.isChecked()
+            overwrite=self.overwrite_check.isChecked(),
+            grant_select_to=[
+                g.strip() for g in self.grant_groups_edit.text().split(",") if g.strip()
+            ],
+            grant_mode=(
+                GRANT_MODE_DEFAULT_PRIVILEGES if self.grant_default_check.isChecked()
+                else GRANT_MODE_TABLES
+            )
         )
         
         self.controller.start_upload(params)
@@ -717,10 +847,28 @@ class RasterUploadDialog(QDialog):
         """Cancela upload em andamento."""
         self.controller.cancel_upload()
     
-    @pyqtSlot(int)
-    def _on_upload_progress(self, progress: int):
-        """Atualiza progresso do upload."""
-        self.progress_bar.setValue(progress)
+    @pyqtSlot(object)
+    def _on_upload_snapshot(self, snapshot):
+        """Atualiza barra e rótulo de progresso a partir do retrato agregado."""
+        self.progress_bar.setValue(snapshot.percentage)
+        
+        for path, entry in snapshot.files.items():
+            if entry.state == "running":
+                self._current_upload_file = path
+            elif path == self._current_upload_file:
+                self._current_upload_file = None
+        
+        parts = []
+        if self._current_upload_file:
+            parts.append(f"Processando: {Path(self._current_upload_file).name}")
+        done = snapshot.files_completed + snapshot.files_failed
+        parts.append(f"{done}/{snapshot.total_files} arquivos")
+        if snapshot.throughput > 0:
+            parts.append(f"{snapshot.throughput / (1024 * 1024):.1f} MB/s")
+        if snapshot.eta is not None and not snapshot.finished:
+            minutes, seconds = divmod(int(snapshot.eta), 60)
+            parts.append(f"ETA {minutes:02d}:{seconds:02d}")
+        self.progress_label.setText(" · ".join(parts))
     
     @pyqtSlot()
     def _on_upload_started(self):
@@ -728,6 +876,7 @@ class RasterUploadDialog(QDialog):
         self.progress_bar.setVisible(True)
         self.progress_label.setVisible(True)
         self.progress_bar.setValue(0)
+        self._current_upload_file = None
         self.upload_btn.setVisible(False)
         self.cancel_btn.setVisible(True)
         self._log("Upload iniciado...")
@@ -741,11 +890,6 @@ class RasterUploadDialog(QDialog):
         self.cancel_btn.setVisible(False)
         self._log("Upload concluído.")
     
-    @pyqtSlot(str)
-    def _on_file_started(self, filename: str):
-        """Callback para início do processamento de arquivo."""
-        self.progress_label.setText(f"Processando: {Path(filename).name}")
-    
     @pyqtSlot(str)
     def _on_file_success(self, filename: str):
         """Callback para sucesso no processamento de arquivo."""
@@ -771,6 +915,21 @@ class RasterUploadDialog(QDialog):
         else:
             self._log(f"Falha ao conectar: {message}")
     
+    def shutdown(self):
+        """Cancela a busca de arquivos e encerra as sondagens em segundo plano."""
+        self.folder_scanner.stop()
+        self.files_model.shutdown()
+
+    def closeEvent(self, event):
+        """Interrompe o trabalho em segundo plano ao fechar o diálogo."""
+        self.shutdown()
+        super().closeEvent(event)
+
+    def done(self, result):
+        """Interrompe o trabalho em segundo plano ao aceitar/rejeitar o diálogo."""
+        self.shutdown()
+        super().done(result)
+
     def _log(self, message: str):
         """Adiciona mensagem ao log."""
         self.logs_text.appendPlainText(message)
@@ -4,9 +4,13 @@ Modelos de dados para upload de raster.
 Este módulo define as classes de dados usadas no sistema de upload.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 
+# Como conceder SELECT aos grupos após o upload
+GRANT_MODE_TABLES = "tables"  # um GRANT sobre todas as tabelas criadas no lote
+GRANT_MODE_DEFAULT_PRIVILEGES = "default_privileges"  # ALTER DEFAULT PRIVILEGES no esquema
+
 
 @dataclass
 class ConnectionParams:
@@ -32,6 +36,8 @@ class RasterUploadParams:
     raster2pgsql_path: Optional[str] = None
     psql_path: Optional[str] = None
     cancel_check_func: Optional[callable] = None  # Adicionado cancel_check_func
+    grant_select_to: List[str] = field(default_factory=list)  # Grupos que recebem SELECT
+    grant_mode: str = GRANT_MODE_TABLES
 
 
 @dataclass
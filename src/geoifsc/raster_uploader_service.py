@@ -1,381 +1,851 @@
-"""
-Serviço para upload de raster para PostGIS com fallback automático.
-"""
-
-import os
-import sys
-import threading
-from pathlib import Path
-from typing import Optional, Tuple
-from datetime import datetime
-
-from PyQt5.QtCore import QObject, pyqtSignal
-from qgis.core import QgsApplication
-
-from .raster_upload_params import RasterUploadParams
-from .geoifsc_utils import (
-    find_executable, get_postgres_possible_paths, run_subprocess_with_cancel,
-    fetch_existing_table_names, compute_next_suffix
-)
-
-
-class RasterUploaderService(QObject):
-    """Serviço para upload de raster para PostGIS."""
-    
-    progress_updated = pyqtSignal(int)
-    file_upload_started = pyqtSignal(str)
-    file_upload_success = pyqtSignal(str)
-    file_upload_error = pyqtSignal(str, str)
-    upload_completed = pyqtSignal()
-    log_message = pyqtSignal(str)
-    
-    def __init__(self):
-        super().__init__()
-        
-        # ─── INJEÇÃO DO QGIS_BIN NO PATH ─────────────────────────────────────────
-        try:
-            # prefixPath é algo como "C:/Program Files/QGIS 3.xx/apps/qgis-ltr"
-            prefix = QgsApplication.prefixPath()
-            apps_dir = os.path.dirname(prefix)           # ".../apps"
-            root_dir = os.path.dirname(apps_dir)         # ".../QGIS 3.xx" ou "C:/OSGeo4W64"
-            # Possíveis pastas "bin" onde o QGIS/OSGeo4W instala os executáveis
-            for p in (
-                os.path.join(apps_dir, 'bin'),           # standalone installer
-                os.path.join(root_dir, 'bin')            # OSGeo4W64/bin
-            ):
-                if os.path.isdir(p):
-                    os.environ['PATH'] = p + os.pathsep + os.environ.get('PATH', '')
-                    self._log(f"Adicionado ao PATH: {p}")
-        except Exception as e:
-            self._log(f"Aviso: Não foi possível estender PATH do QGIS: {e}")
-        # ─────────────────────────────────────────────────────────────────────────
-        
-        self._is_cancelled = False
-        self._upload_thread: Optional[threading.Thread] = None
-    
-    def _log(self, message: str):
-        """Emite mensagem de log com timestamp."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}"
-        self.log_message.emit(formatted_message)
-    
-    def upload_rasters(self, params: RasterUploadParams):
-        """Inicia upload de rasters em thread separada."""
-        if self._upload_thread and self._upload_thread.is_alive():
-            self._log("Upload já está em andamento")
-            return
-        
-        self._is_cancelled = False
-        self._upload_thread = threading.Thread(
-            target=self._upload_rasters_worker,
-            args=(params,)
-        )
-        self._upload_thread.daemon = True
-        self._upload_thread.start()
-    
-    def cancel_upload(self):
-        """Cancela o upload em andamento."""
-        self._is_cancelled = True
-        self._log("Upload cancelado pelo usuário")
-    
-    def _upload_rasters_worker(self, params: RasterUploadParams):
-        """Worker thread para upload de rasters."""
-        self._log(f"Iniciando upload de {len(params.raster_files)} arquivos")
-        
-        total_files = len(params.raster_files)
-        
-        for i, raster_file in enumerate(params.raster_files):
-            if self._is_cancelled:
-                self._log("Upload cancelado")
-                break
-            
-            # Calcula progresso
-            progress = int((i / total_files) * 100)
-            self.progress_updated.emit(progress)
-            
-            # Nome da tabela baseado no basename do arquivo
-            file_name = Path(raster_file).stem
-            table_name = f"{params.table_name_prefix}{file_name}" if params.table_name_prefix else file_name
-            
-            self.file_upload_started.emit(raster_file)
-            self._log(f"Enviando {file_name} → {table_name}")
-            
-            try:
-                success = self._upload_single_raster(
-                    raster_file, table_name, params
-                )
-                
-                if success:
-                    self.file_upload_success.emit(raster_file)
-                    self._log(f"✓ {file_name} enviado com sucesso")
-                else:
-                    self.file_upload_error.emit(raster_file, "Falha no upload")
-                    self._log(f"✗ Falha ao enviar {file_name}")
-                    
-            except Exception as e:
-                error_msg = str(e)
-                self.file_upload_error.emit(raster_file, error_msg)
-                self._log(f"✗ Erro ao enviar {file_name}: {error_msg}")
-        
-        # Progresso final
-        if not self._is_cancelled:
-            self.progress_updated.emit(100)
-            self._log("Upload concluído")
-        
-        self.upload_completed.emit()
-    
-    def _determine_upload_mode(self, file_size: int) -> Tuple[str, str, int]:
-        """
-        Determina o modo de upload, tamanho de tile e timeout com base no tamanho do arquivo.
-
-        Args:
-            file_size: Tamanho do arquivo em bytes.
-
-        Returns:
-            Uma tupla contendo o modo de upload, tamanho de tile e timeout.
-        """
-        if file_size <= 100 * 1024 * 1024:  # ≤ 100 MB
-            return "SQL+psql", "512x512", 300  # Mudado de "auto" para "512x512" para melhor performance
-        elif file_size <= 500 * 1024 * 1024:  # 100 MB < tamanho ≤ 500 MB
-            return "Direct load", "512x512", 600
-        else:  # > 500 MB
-            return "Out-of-DB", "512x512", 1200
-
-    def _upload_single_raster(
-        self,
-        raster_file: str,
-        table_name: str,
-        params: RasterUploadParams
-    ) -> bool:
-        """
-        Carrega um único raster usando raster2pgsql e psql.
-        """
-        # Valida se o arquivo raster existe
-        if not os.path.exists(raster_file):
-            self._log(f"ERRO: Arquivo raster não encontrado: {raster_file}")
-            return False
-
-        # Obtém o tamanho do arquivo
-        try:
-            file_size = os.path.getsize(raster_file)
-            self._log(f"Tamanho do arquivo: {file_size / (1024*1024):.2f} MB")
-        except Exception as e:
-            self._log(f"ERRO: Não foi possível obter tamanho do arquivo: {e}")
-            return False
-
-        # Determina o modo de upload, tamanho de tile e timeout
-        mode, tile_size, timeout = self._determine_upload_mode(file_size)
-        self._log(f"Modo de upload: {mode}, Tamanho de tile: {tile_size}, Timeout: {timeout}s")
-
-        # Localiza os executáveis
-        raster2pgsql = params.raster2pgsql_path or find_executable("raster2pgsql", get_postgres_possible_paths("raster2pgsql"))
-        psql = params.psql_path or find_executable("psql", get_postgres_possible_paths("psql"))
-
-        if not raster2pgsql or not os.path.exists(raster2pgsql):
-            self._log("ERRO: raster2pgsql não encontrado!")
-            return False
-
-        if not psql or not os.path.exists(psql):
-            self._log("ERRO: psql não encontrado!")
-            return False
-
-        # Logs detalhados dos executáveis encontrados
-        self._log(f"Usando raster2pgsql: {raster2pgsql}")
-        self._log(f"Usando psql: {psql}")
-        
-        # Verificação de GDAL (diagnóstico)
-        self._check_gdal_environment()
-        
-        # Verificação do arquivo raster com gdalinfo
-        self._check_raster_file_info(raster_file)
-
-        # Configura o comando raster2pgsql
-        cmd_r2p = [
-            raster2pgsql,
-            "-c", "-d",
-            "-s", str(params.srid),
-            "-t", tile_size,
-            "-I", "-C",
-            raster_file,  # Removidas as aspas extras
-            f"{params.connection.schema}.{table_name}"
-        ]
-
-        if mode == "Out-of-DB":
-            cmd_r2p.append("-M")
-
-        env = os.environ.copy()
-        env["PGPASSWORD"] = params.connection.password
-
-        # Adiciona logs para o comando completo e timeout
-        self._log(f"Comando completo: {' '.join(cmd_r2p)}")
-        self._log(f"Timeout configurado: {timeout}s")
-
-        # Executa o raster2pgsql
-        self._log(f"Executando raster2pgsql: {' '.join(cmd_r2p)}")
-        code, sql, err = run_subprocess_with_cancel(
-            command=cmd_r2p,
-            env=env,
-            cancel_check_func=params.cancel_check_func,
-            timeout=timeout
-        )
-
-        if code != 0:
-            self._log(f"ERRO: raster2pgsql falhou com código de saída: {code}")
-            if err:
-                self._log(f"STDERR: {err}")
-            return False
-
-        self._log(f"✓ SQL gerado com sucesso ({len(sql)} caracteres)")
-        
-        # Log de uma amostra do SQL para diagnóstico
-        self._log_sql_sample(sql)
-
-        # Configura o comando psql
-        cmd_psql = [
-            psql,
-            "-h", params.connection.host,
-            "-p", str(params.connection.port),
-            "-U", params.connection.username,
-            "-d", params.connection.database,
-            "-q"
-        ]
-
-        # Executa o psql
-        self._log(f"Executando psql: {' '.join(cmd_psql)}")
-        self._log(f"Enviando SQL de {len(sql)} caracteres + COMMIT para o banco")
-        
-        code, out, err = run_subprocess_with_cancel(
-            command=cmd_psql,
-            env=env,
-            input_text=sql + "\nCOMMIT;",
-            cancel_check_func=params.cancel_check_func,
-            timeout=60  # Timeout fixo para psql
-        )
-
-        if code != 0:
-            self._log(f"ERRO: psql falhou com código de saída: {code}")
-            if err:
-                self._log(f"STDERR: {err}")
-            if out:
-                self._log(f"STDOUT: {out}")
-            return False
-        
-        self._log("✓ SQL executado com sucesso no banco de dados")
-
-        self._log("Upload concluído com sucesso.")
-        return True
-    
-    def _check_gdal_environment(self):
-        """Verifica se o GDAL está instalado e acessível."""
-        try:
-            # Testa gdalinfo --version
-            code, output, err = run_subprocess_with_cancel(
-                command=["gdalinfo", "--version"],
-                env=os.environ.copy(),
-                timeout=10
-            )
-            if code == 0:
-                self._log(f"GDAL encontrado: {output.strip()}")
-            else:
-                self._log(f"GDAL não encontrado ou com problemas: {err}")
-        except Exception as e:
-            self._log(f"Erro ao verificar GDAL: {e}")
-    
-    def _check_raster_file_info(self, raster_file: str):
-        """Verifica informações do arquivo raster usando gdalinfo."""
-        try:
-            # Testa gdalinfo no arquivo
-            code, output, err = run_subprocess_with_cancel(
-                command=["gdalinfo", raster_file],  # Removidas as aspas extras
-                env=os.environ.copy(),
-                timeout=30
-            )
-            if code == 0:
-                # Extrai informações importantes
-                lines = output.split('\n')
-                for line in lines[:10]:  # Primeiras 10 linhas
-                    if any(keyword in line for keyword in ['Size is', 'Coordinate System', 'EPSG', 'Driver:']):
-                        self._log(f"Info raster: {line.strip()}")
-            else:
-                self._log(f"Não foi possível obter informações do raster via gdalinfo: {err}")
-        except Exception as e:
-            self._log(f"Erro ao verificar arquivo raster: {e}")
-    
-    def _log_sql_sample(self, sql: str):
-        """Log de uma amostra do SQL gerado."""
-        if len(sql) > 1000:
-            # Mostra início e fim do SQL
-            start = sql[:300]
-            end = sql[-300:]
-            self._log(f"SQL início: {start}")
-            self._log(f"SQL fim: {end}")
-        else:
-            self._log(f"SQL completo: {sql}")
-    
-    
-    
-    def _resolve_table_name(self, base_name: str, params: RasterUploadParams) -> str:
-        """Resolve nome final da tabela considerando flag de substituição."""
-        if params.overwrite:
-            # Se overwrite=True, usa nome original (será recriada com -d)
-            self._log(f"Modo sobrescrita ativado: {base_name} será recriada")
-            return base_name
-        
-        # Se overwrite=False, verifica se tabela existe e incrementa sufixo
-        return self._get_unique_table_name(base_name, params)
-    
-    def _get_unique_table_name(self, base_name: str, params: RasterUploadParams) -> str:
-        """Gera nome único de forma otimizada usando uma única query."""
-        try:
-            # Busca de forma otimizada
-            existing = fetch_existing_table_names(params.connection, base_name)
-            unique_name = compute_next_suffix(base_name, existing)
-            
-            if unique_name == base_name:
-                self._log(f"Tabela {base_name} não existe, usando nome original")
-            else:
-                self._log(f"Nome único encontrado: {unique_name}")
-            
-            return unique_name
-            
-        except Exception as e:
-            self._log(f"Erro na resolução do nome da tabela: {e}, usando nome original")
-            return base_name
-    
-    def find_raster2pgsql(self) -> Optional[str]:
-        """Localiza o executável raster2pgsql (plugin-local primeiro)."""
-        possible_paths = get_postgres_possible_paths("raster2pgsql")
-        executable = find_executable("raster2pgsql", possible_paths)
-        
-        if executable:
-            # Verifica se é do plugin
-            plugin_bin = os.path.join(os.path.dirname(__file__), 'bin')
-            if executable.startswith(plugin_bin):
-                self._log(f"Usando raster2pgsql do plugin: {executable}")
-            else:
-                self._log(f"Usando raster2pgsql do sistema: {executable}")
-        else:
-            self._log("⚠️ raster2pgsql não encontrado. Instale PostgreSQL ou adicione os executáveis à pasta bin/ do plugin")
-            
-        return executable
-    
-    def find_psql(self) -> Optional[str]:
-        """Localiza o executável psql (plugin-local primeiro)."""
-        possible_paths = get_postgres_possible_paths("psql")
-        executable = find_executable("psql", possible_paths)
-        
-        if executable:
-            # Verifica se é do plugin
-            plugin_bin = os.path.join(os.path.dirname(__file__), 'bin')
-            if executable.startswith(plugin_bin):
-                self._log(f"Usando psql do plugin: {executable}")
-            else:
-                self._log(f"Usando psql do sistema: {executable}")
-        else:
-            self._log("⚠️ psql não encontrado. Instale PostgreSQL ou adicione os executáveis à pasta bin/ do plugin")
-            
-        return executable
-
-
-
-
+"""
+Serviço para upload de raster para PostGIS com fallback automático.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from qgis.core import QgsApplication
+
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+from .raster_upload_params import GRANT_MODE_DEFAULT_PRIVILEGES, RasterUploadParams
+from .geoifsc_utils import (
+    find_executable, get_postgres_possible_paths, run_subprocess_with_cancel,
+    fetch_existing_table_names, compute_next_suffix, quote_identifier, quote_literal,
+    is_gdal_virtual_path, raster_path_size
+)
+from .progress_aggregator import ProgressAggregator
+from .tile_stream import TileCopyStream, UploadCancelled
+from .upload_event_log import FileUploadRecord, UploadEventLog
+
+# Fração do arquivo concluída ao final de cada fase do upload
+PHASE_PROGRESS = {
+    "probe": 0.05,
+    "encode": 0.45,
+    "transfer": 0.85,
+    "index": 0.95,
+    "constraints": 1.0,
+}
+
+# Marcadores emitidos pelo script do psql com o horário do servidor; separam
+# as fases executadas em uma única transação
+PHASE_MARKER = "geoifsc_phase"
+LOAD_PHASES = ("transfer", "index", "constraints")
+
+# Compressão TOAST da coluna raster (PostgreSQL 14+ compilado com lz4)
+TOAST_COMPRESSION = "lz4"
+
+# Literais WKB hexadecimais nos INSERTs gerados pelo raster2pgsql
+_RASTER_LITERAL_RE = re.compile(r"'([0-9A-Fa-f]+)'::raster")
+
+
+def raster_sql_bytes(sql: str) -> int:
+    """Tamanho sem compressão (bytes de WKB) dos rasters inseridos pelo SQL do raster2pgsql."""
+    # finditer não copia os literais, que somam quase todo o SQL
+    return sum((m.end(1) - m.start(1)) // 2 for m in _RASTER_LITERAL_RE.finditer(sql))
+
+
+def phase_marker_sql(name: str) -> str:
+    """Consulta que imprime o marcador da fase ``name`` com o horário do servidor."""
+    return f"SELECT '{PHASE_MARKER}', '{name}', extract(epoch FROM clock_timestamp());\n"
+
+
+def parse_phase_markers(output: str) -> Dict[str, float]:
+    """Lê os marcadores da saída do psql (formato ``-A -t``)."""
+    markers = {}
+    for line in output.splitlines():
+        parts = line.strip().split("|")
+        if len(parts) == 3 and parts[0] == PHASE_MARKER:
+            try:
+                markers[parts[1]] = float(parts[2])
+            except ValueError:
+                continue
+    return markers
+
+
+def phase_durations(markers: Dict[str, float]) -> Dict[str, float]:
+    """Duração das fases concluídas, entre marcadores consecutivos."""
+    durations = {}
+    previous = markers.get("start")
+    for name in LOAD_PHASES:
+        if previous is None or name not in markers:
+            break
+        durations[name] = round(markers[name] - previous, 4)
+        previous = markers[name]
+    return durations
+
+
+class RasterUploaderService(QObject):
+    """Serviço para upload de raster para PostGIS."""
+    
+    progress_snapshot = pyqtSignal(object)
+    file_upload_success = pyqtSignal(str)
+    file_upload_error = pyqtSignal(str, str)
+    upload_completed = pyqtSignal()
+    log_message = pyqtSignal(str)
+    
+    def __init__(self, event_log: Optional[UploadEventLog] = None):
+        super().__init__()
+        self.event_log = event_log or UploadEventLog()
+        
+        # ─── INJEÇÃO DO QGIS_BIN NO PATH ─────────────────────────────────────────
+        try:
+            # prefixPath é algo como "C:/Program Files/QGIS 3.xx/apps/qgis-ltr"
+            prefix = QgsApplication.prefixPath()
+            apps_dir = os.path.dirname(prefix)           # ".../apps"
+            root_dir = os.path.dirname(apps_dir)         # ".../QGIS 3.xx" ou "C:/OSGeo4W64"
+            # Possíveis pastas "bin" onde o QGIS/OSGeo4W instala os executáveis
+            for p in (
+                os.path.join(apps_dir, 'bin'),           # standalone installer
+                os.path.join(root_dir, 'bin')            # OSGeo4W64/bin
+            ):
+                if os.path.isdir(p):
+                    os.environ['PATH'] = p + os.pathsep + os.environ.get('PATH', '')
+                    self._log(f"Adicionado ao PATH: {p}")
+        except Exception as e:
+            self._log(f"Aviso: Não foi possível estender PATH do QGIS: {e}")
+        # ─────────────────────────────────────────────────────────────────────────
+        
+        self._is_cancelled = False
+        self._upload_thread: Optional[threading.Thread] = None
+        self._progress: Optional[ProgressAggregator] = None
+        # Conexão do lote para medir as tabelas; o suporte a lz4 é verificado
+        # uma vez por servidor e guardado com o servidor a que se refere
+        self._storage_conn = None
+        self._compression: Optional[str] = None
+        self._compression_server: Optional[tuple] = None
+    
+    def _log(self, message: str):
+        """Emite mensagem de log com timestamp."""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        formatted_message = f"[{timestamp}] {message}"
+        self.log_message.emit(formatted_message)
+    
+    def upload_rasters(self, params: RasterUploadParams):
+        """Inicia upload de rasters em thread separada."""
+        if self._upload_thread and self._upload_thread.is_alive():
+            self._log("Upload já está em andamento")
+            return
+        
+        self._is_cancelled = False
+        self._upload_thread = threading.Thread(
+            target=self._upload_rasters_worker,
+            args=(params,)
+        )
+        self._upload_thread.daemon = True
+        self._upload_thread.start()
+    
+    def cancel_upload(self):
+        """Cancela o upload em andamento."""
+        self._is_cancelled = True
+        self._log("Upload cancelado pelo usuário")
+    
+    def _upload_rasters_worker(self, params: RasterUploadParams):
+        """Worker thread para upload de rasters."""
+        self._log(f"Iniciando upload de {len(params.raster_files)} arquivos")
+        
+        total_files = len(params.raster_files)
+        batch_start = time.perf_counter()
+        succeeded = 0
+        
+        try:
+            self.event_log.start()
+        except OSError as e:
+            self._log(f"Aviso: log estruturado indisponível: {e}")
+        self.event_log.event("batch_started", files=total_files, srid=params.srid,
+                             schema=params.connection.schema)
+        
+        # Privilégios padrão precisam existir antes de as tabelas serem criadas
+        if params.grant_select_to and params.grant_mode == GRANT_MODE_DEFAULT_PRIVILEGES:
+            self._apply_grants(params, [])
+        created_tables = []
+
+        # Progresso agregado e publicado em taxa fixa para a interface
+        self._progress = ProgressAggregator(self.progress_snapshot.emit)
+        self._progress.start_batch(params.raster_files, self._file_sizes(params.raster_files))
+        self._progress.start()
+        if params.use_compression:
+            self._start_storage_session(params)
+        
+        for i, raster_file in enumerate(params.raster_files):
+            if self._is_cancelled:
+                self._log("Upload cancelado")
+                self.event_log.event("batch_cancelled", files_done=i)
+                break
+            
+            # Nome da tabela baseado no basename do arquivo
+            file_name = Path(raster_file).stem
+            table_name = f"{params.table_name_prefix}{file_name}" if params.table_name_prefix else file_name
+            record = FileUploadRecord(file=raster_file, table=table_name)
+            
+            self._progress.file_started(raster_file)
+            self._log(f"Enviando {file_name} → {table_name}")
+            
+            try:
+                success = self._upload_single_raster(
+                    raster_file, table_name, params, record
+                )
+                
+                if success:
+                    record.status = "success"
+                    succeeded += 1
+                    created_tables.append(table_name.lower())
+                    self.file_upload_success.emit(raster_file)
+                    self._log(f"✓ {file_name} enviado com sucesso")
+                else:
+                    record.status = "failed"
+                    record.error = record.error or "Falha no upload"
+                    self.file_upload_error.emit(raster_file, "Falha no upload")
+                    self._log(f"✗ Falha ao enviar {file_name}")
+                    
+            except Exception as e:
+                error_msg = str(e)
+                record.status = "error"
+                record.error = error_msg
+                self.file_upload_error.emit(raster_file, error_msg)
+                self._log(f"✗ Erro ao enviar {file_name}: {error_msg}")
+            
+            self._progress.file_finished(raster_file, record.status == "success", record.error)
+            self.event_log.file_completed(record)
+        
+        self._progress.stop()
+        self._progress = None
+        self._end_storage_session()
+        if created_tables and params.grant_select_to \
+                and params.grant_mode != GRANT_MODE_DEFAULT_PRIVILEGES:
+            self._apply_grants(params, created_tables)
+        if not self._is_cancelled:
+            self._log("Upload concluído")
+        
+        self.event_log.event(
+            "batch_completed",
+            files=total_files,
+            succeeded=succeeded,
+            cancelled=self._is_cancelled,
+            duration=round(time.perf_counter() - batch_start, 4),
+        )
+        self.event_log.stop()
+        self.upload_completed.emit()
+    
+    @staticmethod
+    def _file_sizes(raster_files) -> dict:
+        """Obtém o tamanho dos arquivos para ponderar o progresso por bytes."""
+        sizes = {}
+        for raster_file in raster_files:
+            try:
+                sizes[raster_file] = raster_path_size(raster_file)
+            except OSError:
+                sizes[raster_file] = 0
+        return sizes
+
+    @contextmanager
+    def _phase(self, record: FileUploadRecord, name: str):
+        """Cronometra uma fase e reporta o avanço do arquivo ao agregador."""
+        with record.phase(name):
+            yield
+        if self._progress is not None:
+            self._progress.file_progress(record.file, PHASE_PROGRESS[name])
+
+    def _determine_upload_mode(self, file_size: int) -> Tuple[str, str, int]:
+        """
+        Determina o modo de upload, tamanho de tile e timeout com base no tamanho do arquivo.
+
+        Args:
+            file_size: Tamanho do arquivo em bytes.
+
+        Returns:
+            Uma tupla contendo o modo de upload, tamanho de tile e timeout.
+        """
+        if file_size <= 100 * 1024 * 1024:  # ≤ 100 MB
+            return "SQL+psql", "512x512", 300  # Mudado de "auto" para "512x512" para melhor performance
+        elif file_size <= 500 * 1024 * 1024:  # 100 MB < tamanho ≤ 500 MB
+            return "Direct load", "512x512", 600
+        else:  # > 500 MB
+            return "Out-of-DB", "512x512", 1200
+
+    def _upload_single_raster(
+        self,
+        raster_file: str,
+        table_name: str,
+        params: RasterUploadParams,
+        record: Optional[FileUploadRecord] = None
+    ) -> bool:
+        """
+        Carrega um único raster usando raster2pgsql e psql.
+
+        As fases (probe, encode, transfer, index, constraints) são cronometradas
+        em ``record`` para o log estruturado de eventos.
+        """
+        if record is None:
+            record = FileUploadRecord(file=raster_file, table=table_name)
+
+        # Valida se o arquivo raster existe (caminhos /vsizip/ são validados
+        # pelo tamanho do membro logo abaixo)
+        if not is_gdal_virtual_path(raster_file) and not os.path.exists(raster_file):
+            self._log(f"ERRO: Arquivo raster não encontrado: {raster_file}")
+            record.error = "Arquivo não encontrado"
+            return False
+
+        # Obtém o tamanho do arquivo
+        try:
+            file_size = raster_path_size(raster_file)
+            record.bytes = file_size
+            self._log(f"Tamanho do arquivo: {file_size / (1024*1024):.2f} MB")
+        except Exception as e:
+            self._log(f"ERRO: Não foi possível obter tamanho do arquivo: {e}")
+            record.error = str(e)
+            return False
+
+        # Determina o modo de upload, tamanho de tile e timeout
+        mode, tile_size, timeout = self._determine_upload_mode(file_size)
+        self._log(f"Modo de upload: {mode}, Tamanho de tile: {tile_size}, Timeout: {timeout}s")
+
+        # Localiza os executáveis
+        raster2pgsql = params.raster2pgsql_path or find_executable("raster2pgsql", get_postgres_possible_paths("raster2pgsql"))
+        psql = params.psql_path or find_executable("psql", get_postgres_possible_paths("psql"))
+
+        if not raster2pgsql or not os.path.exists(raster2pgsql):
+            self._log("ERRO: raster2pgsql não encontrado!")
+            record.error = "raster2pgsql não encontrado"
+            return False
+
+        if not psql or not os.path.exists(psql):
+            self._log("ERRO: psql não encontrado!")
+            record.error = "psql não encontrado"
+            return False
+
+        # Logs detalhados dos executáveis encontrados
+        self._log(f"Usando raster2pgsql: {raster2pgsql}")
+        self._log(f"Usando psql: {psql}")
+        
+        with self._phase(record, "probe"):
+            # Verificação de GDAL (diagnóstico)
+            self._check_gdal_environment()
+            
+            # Verificação do arquivo raster com gdalinfo
+            self._check_raster_file_info(raster_file)
+
+        # raster2pgsql converte identificadores não citados para minúsculas;
+        # reproduz o mesmo nome para as etapas seguintes
+        schema = params.connection.schema.lower()
+        table = table_name.lower()
+        qualified = f"{quote_identifier(schema)}.{quote_identifier(table)}"
+
+        compression = None
+        if params.use_compression and self._compression_server == self._server_key(params):
+            compression = self._compression
+
+        # Configura o comando raster2pgsql. Índice, ANALYZE e constraints são
+        # acrescentados ao script do psql, e -e omite o BEGIN/END do
+        # raster2pgsql para que tudo rode em uma única transação
+        cmd_r2p = [
+            raster2pgsql,
+            "-c", "-d", "-e",
+            "-s", str(params.srid),
+            "-t", tile_size,
+            raster_file,  # Removidas as aspas extras
+            f"{params.connection.schema}.{table_name}"
+        ]
+
+        env = os.environ.copy()
+        env["PGPASSWORD"] = params.connection.password
+
+        # Adiciona logs para o comando completo e timeout
+        self._log(f"Comando completo: {' '.join(cmd_r2p)}")
+        self._log(f"Timeout configurado: {timeout}s")
+
+        # Executa o raster2pgsql
+        self._log(f"Executando raster2pgsql: {' '.join(cmd_r2p)}")
+        with self._phase(record, "encode"):
+            code, sql, err = run_subprocess_with_cancel(
+                command=cmd_r2p,
+                env=env,
+                cancel_check_func=params.cancel_check_func,
+                timeout=timeout
+            )
+        record.exit_codes["raster2pgsql"] = code
+
+        if code != 0:
+            self._log(f"ERRO: raster2pgsql falhou com código de saída: {code}")
+            if err:
+                self._log(f"STDERR: {err}")
+            record.error = err or f"raster2pgsql saiu com código {code}"
+            return False
+
+        record.tiles = sql.count("INSERT INTO")
+        record.raster_bytes = raster_sql_bytes(sql)
+        self._log(f"✓ SQL gerado com sucesso ({len(sql)} caracteres)")
+        
+        # Log de uma amostra do SQL para diagnóstico
+        self._log_sql_sample(sql)
+
+        # Com compressão, os tiles já são gravados em lz4 e a coluna passa a
+        # usá-lo também em gravações futuras
+        prelude = epilogue = ""
+        if compression:
+            prelude = f"SET default_toast_compression = {quote_literal(compression)};\n"
+            epilogue = "\n" + self._column_compression_sql(qualified, compression)
+
+        # Carga, índice, ANALYZE e constraints em um único script do psql,
+        # executado em uma transação: uma falha em qualquer etapa desfaz tudo
+        # e não deixa tabela parcial no banco
+        script = "".join([
+            prelude,
+            phase_marker_sql("start"),
+            sql,
+            epilogue,
+            "\n",
+            phase_marker_sql("transfer"),
+            f'CREATE INDEX ON {qualified} USING gist (st_convexhull("rast"));\n',
+            f"ANALYZE {qualified};\n",
+            phase_marker_sql("index"),
+            f"SELECT AddRasterConstraints({quote_literal(schema)}, "
+            f"{quote_literal(table)}, 'rast');\n",
+            phase_marker_sql("constraints"),
+        ])
+        self._log(f"Enviando SQL de {len(sql)} caracteres com índice, ANALYZE e "
+                  f"constraints em uma transação")
+        start = time.perf_counter()
+        code, out = self._run_psql(psql, script, params, env, timeout=timeout)
+        elapsed = time.perf_counter() - start
+        record.exit_codes["psql"] = code
+        durations = phase_durations(parse_phase_markers(out))
+        record.phases.update(durations)
+
+        if code != 0:
+            failed = next((name for name in LOAD_PHASES if name not in durations), None)
+            record.error = (f"psql saiu com código {code} na fase {failed}" if failed and out
+                            else f"psql saiu com código {code}")
+            self._log(f"ERRO: {record.error}; a transação foi desfeita e nenhuma "
+                      f"tabela parcial ficou no banco")
+            return False
+
+        # Conexão e envio do script contam como transferência
+        record.phases["transfer"] = round(
+            elapsed - durations.get("index", 0.0) - durations.get("constraints", 0.0), 4
+        )
+        if self._progress is not None:
+            self._progress.file_progress(record.file, PHASE_PROGRESS["constraints"])
+        self._log("✓ Dados, índice espacial, estatísticas e constraints gravados no banco")
+
+        if params.use_compression and self._storage_conn is not None:
+            try:
+                with self._storage_conn.cursor() as cursor:
+                    self._measure_table(cursor, qualified, record)
+            except psycopg2.Error as e:
+                self._log(f"Aviso: não foi possível obter o tamanho da tabela: {e}")
+            else:
+                self._log_table_size(record, compression)
+        self._log("Upload concluído com sucesso.")
+        return True
+
+    def upload_tile_stream(
+        self,
+        tiles: Iterable,
+        table_name: str,
+        params: RasterUploadParams,
+        record: Optional[FileUploadRecord] = None
+    ) -> bool:
+        """
+        Carrega tiles já codificados em uma única tabela, sem arquivos intermediários.
+
+        ``tiles`` é um iterável de WKB de raster PostGIS (``bytes`` ou objetos
+        com atributo ``data``), como o gerado por ``raster_tiler.iter_tiles``.
+        Os tiles são consumidos sob demanda e enviados via ``COPY``, de modo
+        que um raster grande é recortado e carregado em uma só passada. A
+        tabela é recriada e recebe índice espacial e constraints, como no
+        upload por arquivo; tudo ocorre em uma transação.
+        """
+        if record is None:
+            record = FileUploadRecord(file=table_name, table=table_name)
+        if not PSYCOPG2_AVAILABLE:
+            self._log("ERRO: psycopg2 não encontrado; instale com: pip install psycopg2-binary")
+            record.error = "psycopg2 não encontrado"
+            return False
+
+        # Mesma normalização de nomes aplicada pelo raster2pgsql
+        schema = params.connection.schema.lower()
+        table = table_name.lower()
+        qualified = f"{quote_identifier(schema)}.{quote_identifier(table)}"
+
+        def cancelled() -> bool:
+            if self._is_cancelled:
+                return True
+            return bool(params.cancel_check_func and params.cancel_check_func())
+
+        stream = TileCopyStream(tiles, cancel_check=cancelled)
+        try:
+            conn = self._connect(params)
+        except psycopg2.Error as e:
+            self._log(f"ERRO: não foi possível conectar ao banco: {e}")
+            record.error = str(e)
+            return False
+        try:
+            with conn.cursor() as cursor:
+                compression = None
+                if params.use_compression:
+                    compression = self._check_compression(cursor, params)
+                column_compression = f" COMPRESSION {compression}" if compression else ""
+                self._log(f"Enviando tiles via COPY para {qualified}")
+                with self._phase(record, "transfer"):
+                    cursor.execute(f"DROP TABLE IF EXISTS {qualified}")
+                    cursor.execute(
+                        f"CREATE TABLE {qualified} "
+                        f"(rid serial PRIMARY KEY, rast raster{column_compression})"
+                    )
+                    cursor.copy_expert(f"COPY {qualified} (rast) FROM STDIN", stream)
+                record.tiles = stream.tiles
+                record.bytes = record.raster_bytes = stream.bytes
+                self._log(f"✓ {stream.tiles} tiles enviados ({stream.bytes / (1024*1024):.2f} MB)")
+
+                self._log("Criando índice espacial")
+                with self._phase(record, "index"):
+                    cursor.execute(
+                        f'CREATE INDEX ON {qualified} USING gist (st_convexhull("rast"))'
+                    )
+                self._log("Aplicando constraints do raster")
+                with self._phase(record, "constraints"):
+                    cursor.execute(
+                        "SELECT AddRasterConstraints(%s, %s, 'rast')", (schema, table)
+                    )
+                if params.use_compression:
+                    self._measure_table(cursor, qualified, record)
+            conn.commit()
+        except UploadCancelled:
+            conn.rollback()
+            self._log("Upload cancelado; nenhuma alteração foi gravada")
+            record.error = "Upload cancelado"
+            return False
+        except Exception as e:
+            conn.rollback()
+            self._log(f"ERRO: carga via COPY falhou: {e}")
+            record.error = str(e)
+            return False
+        finally:
+            conn.close()
+
+        if params.grant_select_to and params.grant_mode != GRANT_MODE_DEFAULT_PRIVILEGES:
+            self._apply_grants(params, [table])
+        if record.table_bytes is not None:
+            self._log_table_size(record, compression)
+        self._log("Upload concluído com sucesso.")
+        return True
+
+    @staticmethod
+    def _connect(params: RasterUploadParams):
+        """Abre uma conexão psycopg2 com os parâmetros do upload."""
+        return psycopg2.connect(
+            host=params.connection.host,
+            port=params.connection.port,
+            database=params.connection.database,
+            user=params.connection.username,
+            password=params.connection.password,
+            connect_timeout=10
+        )
+
+    @staticmethod
+    def _server_compression(cursor) -> Optional[str]:
+        """
+        Método de compressão TOAST a usar na coluna raster.
+
+        Retorna ``None`` se o servidor for anterior ao PostgreSQL 14 (onde
+        ``default_toast_compression`` não existe) ou não tiver sido
+        compilado com lz4.
+        """
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_settings "
+            "WHERE name = 'default_toast_compression' AND %s = ANY(enumvals))",
+            (TOAST_COMPRESSION,),
+        )
+        return TOAST_COMPRESSION if cursor.fetchone()[0] else None
+
+    @staticmethod
+    def _server_key(params: RasterUploadParams) -> tuple:
+        return (params.connection.host, params.connection.port)
+
+    def _check_compression(self, cursor, params: RasterUploadParams) -> Optional[str]:
+        """Verifica o suporte a lz4 uma vez por servidor e reutiliza o resultado."""
+        if self._compression_server != self._server_key(params):
+            self._compression = self._server_compression(cursor)
+            self._compression_server = self._server_key(params)
+            self._log_compression()
+        return self._compression
+
+    def _log_compression(self) -> None:
+        if self._compression:
+            self._log(f"Compressão {self._compression} ativada na coluna raster")
+        else:
+            self._log("Aviso: servidor sem suporte a compressão lz4 (requer "
+                      "PostgreSQL 14+); usando a compressão padrão")
+
+    def _start_storage_session(self, params: RasterUploadParams) -> None:
+        """
+        Abre a conexão do lote usada para verificar o suporte a lz4 e medir as tabelas.
+
+        Sem psycopg2 ou sem conexão, o lote inteiro segue com a compressão
+        padrão, com um único aviso.
+        """
+        self._compression = None
+        self._compression_server = self._server_key(params)
+        if not PSYCOPG2_AVAILABLE:
+            self._log("Aviso: psycopg2 não encontrado; compressão lz4 não será aplicada")
+            return
+        conn = None
+        try:
+            conn = self._connect(params)
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                self._compression = self._server_compression(cursor)
+        except psycopg2.Error as e:
+            self._log(f"Aviso: não foi possível verificar o suporte a compressão: {e}")
+            if conn is not None:
+                conn.close()
+            return
+        self._log_compression()
+        self._storage_conn = conn
+
+    def _end_storage_session(self) -> None:
+        if self._storage_conn is not None:
+            self._storage_conn.close()
+            self._storage_conn = None
+        self._compression = None
+        self._compression_server = None
+
+    @staticmethod
+    def _column_compression_sql(qualified: str, compression: str) -> str:
+        """Define a compressão TOAST da coluna raster."""
+        return f'ALTER TABLE {qualified} ALTER COLUMN "rast" SET COMPRESSION {compression};'
+
+    @staticmethod
+    def _measure_table(cursor, qualified: str, record: FileUploadRecord) -> None:
+        """Grava em ``record`` o tamanho armazenado da coluna raster e da tabela."""
+        cursor.execute(
+            f"SELECT (SELECT sum(pg_column_size(rast)) FROM {qualified}), "
+            "pg_total_relation_size(%s::regclass)",
+            (qualified,),
+        )
+        stored, total = cursor.fetchone()
+        record.stored_raster_bytes = int(stored or 0)
+        record.table_bytes = total
+
+    def _log_table_size(self, record: FileUploadRecord, compression: Optional[str]) -> None:
+        mb = 1024 * 1024
+        message = (f"Rasters: {record.raster_bytes / mb:.2f} MB sem compressão, "
+                   f"{record.stored_raster_bytes / mb:.2f} MB armazenados")
+        if record.raster_bytes:
+            message += f" ({record.stored_raster_bytes / record.raster_bytes:.0%})"
+        self._log(f"{message}; tabela com índices: {record.table_bytes / mb:.2f} MB, "
+                  f"compressão: {compression or 'padrão'}")
+        self.event_log.event("table_size", table=record.table, compression=compression,
+                             raster_bytes=record.raster_bytes,
+                             stored_raster_bytes=record.stored_raster_bytes,
+                             table_bytes=record.table_bytes)
+
+    def _apply_grants(self, params: RasterUploadParams, tables) -> None:
+        """
+        Concede SELECT aos grupos de ``params.grant_select_to``.
+
+        No modo por tabelas, um único GRANT cobre todas as tabelas criadas no
+        lote; no modo de privilégios padrão, o esquema passa a conceder SELECT
+        nas tabelas que o usuário criar. Falhas são registradas sem
+        interromper o upload.
+        """
+        groups = params.grant_select_to
+        if not PSYCOPG2_AVAILABLE:
+            self._log("Aviso: psycopg2 não encontrado; privilégios não foram concedidos")
+            return
+        # Importado aqui para que o serviço não dependa do psycopg2 ao carregar
+        from .db_manager import DBManager
+        from .role_manager import RoleManager
+
+        schema = params.connection.schema.lower()
+        try:
+            conn = self._connect(params)
+        except psycopg2.Error as e:
+            self._log(f"ERRO: não foi possível conectar para conceder privilégios: {e}")
+            return
+        try:
+            manager = RoleManager(DBManager(conn, prepared_statements=False))
+            if params.grant_mode == GRANT_MODE_DEFAULT_PRIVILEGES:
+                manager.grant_default_select(schema, groups)
+                self._log(f"✓ Privilégio padrão de SELECT em {schema} para {', '.join(groups)}")
+            else:
+                manager.grant_select_on_tables(schema, tables, groups)
+                self._log(f"✓ SELECT concedido em {len(tables)} tabelas para {', '.join(groups)}")
+            self.event_log.event("grants_applied", schema=schema, groups=groups,
+                                 tables=len(tables), mode=params.grant_mode)
+        except Exception as e:
+            self._log(f"ERRO: falha ao conceder privilégios: {e}")
+        finally:
+            conn.close()
+
+    def _run_psql(
+        self,
+        psql: str,
+        sql_text: str,
+        params: RasterUploadParams,
+        env: dict,
+        timeout: int
+    ) -> Tuple[int, str]:
+        """
+        Executa um script SQL via psql em uma única transação.
+
+        O script para no primeiro erro (``ON_ERROR_STOP``), o que desfaz a
+        transação inteira. Retorna o código de saída e a saída padrão, em
+        formato sem alinhamento (``-A -t``) para a leitura dos marcadores.
+        """
+        cmd_psql = [
+            psql,
+            "-h", params.connection.host,
+            "-p", str(params.connection.port),
+            "-U", params.connection.username,
+            "-d", params.connection.database,
+            "-X", "-q", "-A", "-t",
+            "--single-transaction",
+            "-v", "ON_ERROR_STOP=1",
+        ]
+
+        self._log(f"Executando psql: {' '.join(cmd_psql)}")
+        code, out, err = run_subprocess_with_cancel(
+            command=cmd_psql,
+            env=env,
+            input_text=sql_text,
+            cancel_check_func=params.cancel_check_func,
+            timeout=timeout
+        )
+
+        if code != 0:
+            self._log(f"ERRO: psql falhou com código de saída: {code}")
+            if err:
+                self._log(f"STDERR: {err}")
+            if out:
+                self._log(f"STDOUT: {out}")
+        return code, out or ""
+    
+    def _check_gdal_environment(self):
+        """Verifica se o GDAL está instalado e acessível."""
+        try:
+            # Testa gdalinfo --version
+            code, output, err = run_subprocess_with_cancel(
+                command=["gdalinfo", "--version"],
+                env=os.environ.copy(),
+                timeout=10
+            )
+            if code == 0:
+                self._log(f"GDAL encontrado: {output.strip()}")
+            else:
+                self._log(f"GDAL não encontrado ou com problemas: {err}")
+        except Exception as e:
+            self._log(f"Erro ao verificar GDAL: {e}")
+    
+    def _check_raster_file_info(self, raster_file: str):
+        """Verifica informações do arquivo raster usando gdalinfo."""
+        try:
+            # Testa gdalinfo no arquivo
+            code, output, err = run_subprocess_with_cancel(
+                command=["gdalinfo", raster_file],  # Removidas as aspas extras
+                env=os.environ.copy(),
+                timeout=30
+            )
+            if code == 0:
+                # Extrai informações importantes
+                lines = output.split('\n')
+                for line in lines[:10]:  # Primeiras 10 linhas
+                    if any(keyword in line for keyword in ['Size is', 'Coordinate System', 'EPSG', 'Driver:']):
+                        self._log(f"Info raster: {line.strip()}")
+            else:
+                self._log(f"Não foi possível obter informações do raster via gdalinfo: {err}")
+        except Exception as e:
+            self._log(f"Erro ao verificar arquivo raster: {e}")
+    
+    def _log_sql_sample(self, sql: str):
+        """Log de uma amostra do SQL gerado."""
+        if len(sql) > 1000:
+            # Mostra início e fim do SQL
+            start = sql[:300]
+            end = sql[-300:]
+            self._log(f"SQL início: {start}")
+            self._log(f"SQL fim: {end}")
+        else:
+            self._log(f"SQL completo: {sql}")
+    
+    
+    
+    def _resolve_table_name(self, base_name: str, params: RasterUploadParams) -> str:
+        """Resolve nome final da tabela considerando flag de substituição."""
+        if params.overwrite:
+            # Se overwrite=True, usa nome original (será recriada com -d)
+            self._log(f"Modo sobrescrita ativado: {base_name} será recriada")
+            return base_name
+        
+        # Se overwrite=False, verifica se tabela existe e incrementa sufixo
+        return self._get_unique_table_name(base_name, params)
+    
+    def _get_unique_table_name(self, base_name: str, params: RasterUploadParams) -> str:
+        """Gera nome único de forma otimizada usando uma única query."""
+        try:
+            # Busca de forma otimizada
+            existing = fetch_existing_table_names(params.connection, base_name)
+            unique_name = compute_next_suffix(base_name, existing)
+            
+            if unique_name == base_name:
+                self._log(f"Tabela {base_name} não existe, usando nome original")
+            else:
+                self._log(f"Nome único encontrado: {unique_name}")
+            
+            return unique_name
+            
+        except Exception as e:
+            self._log(f"Erro na resolução do nome da tabela: {e}, usando nome original")
+            return base_name
+    
+    def find_raster2pgsql(self) -> Optional[str]:
+        """Localiza o executável raster2pgsql (plugin-local primeiro)."""
+        possible_paths = get_postgres_possible_paths("raster2pgsql")
+        executable = find_executable("raster2pgsql", possible_paths)
+        
+        if executable:
+            # Verifica se é do plugin
+            plugin_bin = os.path.join(os.path.dirname(__file__), 'bin')
+            if executable.startswith(plugin_bin):
+                self._log(f"Usando raster2pgsql do plugin: {executable}")
+            else:
+                self._log(f"Usando raster2pgsql do sistema: {executable}")
+        else:
+            self._log("⚠️ raster2pgsql não encontrado. Instale PostgreSQL ou adicione os executáveis à pasta bin/ do plugin")
+            
+        return executable
+    
+    def find_psql(self) -> Optional[str]:
+        """Localiza o executável psql (plugin-local primeiro)."""
+        possible_paths = get_postgres_possible_paths("psql")
+        executable = find_executable("psql", possible_paths)
+        
+        if executable:
+            # Verifica se é do plugin
+            plugin_bin = os.path.join(os.path.dirname(__file__), 'bin')
+            if executable.startswith(plugin_bin):
+                self._log(f"Usando psql do plugin: {executable}")
+            else:
+                self._log(f"Usando psql do sistema: {executable}")
+        else:
+            self._log("⚠️ psql não encontrado. Instale PostgreSQL ou adicione os executáveis à pasta bin/ do plugin")
+            
+        return executable
+
+
+
+
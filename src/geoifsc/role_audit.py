@@ -0,0 +1,182 @@
+"""
+Auditoria de roles e privilégios em vários bancos PostGIS.
+
+Conecta-se em paralelo (pool de threads) a uma lista de bancos, coleta
+roles, associações e ACLs das tabelas raster de cada um via ``DBManager`` e
+consolida tudo em um único relatório, com o tempo gasto em cada banco.
+
+Uso pela linha de comando::
+
+    python -m geoifsc.role_audit bancos.json --output auditoria.json
+
+onde ``bancos.json`` é uma lista de objetos com os campos de
+``ConnectionParams`` (a senha pode ser omitida para usar o ``~/.pgpass``).
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import psycopg2
+
+from .db_manager import DBManager
+from .models import TablePrivilege, User
+from .raster_upload_params import ConnectionParams
+
+DEFAULT_AUDIT_WORKERS = 8
+
+
+def database_label(params: ConnectionParams) -> str:
+    """Identificação do banco no relatório."""
+    return f"{params.host}:{params.port}/{params.database}"
+
+
+def connect(params: ConnectionParams):
+    """Abre a conexão de auditoria (somente leitura)."""
+    conn = psycopg2.connect(
+        host=params.host,
+        port=params.port,
+        database=params.database,
+        user=params.username,
+        password=params.password or None,
+        connect_timeout=10,
+    )
+    conn.set_session(readonly=True)
+    return conn
+
+
+@dataclass
+class DatabaseAudit:
+    """Roles, associações e privilégios de um banco."""
+
+    database: str
+    roles: List[User] = field(default_factory=list)
+    # Grupo -> membros diretos
+    memberships: Dict[str, List[str]] = field(default_factory=dict)
+    privileges: List[TablePrivilege] = field(default_factory=list)
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class AuditReport:
+    """Resultado consolidado da auditoria."""
+
+    databases: List[DatabaseAudit]
+    elapsed: float
+
+    def role_presence(self) -> Dict[str, List[str]]:
+        """Bancos em que cada role existe."""
+        presence: Dict[str, List[str]] = {}
+        for audit in self.databases:
+            for user in audit.roles:
+                presence.setdefault(user.username, []).append(audit.database)
+        return dict(sorted(presence.items()))
+
+    def group_memberships(self) -> Dict[str, Dict[str, List[str]]]:
+        """Membros diretos de cada grupo, por banco."""
+        merged: Dict[str, Dict[str, List[str]]] = {}
+        for audit in self.databases:
+            for group, members in audit.memberships.items():
+                merged.setdefault(group, {})[audit.database] = members
+        return dict(sorted(merged.items()))
+
+    def to_dict(self) -> Dict:
+        return {
+            "elapsed": round(self.elapsed, 4),
+            "timing": {a.database: round(a.elapsed, 4) for a in self.databases},
+            "errors": {a.database: a.error for a in self.databases if a.error},
+            "roles": self.role_presence(),
+            "memberships": self.group_memberships(),
+            "privileges": {
+                a.database: [asdict(p) for p in a.privileges] for a in self.databases
+            },
+        }
+
+
+def audit_database(
+    params: ConnectionParams,
+    connect_func: Callable[[ConnectionParams], object] = connect,
+) -> DatabaseAudit:
+    """Coleta roles, associações e ACLs raster de um banco; erros ficam no resultado."""
+    audit = DatabaseAudit(database=database_label(params))
+    start = time.perf_counter()
+    conn = None
+    try:
+        conn = connect_func(params)
+        dao = DBManager(conn, prepared_statements=False)
+        graph = dao.load_role_graph()
+        audit.roles = [graph.role(name) for name in graph.roles()]
+        audit.memberships = {
+            group: graph.members(group, transitive=False) for group in graph.groups()
+        }
+        try:
+            audit.privileges = dao.list_raster_table_privileges()
+        except psycopg2.Error as e:
+            # Banco sem a extensão postgis_raster
+            conn.rollback()
+            audit.error = f"Privilégios raster indisponíveis: {str(e).strip()}"
+    except Exception as e:
+        audit.error = str(e).strip()
+    finally:
+        if conn is not None:
+            conn.close()
+        audit.elapsed = time.perf_counter() - start
+    return audit
+
+
+def audit_databases(
+    databases: Sequence[ConnectionParams],
+    max_workers: int = DEFAULT_AUDIT_WORKERS,
+    connect_func: Callable[[ConnectionParams], object] = connect,
+) -> AuditReport:
+    """Audita todos os bancos em paralelo, na ordem recebida."""
+    start = time.perf_counter()
+    workers = max(1, min(max_workers, len(databases)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geoifsc-audit") as pool:
+        audits = list(pool.map(lambda p: audit_database(p, connect_func), databases))
+    return AuditReport(databases=audits, elapsed=time.perf_counter() - start)
+
+
+def load_connections(path: str) -> List[ConnectionParams]:
+    """Lê a lista de bancos de um arquivo JSON."""
+    with open(path, encoding="utf-8") as fh:
+        entries = json.load(fh)
+    return [
+        ConnectionParams(
+            host=entry.get("host", "localhost"),
+            port=int(entry.get("port", 5432)),
+            database=entry["database"],
+            username=entry["username"],
+            password=entry.get("password", ""),
+            schema=entry.get("schema", "public"),
+        )
+        for entry in entries
+    ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Auditoria de roles e privilégios raster")
+    parser.add_argument("connections", help="Arquivo JSON com a lista de bancos")
+    parser.add_argument("--workers", type=int, default=DEFAULT_AUDIT_WORKERS,
+                        help="Conexões simultâneas (padrão: 8)")
+    parser.add_argument("--output", help="Grava o relatório completo em JSON")
+    args = parser.parse_args(argv)
+
+    report = audit_databases(load_connections(args.connections), args.workers)
+    for audit in report.databases:
+        status = f"ERRO: {audit.error}" if audit.error else "ok"
+        print(f"{audit.database}: {len(audit.roles)} roles, "
+              f"{len(audit.privileges)} privilégios raster em {audit.elapsed:.2f}s ({status})")
+    print(f"Total: {len(report.databases)} bancos em {report.elapsed:.2f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report.to_dict(), fh, indent=2, ensure_ascii=False, default=str)
+    return 1 if any(a.error for a in report.databases) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""
+Retrato em memória dos roles do cluster e de suas associações.
+
+Carregado com uma única consulta (``DBManager.load_role_graph``), responde
+associação transitiva, buscas reversas (grupos de um role) e tamanho de
+grupos sem novas idas ao banco.
+"""
+
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .models import User
+
+# Linha da consulta: nome, pode logar, validade, grupos dos quais é membro direto
+RoleRow = Tuple[str, bool, Optional[str], Sequence[str]]
+
+
+class RoleGraph:
+    """Grafo de roles: arestas de cada membro para os grupos que ele integra."""
+
+    def __init__(self, rows: Iterable[RoleRow]):
+        self._roles: Dict[str, User] = {}
+        self._parents: Dict[str, FrozenSet[str]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        for name, can_login, valid_until, member_of in rows:
+            self._roles[name] = User(username=name, valid_until=valid_until,
+                                     can_login=bool(can_login))
+            self._parents[name] = frozenset(member_of or ())
+        for name, parents in self._parents.items():
+            for parent in parents:
+                self._children.setdefault(parent, set()).add(name)
+        self._ancestors: Dict[str, FrozenSet[str]] = {}
+        self._descendants: Dict[str, FrozenSet[str]] = {}
+
+    def __contains__(self, role: str) -> bool:
+        return role in self._roles
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def role(self, name: str) -> Optional[User]:
+        """Dados do role, ou None se não existir."""
+        return self._roles.get(name)
+
+    def roles(self) -> List[str]:
+        """Nomes de todos os roles, em ordem alfabética."""
+        return sorted(self._roles)
+
+    def users(self) -> List[str]:
+        """Roles com permissão de login."""
+        return sorted(name for name, user in self._roles.items() if user.can_login)
+
+    def groups(self) -> List[str]:
+        """Roles que têm ao menos um membro."""
+        return sorted(name for name in self._children if name in self._roles)
+
+    @staticmethod
+    def _closure(start: str, edges: Dict[str, Iterable[str]]) -> FrozenSet[str]:
+        seen: Set[str] = set()
+        stack = list(edges.get(start, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen or node == start:
+                continue
+            seen.add(node)
+            stack.extend(edges.get(node, ()))
+        return frozenset(seen)
+
+    def members(self, group: str, transitive: bool = True) -> List[str]:
+        """Membros do grupo; com ``transitive`` inclui membros de subgrupos."""
+        if not transitive:
+            return sorted(self._children.get(group, ()))
+        if group not in self._descendants:
+            self._descendants[group] = self._closure(group, self._children)
+        return sorted(self._descendants[group])
+
+    def groups_of(self, role: str, transitive: bool = True) -> List[str]:
+        """Grupos dos quais o role é membro, direta ou indiretamente."""
+        if not transitive:
+            return sorted(self._parents.get(role, ()))
+        if role not in self._ancestors:
+            self._ancestors[role] = self._closure(role, self._parents)
+        return sorted(self._ancestors[role])
+
+    def is_member(self, role: str, group: str, transitive: bool = True) -> bool:
+        """Indica se ``role`` pertence a ``group``."""
+        if not transitive:
+            return group in self._parents.get(role, ())
+        return group in self.groups_of(role)
+
+    def group_sizes(self, transitive: bool = True) -> Dict[str, int]:
+        """Número de membros de cada grupo."""
+        return {group: len(self.members(group, transitive)) for group in self.groups()}
@@ -2,10 +2,19 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from .db_manager import DBManager
-from .models import User
+from .models import BulkUserResult, NewUser, User
+from .role_graph import RoleGraph
+from .role_sync import (
+    CREATE_GROUP, CREATE_USER, GRANT, REVOKE, SET_LOGIN, SET_VALID_UNTIL,
+    DesiredRoleState, RoleChange, plan_role_sync,
+)
+
+# Savepoint que isola cada linha de create_users_bulk
+BULK_SAVEPOINT = "geoifsc_bulk_user"
 
 
 class RoleManager:
@@ -14,6 +23,113 @@ class RoleManager:
     def __init__(self, dao: DBManager, logger: Optional[logging.Logger] = None):
         self.dao = dao
         self.logger = logger or logging.getLogger(__name__)
+        self._role_graph: Optional[RoleGraph] = None
+        # Profundidade de transaction() aninhados e falha ocorrida dentro deles
+        self._transaction_depth = 0
+        self._transaction_failed = False
+
+    @contextmanager
+    def transaction(self) -> Iterator["RoleManager"]:
+        """
+        Agrupa várias operações em uma única transação.
+
+        Dentro do bloco os métodos não confirmam nem desfazem por conta
+        própria: tudo é confirmado uma vez ao sair do bloco, ou desfeito se
+        uma exceção escapar dele ou se alguma operação tiver falhado. Blocos
+        aninhados participam da transação mais externa.
+        """
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self._transaction_depth == 1:
+                self._transaction_depth = 0
+                self._transaction_failed = False
+                self.dao.conn.rollback()
+                self._role_graph = None
+            raise
+        finally:
+            if self._transaction_depth:
+                self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            failed, self._transaction_failed = self._transaction_failed, False
+            if failed:
+                self.logger.warning("Transação desfeita: uma das operações falhou")
+                self.dao.conn.rollback()
+                self._role_graph = None
+            else:
+                self._commit()
+
+    def _commit(self) -> None:
+        """Confirma a transação (adiada dentro de transaction()) e descarta o retrato de roles."""
+        self._role_graph = None
+        if self._transaction_depth == 0:
+            self.dao.conn.commit()
+
+    def _rollback(self) -> None:
+        """Desfaz a transação; dentro de transaction() apenas a marca como falha."""
+        if self._transaction_depth:
+            self._transaction_failed = True
+        else:
+            self.dao.conn.rollback()
+
+    # ---------------------- Consultas em memória ----------------------
+
+    def role_graph(self, refresh: bool = False) -> RoleGraph:
+        """
+        Retrato dos roles e associações, carregado em uma consulta e mantido
+        em cache até a próxima alteração feita por este gerenciador.
+        """
+        if self._role_graph is None or refresh:
+            self._role_graph = self.dao.load_role_graph()
+        return self._role_graph
+
+    # ---------------------- Sincronização ----------------------
+
+    def sync_roles(self, desired: DesiredRoleState, dry_run: bool = False) -> List[RoleChange]:
+        """
+        Ajusta usuários, grupos, validades e associações ao estado desejado.
+
+        Compara ``desired`` com um retrato atualizado do cluster e aplica só
+        as alterações necessárias, todas em uma transação. Com ``dry_run``
+        apenas retorna o plano, sem alterar nada.
+        """
+        plan = plan_role_sync(desired, self.role_graph(refresh=True))
+        if dry_run or not plan:
+            return plan
+        try:
+            memberships: Dict[tuple, List[str]] = {}
+            for change in plan:
+                if change.action in (GRANT, REVOKE):
+                    # Agrupa por grupo para um GRANT/REVOKE com vários membros
+                    memberships.setdefault((change.action, change.target), []).append(change.role)
+                else:
+                    self._apply_change(change)
+            for (action, group), members in memberships.items():
+                if action == GRANT:
+                    self.dao.add_users_to_groups(members, [group])
+                else:
+                    self.dao.remove_users_from_groups(members, [group])
+            self._commit()
+        except Exception:
+            self._rollback()
+            self.logger.exception("Falha na sincronização de roles")
+            raise
+        self.logger.info("Sincronização de roles aplicada: %d alterações", len(plan))
+        return plan
+
+    def _apply_change(self, change: RoleChange) -> None:
+        if change.action == CREATE_GROUP:
+            self.dao.create_group(change.role)
+        elif change.action == CREATE_USER:
+            # Sem senha: a autenticação fica a cargo do pg_hba (ex.: LDAP)
+            self.dao.insert_user(change.role, None)
+        elif change.action == SET_LOGIN:
+            self.dao.update_user(change.role, can_login=True)
+        elif change.action == SET_VALID_UNTIL:
+            self.dao.update_user(change.role, valid_until=change.target or "infinity")
+        else:
+            raise ValueError(f"Alteração desconhecida: {change.action}")
 
     # ---------------------- Operações de Usuário ----------------------
 
@@ -21,14 +137,50 @@ class RoleManager:
         """Cria um novo usuário e persiste a transação."""
         try:
             self.dao.insert_user(username, password)
-            self.dao.conn.commit()
+            self._commit()
             self.logger.info("Usuário %s criado", username)
             return username
         except Exception:
-            self.dao.conn.rollback()
+            self._rollback()
             self.logger.exception("Falha ao criar usuário %s", username)
             raise
 
+    def create_users_bulk(self, users: Iterable[NewUser]) -> List[BulkUserResult]:
+        """
+        Cria vários usuários em uma única transação.
+
+        Cada usuário (com validade e grupos) é isolado por um savepoint: uma
+        linha com erro é desfeita e registrada no resultado sem abortar as
+        demais. A transação é confirmada uma única vez ao final.
+        """
+        results: List[BulkUserResult] = []
+        try:
+            for user in users:
+                self.dao.savepoint(BULK_SAVEPOINT)
+                try:
+                    self.dao.insert_user(user.username, user.password)
+                    if user.valid_until:
+                        self.dao.update_user(user.username, valid_until=user.valid_until)
+                    for group in user.groups:
+                        self.dao.add_user_to_group(user.username, group)
+                except Exception as exc:
+                    self.dao.rollback_to_savepoint(BULK_SAVEPOINT)
+                    results.append(BulkUserResult(user.username, False, str(exc).strip()))
+                    self.logger.warning("Falha ao criar usuário %s: %s", user.username, exc)
+                else:
+                    results.append(BulkUserResult(user.username, True))
+                self.dao.release_savepoint(BULK_SAVEPOINT)
+            self._commit()
+        except Exception:
+            self._rollback()
+            self.logger.exception("Falha na criação de usuários em lote")
+            raise
+        created = sum(r.created for r in results)
+        self.logger.info(
+            "%d de %d usuários criados em lote", created, len(results)
+        )
+        return results
+
     def get_user(self, username: str) -> Optional[User]:
         """Obtém dados de um usuário."""
         return self.dao.find_user_by_name(username)
@@ -37,15 +189,27 @@ class RoleManager:
         """Lista usuários registrados."""
         return self.dao.list_users()
 
+    def iter_users(self) -> Iterator[User]:
+        """Percorre os usuários em lotes, via cursor do lado do servidor."""
+        return self.dao.iter_users()
+
+    def list_users_page(self, after: Optional[str] = None, limit: int = 500) -> List[User]:
+        """Página de usuários após ``after``, em ordem de nome."""
+        return self.dao.list_users_page(after, limit)
+
+    def find_users(self, usernames: Iterable[str]) -> Dict[str, User]:
+        """Busca vários usuários de uma vez, indexados pelo nome."""
+        return self.dao.find_users(usernames)
+
     def update_user(self, username: str, **updates: Any) -> bool:
         """Atualiza atributos de um usuário."""
         try:
             self.dao.update_user(username, **updates)
-            self.dao.conn.commit()
+            self._commit()
             self.logger.info("Usuário %s atualizado", username)
             return True
         except Exception:
-            self.dao.conn.rollback()
+            self._rollback()
             self.logger.exception("Falha ao atualizar usuário %s", username)
             raise
 
@@ -53,11 +217,11 @@ class RoleManager:
         """Exclui usuário."""
         try:
             self.dao.delete_user(username)
-            self.dao.conn.commit()
+            self._commit()
             self.logger.info("Usuário %s removido", username)
             return True
         except Exception:
-            self.dao.conn.rollback()
+            self._rollback()
             self.logger.exception("Falha ao remover usuário %s", username)
             raise
 
@@ -65,11 +229,11 @@ class RoleManager:
         """Altera a senha de um usuário."""
         try:
             self.dao.update_user(username, password=new_password)
-            self.dao.conn.commit()
+            self._commit()
             self.logger.info("Senha alterada para %s", username)
             return True
         except Exception:
-            self.dao.conn.rollback()
+            self._rollback()
             self.logger.exception("Falha ao alterar senha de %s", username)
             raise
 
@@ -79,11 +243,11 @@ class RoleManager:
         """Cria um grupo."""
         try:
             self.dao.create_group(group_name)
-            self.dao.conn.commit()
+            self._commit()
             self.logger.info("Grupo %s criado", group_name)
             return group_name
         except Exception:
-            self.dao.conn.rollback()
+            self._rollback()
             self.logger.exception("Falha ao criar grupo %s", group_name)
             raise
 
@@ -91,10 +255,10 @@ class RoleManager:
         """Adiciona usuário ao grupo."""
         try:
             self.dao.add_user_to_group(username, group_name)
-            self.dao.conn.commit()
+            self._commit()
             self.logger.info("%s adicionado a %s", username, group_name)
         except Exception:
-            self.dao.conn.rollback()
+            self._rollback()
             self.logger.exception("Falha ao adicionar %s ao grupo %s", username, group_name)
             raise
 
@@ -102,13 +266,67 @@ class RoleManager:
         """Remove usuário do grupo."""
         try:
             self.dao.remove_user_from_group(username, group_name)
-            self.dao.conn.commit()
+            self._commit()
             self.logger.info("%s removido de %s", username, group_name)
         except Exception:
-            self.dao.conn.rollback()
+            self._rollback()
             self.logger.exception("Falha ao remover %s do grupo %s", username, group_name)
             raise
 
+    def add_users_to_groups(self, usernames: List[str], group_names: List[str]) -> None:
+        """Adiciona vários usuários a vários grupos em poucos comandos."""
+        try:
+            self.dao.add_users_to_groups(usernames, group_names)
+            self._commit()
+            self.logger.info(
+                "%d usuários adicionados a %d grupos", len(usernames), len(group_names)
+            )
+        except Exception:
+            self._rollback()
+            self.logger.exception("Falha ao adicionar usuários aos grupos %s", group_names)
+            raise
+
+    def remove_users_from_groups(self, usernames: List[str], group_names: List[str]) -> None:
+        """Remove vários usuários de vários grupos em poucos comandos."""
+        try:
+            self.dao.remove_users_from_groups(usernames, group_names)
+            self._commit()
+            self.logger.info(
+                "%d usuários removidos de %d grupos", len(usernames), len(group_names)
+            )
+        except Exception:
+            self._rollback()
+            self.logger.exception("Falha ao remover usuários dos grupos %s", group_names)
+            raise
+
+    # ---------------------- Privilégios ----------------------
+
+    def grant_select_on_tables(self, schema: str, tables: List[str], groups: List[str]) -> None:
+        """Concede SELECT nas tabelas aos grupos, com poucos comandos."""
+        try:
+            self.dao.grant_select_on_tables(schema, tables, groups)
+            self._commit()
+            self.logger.info(
+                "SELECT concedido em %d tabelas de %s a %s", len(tables), schema, ", ".join(groups)
+            )
+        except Exception:
+            self._rollback()
+            self.logger.exception("Falha ao conceder SELECT em %s", schema)
+            raise
+
+    def grant_default_select(self, schema: str, groups: List[str]) -> None:
+        """Faz as próximas tabelas criadas no esquema concederem SELECT aos grupos."""
+        try:
+            self.dao.grant_default_select(schema, groups)
+            self._commit()
+            self.logger.info(
+                "Privilégio padrão de SELECT em %s para %s", schema, ", ".join(groups)
+            )
+        except Exception:
+            self._rollback()
+            self.logger.exception("Falha ao alterar privilégios padrão de %s", schema)
+            raise
+
     def list_group_members(self, group_name: str) -> List[str]:
         """Lista membros de um grupo."""
         return self.dao.list_group_members(group_name)
@@ -0,0 +1,119 @@
+"""
+Sincronização declarativa de usuários, grupos e associações.
+
+Compara o estado desejado (por exemplo, exportado do LDAP) com o retrato do
+cluster (``RoleGraph``) e gera apenas as alterações necessárias. Nada é
+removido: roles ausentes do estado desejado são mantidos, e associações só
+são revogadas em grupos descritos no estado desejado.
+"""
+
+import datetime
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from .role_graph import RoleGraph
+
+CREATE_GROUP = "create_group"
+CREATE_USER = "create_user"
+SET_LOGIN = "set_login"
+SET_VALID_UNTIL = "set_valid_until"
+GRANT = "grant"
+REVOKE = "revoke"
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+@dataclass
+class DesiredRoleState:
+    """Estado desejado dos roles gerenciados."""
+
+    # Usuário -> validade (None = sem validade)
+    users: Dict[str, Optional[str]] = field(default_factory=dict)
+    groups: Set[str] = field(default_factory=set)
+    # Role -> grupos dos quais deve ser membro direto
+    memberships: Dict[str, Set[str]] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class RoleChange:
+    """Uma alteração do plano de sincronização."""
+
+    action: str
+    role: str
+    target: Optional[str] = None  # grupo (grant/revoke) ou validade
+
+    def describe(self) -> str:
+        """Forma legível da alteração, para exibir o plano."""
+        if self.action == CREATE_GROUP:
+            return f"CREATE ROLE {self.role} NOLOGIN"
+        if self.action == CREATE_USER:
+            return f"CREATE ROLE {self.role} LOGIN"
+        if self.action == SET_LOGIN:
+            return f"ALTER ROLE {self.role} LOGIN"
+        if self.action == SET_VALID_UNTIL:
+            return f"ALTER ROLE {self.role} VALID UNTIL '{self.target or 'infinity'}'"
+        if self.action == GRANT:
+            return f"GRANT {self.target} TO {self.role}"
+        if self.action == REVOKE:
+            return f"REVOKE {self.target} FROM {self.role}"
+        return f"{self.action} {self.role}"
+
+
+def _validity_key(value) -> Optional[str]:
+    """Normaliza a validade para comparação com precisão de dia."""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if isinstance(value, datetime.date):
+        # O psycopg2 lê 'infinity' como datetime.max / date.max
+        return None if value == datetime.date.max else value.isoformat()
+    text = str(value).strip().lower()
+    if text == "infinity":
+        return None
+    match = _DATE_RE.match(text)
+    return match.group(0) if match else text
+
+
+def plan_role_sync(desired: DesiredRoleState, graph: RoleGraph) -> List[RoleChange]:
+    """
+    Lista as alterações que levam o cluster ao estado desejado.
+
+    A ordem respeita as dependências: grupos e usuários são criados antes
+    das concessões, e as revogações vêm por último.
+    """
+    creates: List[RoleChange] = []
+    alters: List[RoleChange] = []
+    grants: List[RoleChange] = []
+    revokes: List[RoleChange] = []
+
+    for group in sorted(desired.groups):
+        if group not in graph:
+            creates.append(RoleChange(CREATE_GROUP, group))
+
+    for username in sorted(desired.users):
+        valid_until = desired.users[username]
+        current = graph.role(username)
+        if current is None:
+            creates.append(RoleChange(CREATE_USER, username))
+            if valid_until is not None:
+                alters.append(RoleChange(SET_VALID_UNTIL, username, valid_until))
+            continue
+        if not current.can_login:
+            alters.append(RoleChange(SET_LOGIN, username))
+        if _validity_key(current.valid_until) != _validity_key(valid_until):
+            alters.append(RoleChange(SET_VALID_UNTIL, username, valid_until))
+
+    for role in sorted(desired.memberships):
+        current = set(graph.groups_of(role, transitive=False))
+        for group in sorted(desired.memberships[role] - current):
+            grants.append(RoleChange(GRANT, role, group))
+
+    # Revoga apenas em grupos gerenciados pelo estado desejado
+    for group in sorted(desired.groups):
+        for member in graph.members(group, transitive=False):
+            if group not in desired.memberships.get(member, set()):
+                revokes.append(RoleChange(REVOKE, member, group))
+
+    return creates + alters + grants + revokes
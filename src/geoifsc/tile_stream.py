@@ -0,0 +1,59 @@
+"""
+Fluxo de tiles para carga direta no PostGIS via COPY.
+
+Converte um iterável de tiles já codificados em WKB de raster PostGIS (por
+exemplo os gerados por ``raster_tiler.iter_tiles``) nas linhas de texto do
+``COPY ... FROM STDIN``, consumindo os tiles sob demanda: nenhum arquivo
+intermediário é gravado e só um tile fica em memória por vez.
+"""
+
+from typing import Callable, Iterable, Optional
+
+
+class UploadCancelled(Exception):
+    """Levantada quando o upload é cancelado durante o envio dos tiles."""
+
+
+class TileCopyStream:
+    """Arquivo somente leitura com uma linha de WKB hexadecimal por tile.
+
+    Aceita ``bytes`` ou objetos com atributo ``data`` (como ``EncodedTile``).
+    Pode ser passado a ``cursor.copy_expert``, que chama ``read`` até o fim.
+    """
+
+    def __init__(
+        self,
+        tiles: Iterable,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        on_tile: Optional[Callable[[int, int], None]] = None,
+    ):
+        self._tiles = iter(tiles)
+        self._buffer = bytearray()
+        self._cancel_check = cancel_check
+        self._on_tile = on_tile
+        self.tiles = 0
+        self.bytes = 0
+
+    def _next_line(self) -> bool:
+        if self._cancel_check is not None and self._cancel_check():
+            raise UploadCancelled("Upload cancelado")
+        tile = next(self._tiles, None)
+        if tile is None:
+            return False
+        data = getattr(tile, "data", tile)
+        self._buffer += data.hex().encode("ascii") + b"\n"
+        self.tiles += 1
+        self.bytes += len(data)
+        if self._on_tile is not None:
+            self._on_tile(self.tiles, self.bytes)
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            if not self._next_line():
+                break
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
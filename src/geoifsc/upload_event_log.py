@@ -0,0 +1,125 @@
+"""
+Registro estruturado de eventos de upload em JSON lines.
+
+Cada evento vira uma linha JSON em um arquivo com rotação. A thread de upload
+apenas enfileira os registros; a gravação em disco é feita por uma thread
+dedicada (``QueueListener``), de modo que o worker nunca espera por I/O.
+O módulo não depende de Qt e pode ser usado em execuções headless.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+LOG_DIR_ENV = "GEOIFSC_LOG_DIR"
+DEFAULT_LOG_DIR = os.path.join(os.path.expanduser("~"), ".geoifsc", "logs")
+DEFAULT_LOG_FILE = "uploads.jsonl"
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formata registros de log como objetos JSON de uma linha."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+@dataclass
+class FileUploadRecord:
+    """Métricas coletadas durante o upload de um arquivo."""
+
+    file: str
+    table: str
+    bytes: int = 0
+    tiles: int = 0
+    phases: Dict[str, float] = field(default_factory=dict)
+    exit_codes: Dict[str, int] = field(default_factory=dict)
+    # Com use_compression: WKB dos rasters sem compressão, como armazenado
+    # na coluna (após TOAST) e tamanho total da tabela com índices
+    raster_bytes: int = 0
+    stored_raster_bytes: Optional[int] = None
+    table_bytes: Optional[int] = None
+    status: str = "pending"
+    error: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mede a duração (em segundos) de uma fase do upload."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 4)
+
+
+class UploadEventLog:
+    """Log de eventos de upload não bloqueante com rotação de arquivos."""
+
+    def __init__(
+        self,
+        log_dir: Optional[str] = None,
+        file_name: str = DEFAULT_LOG_FILE,
+        max_bytes: int = 5 * 1024 * 1024,
+        backup_count: int = 5,
+    ):
+        self.log_dir = log_dir or os.environ.get(LOG_DIR_ENV) or DEFAULT_LOG_DIR
+        self.log_path = os.path.join(self.log_dir, file_name)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        self._logger = logging.Logger("geoifsc.upload_events")
+        self._logger.addHandler(logging.handlers.QueueHandler(self._queue))
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    @property
+    def active(self) -> bool:
+        """Indica se a thread de gravação está em execução."""
+        return self._listener is not None
+
+    def start(self) -> None:
+        """Abre o arquivo de log e inicia a thread de gravação."""
+        if self._listener is not None:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            self.log_path,
+            maxBytes=self.max_bytes,
+            backupCount=self.backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        handler.setFormatter(JsonLinesFormatter())
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Descarrega a fila pendente e encerra a thread de gravação."""
+        if self._listener is None:
+            return
+        listener, self._listener = self._listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+    def event(self, name: str, level: int = logging.INFO, **fields: Any) -> None:
+        """Enfileira um evento; ignorado enquanto o log não estiver ativo."""
+        if self._listener is None:
+            return
+        self._logger.log(level, name, extra={"fields": fields})
+
+    def file_completed(self, record: FileUploadRecord) -> None:
+        """Registra o resumo de um arquivo processado."""
+        level = logging.INFO if record.status == "success" else logging.WARNING
+        self.event("file_completed", level=level, **asdict(record))
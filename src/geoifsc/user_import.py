@@ -0,0 +1,69 @@
+"""
+Importação de usuários para criação em lote.
+
+Lê arquivos CSV ou JSON com os usuários a criar e os converte em
+``NewUser`` para ``RoleManager.create_users_bulk``.
+
+CSV: cabeçalho com ``username`` e ``password`` e, opcionalmente,
+``valid_until`` e ``groups`` (grupos separados por ``;``).
+JSON: lista de objetos com as mesmas chaves (``groups`` como lista).
+"""
+
+import csv
+import json
+import os
+from typing import Any, Dict, Iterable, List
+
+from .models import NewUser
+
+GROUP_SEPARATOR = ";"
+
+
+def _parse_groups(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(GROUP_SEPARATOR)
+    return [group.strip() for group in value if group and group.strip()]
+
+
+def users_from_records(records: Iterable[Dict[str, Any]]) -> List[NewUser]:
+    """Converte registros (dicionários) em ``NewUser``, validando os campos obrigatórios."""
+    users = []
+    for line, record in enumerate(records, start=1):
+        username = (record.get("username") or "").strip()
+        password = record.get("password") or ""
+        if not username or not password:
+            raise ValueError(f"Registro {line}: 'username' e 'password' são obrigatórios")
+        users.append(NewUser(
+            username=username,
+            password=password,
+            valid_until=(record.get("valid_until") or "").strip() or None,
+            groups=_parse_groups(record.get("groups")),
+        ))
+    return users
+
+
+def load_users_csv(path: str) -> List[NewUser]:
+    """Lê usuários de um arquivo CSV."""
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        return users_from_records(csv.DictReader(fh))
+
+
+def load_users_json(path: str) -> List[NewUser]:
+    """Lê usuários de um arquivo JSON (lista de objetos)."""
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, list):
+        raise ValueError("O arquivo JSON deve conter uma lista de usuários")
+    return users_from_records(data)
+
+
+def load_users(path: str) -> List[NewUser]:
+    """Lê usuários de um arquivo ``.csv`` ou ``.json``."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return load_users_csv(path)
+    if ext == ".json":
+        return load_users_json(path)
+    raise ValueError(f"Formato não suportado: {ext or path}")
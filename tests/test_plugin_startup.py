@@ -0,0 +1,83 @@
+"""Inicialização do plugin: importação preguiçosa e tempos de carga.
+
+A verificação de que os módulos pesados não são importados sempre roda.
+Os tempos são registrados como propriedades do teste, mas os limites só
+são exigidos com GEOIFSC_TIMING_TESTS=1, pois dependem da máquina; podem
+ser ajustados com GEOIFSC_IMPORT_BUDGET_MS e GEOIFSC_INITGUI_BUDGET_MS.
+"""
+import builtins
+import importlib
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+TIMING_TESTS = os.environ.get("GEOIFSC_TIMING_TESTS") == "1"
+IMPORT_BUDGET_MS = float(os.environ.get("GEOIFSC_IMPORT_BUDGET_MS", "250"))
+INITGUI_BUDGET_MS = float(os.environ.get("GEOIFSC_INITGUI_BUDGET_MS", "50"))
+
+HEAVY_MODULES = (
+    "geoifsc.raster_upload_dialog",
+    "geoifsc.raster_upload_controller",
+    "geoifsc.raster_uploader_service",
+    "geoifsc.db_manager",
+)
+
+
+@pytest.fixture
+def fresh_package():
+    saved = {name: mod for name, mod in sys.modules.items()
+             if name == "geoifsc" or name.startswith("geoifsc.")}
+    for name in saved:
+        del sys.modules[name]
+    yield
+    for name in [n for n in sys.modules if n == "geoifsc" or n.startswith("geoifsc.")]:
+        del sys.modules[name]
+    sys.modules.update(saved)
+
+
+def test_plugin_import_is_lazy(fresh_package, record_property):
+    start = time.perf_counter()
+    importlib.import_module("geoifsc.geoifsc_plugin")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    record_property("import_ms", round(elapsed_ms, 2))
+
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    assert loaded == []
+    if TIMING_TESTS:
+        assert elapsed_ms < IMPORT_BUDGET_MS
+
+
+def test_init_gui_defers_dialog(monkeypatch, record_property):
+    import geoifsc.geoifsc_plugin as plugin_module
+
+    # initGui substitui print/excepthook; monkeypatch restaura ao final
+    monkeypatch.setattr(builtins, "print", builtins.print)
+    monkeypatch.setattr(sys, "excepthook", sys.excepthook)
+    for name in ("QMenu", "QAction", "QIcon"):
+        monkeypatch.setattr(plugin_module, name, MagicMock())
+
+    plugin = plugin_module.GeoIFSCPlugin(MagicMock())
+    start = time.perf_counter()
+    plugin.initGui()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    record_property("initgui_ms", round(elapsed_ms, 2))
+
+    assert plugin.dialog is None
+    if TIMING_TESTS:
+        assert elapsed_ms < INITGUI_BUDGET_MS
+
+
+def test_dialog_is_reused(monkeypatch):
+    import geoifsc.geoifsc_plugin as plugin_module
+
+    plugin = plugin_module.GeoIFSCPlugin(MagicMock())
+    plugin.dialog = MagicMock()
+    existing = plugin.dialog
+
+    plugin.run_raster_upload()
+
+    assert plugin.dialog is existing
+    existing.show.assert_called_once()
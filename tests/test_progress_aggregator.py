@@ -0,0 +1,53 @@
+from geoifsc.progress_aggregator import ProgressAggregator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_snapshot_weights_by_bytes_and_reports_eta():
+    clock = FakeClock()
+    published = []
+    agg = ProgressAggregator(published.append, clock=clock)
+    agg.start_batch(["a.tif", "b.tif"], {"a.tif": 300, "b.tif": 100})
+
+    agg.file_started("a.tif")
+    clock.now = 3.0
+    agg.file_finished("a.tif", success=True)
+    snap = agg.snapshot()
+
+    assert snap.percentage == 75
+    assert snap.files_completed == 1
+    assert snap.throughput == 100.0
+    assert snap.eta == 1.0
+    assert snap.files["a.tif"].state == "success"
+
+
+def test_snapshot_only_carries_changed_files():
+    agg = ProgressAggregator(lambda s: None, clock=FakeClock())
+    agg.start_batch(["a.tif", "b.tif"])
+    agg.file_started("a.tif")
+    assert set(agg.snapshot().files) == {"a.tif"}
+
+    agg.file_progress("b.tif", 0.5)
+    snap = agg.snapshot()
+    assert set(snap.files) == {"b.tif"}
+    assert snap.percentage == 25
+
+
+def test_stop_publishes_final_snapshot():
+    published = []
+    agg = ProgressAggregator(published.append, rate_hz=100, clock=FakeClock())
+    agg.start_batch(["a.tif"])
+    agg.start()
+    agg.file_finished("a.tif", success=False, error="boom")
+    agg.stop()
+
+    final = published[-1]
+    assert final.finished
+    assert final.files_failed == 1
+    assert final.percentage == 100
@@ -0,0 +1,63 @@
+import time
+
+from geoifsc.raster_file_index import (
+    COLUMN_NAME, COLUMN_SIZE, RasterFileIndex, RasterFileInfo,
+    estimate_table_bytes, format_bytes,
+)
+
+
+def test_filter_and_sort_keep_view_positions():
+    index = RasterFileIndex()
+    index.set_files(["/d/b.tif", "/d/a.tif", "/d/c.png"])
+
+    index.set_filter("TIF")
+    assert [index.row(i).name for i in range(len(index))] == ["b.tif", "a.tif"]
+
+    index.sort(COLUMN_NAME)
+    assert [index.row(i).name for i in range(len(index))] == ["a.tif", "b.tif"]
+    assert index.update(RasterFileInfo(path="/d/b.tif", size=10, probed=True)) == 1
+    assert index.update(RasterFileInfo(path="/d/c.png", probed=True)) is None
+    assert index.total == 3
+
+
+def test_unprobed_rows_sort_first():
+    index = RasterFileIndex()
+    index.set_files(["x.tif", "y.tif"])
+    index.update(RasterFileInfo(path="x.tif", size=5, probed=True))
+    index.sort(COLUMN_SIZE)
+    assert index.row(0).path == "y.tif"
+
+
+def test_add_files_skips_duplicates():
+    index = RasterFileIndex()
+    index.set_files(["a.tif"])
+    assert index.add_files(["a.tif", "b.tif"]) == 1
+    assert index.paths() == ["a.tif", "b.tif"]
+
+
+def test_sort_and_filter_100k_rows_fast():
+    index = RasterFileIndex()
+    index.set_files(f"/tiles/tile_{i:06d}.tif" for i in range(100_000))
+    start = time.perf_counter()
+    index.sort(COLUMN_NAME, descending=True)
+    index.set_filter("_0999")
+    elapsed = time.perf_counter() - start
+    assert len(index) == 100
+    assert elapsed < 2.0
+
+
+def test_estimates_and_formatting():
+    assert estimate_table_bytes(512, 512, 1, 1) == 512 * 512 + 61 + 9
+    assert format_bytes(None) == ""
+    assert format_bytes(2048) == "2.0 KB"
+
+
+def test_set_files_keeps_probed_metadata():
+    index = RasterFileIndex()
+    index.set_files(["a.tif", "b.tif"])
+    index.update(RasterFileInfo(path="a.tif", size=7, probed=True))
+    index.update(RasterFileInfo(path="b.tif", size=9, probed=True))
+    index.set_files(["c.tif", "a.tif"])
+    assert [index.row(i).probed for i in range(len(index))] == [False, True]
+    assert index.row(1).size == 7
+    assert index.update(RasterFileInfo(path="b.tif", probed=True)) is None
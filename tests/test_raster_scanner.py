@@ -0,0 +1,96 @@
+import threading
+import zipfile
+
+from geoifsc.geoifsc_utils import raster_path_size, vsizip_path
+from geoifsc.raster_scanner import RasterFolderScanner, iter_raster_paths, scan_in_batches
+
+
+def make_tree(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "deep").mkdir(parents=True)
+    (tmp_path / "a" / "deep" / "x.tif").write_bytes(b"1")
+    (tmp_path / "a" / "notes.txt").write_text("x")
+    (tmp_path / "b" / "mosaic.vrt").write_text("<VRTDataset/>")
+    with zipfile.ZipFile(tmp_path / "b" / "tiles.zip", "w") as zf:
+        zf.writestr("t1.tif", b"12345")
+        zf.writestr("readme.txt", "x")
+    return tmp_path
+
+
+def test_scan_walks_recursively_and_expands_zip(tmp_path):
+    root = make_tree(tmp_path)
+    found = list(iter_raster_paths([str(root)], check_openable=False))
+
+    zip_member = vsizip_path(str(root / "b" / "tiles.zip"), "t1.tif")
+    assert found == [
+        str(root / "a" / "deep" / "x.tif"),
+        str(root / "b" / "mosaic.vrt"),
+        zip_member,
+    ]
+    assert raster_path_size(zip_member) == 5
+
+
+def test_scan_in_batches_and_cancel(tmp_path):
+    root = make_tree(tmp_path)
+    batches = []
+    total = scan_in_batches([str(root)], batches.append, batch_size=2, check_openable=False)
+    assert total == 3
+    assert [len(b) for b in batches] == [2, 1]
+
+    cancel = threading.Event()
+    cancel.set()
+    assert scan_in_batches([str(root)], batches.append, cancel_event=cancel) == 0
+
+
+def test_scanner_stop_joins_worker(tmp_path):
+    root = make_tree(tmp_path)
+    scanner = RasterFolderScanner(check_openable=False)
+    assert scanner.scan([str(root)])
+    assert scanner.stop()
+    assert not scanner.is_running()
+
+
+class QueuedSignal:
+    """Guarda as emissões como a fila de eventos do Qt; pode segurar a thread emissora."""
+
+    def __init__(self, hold: bool = False):
+        self.queue = []
+        self.emitted = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def emit(self, *args):
+        self.queue.append(args)
+        self.emitted.set()
+        self.release.wait(5)
+
+
+def test_clear_during_scan_drops_queued_batches(tmp_path):
+    from geoifsc.raster_file_index import RasterFileIndex
+
+    (tmp_path / "tree").mkdir()
+    root = make_tree(tmp_path / "tree")
+    (tmp_path / "empty").mkdir()
+    scanner = RasterFolderScanner(batch_size=1, check_openable=False)
+    scanner.batch_found = QueuedSignal(hold=True)
+    scanner.scan_finished = QueuedSignal()
+    model = RasterFileIndex()
+
+    assert scanner.scan([str(root)])
+    assert scanner.batch_found.emitted.wait(5)
+    # "Limpar" durante a busca: cancela e esvazia a lista
+    scanner.cancel()
+    model.set_files([])
+    # Uma nova busca é aceita enquanto a thread cancelada ainda termina
+    assert scanner.scan([str(tmp_path / "empty")])
+    scanner.batch_found.release.set()
+    assert scanner.stop()
+
+    # Entrega dos eventos enfileirados, como em RasterUploadDialog._on_scan_batch
+    for scan_id, paths in scanner.batch_found.queue:
+        if scanner.is_active(scan_id):
+            model.add_files(paths)
+    assert model.total == 0
+    finished = [args[:2] for args in scanner.scan_finished.queue if scanner.is_current(args[0])]
+    assert finished == [(scanner.scan_id, 0)]
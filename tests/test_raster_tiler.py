@@ -0,0 +1,225 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("osgeo")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import raster_tiler  # noqa: E402
+
+
+def test_plan_windows_cover_raster_row_major():
+    windows = raster_tiler.plan_windows(1000, 700, 400, 400)
+    assert [(w.row, w.col) for w in windows] == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
+    assert sum(w.width * w.height for w in windows) == 1000 * 700
+    assert windows[-1].name == "tile_001_002.tif"
+
+
+def test_aligned_grid_snaps_to_blocks_within_budget():
+    plan = raster_tiler.plan_grid(10000, 8000, 4, 50, block_size=(256, 256))
+    assert plan.tile_width % 256 == 0 and plan.tile_height % 256 == 0
+    assert plan.tile_width * plan.tile_height * 4 <= 50 * 1024 * 1024
+    assert plan.read_amplification == pytest.approx(1.0)
+
+
+def test_striped_source_uses_full_width_strips():
+    plan = raster_tiler.plan_grid(10000, 8000, 4, 50, block_size=(10000, 1))
+    unaligned = raster_tiler.plan_grid(10000, 8000, 4, 50, block_size=(10000, 1), align=False)
+    assert plan.tile_width == 10000
+    assert unaligned.read_amplification == pytest.approx(3.0)
+
+
+def test_window_index_round_trip(tmp_path):
+    windows = raster_tiler.plan_windows(300, 200, 200, 200)
+    path = tmp_path / raster_tiler.INDEX_FILE
+    raster_tiler.write_window_index(str(path), "/data/src.tif", 300, 200, windows, ".vrt")
+
+    index = raster_tiler.read_window_index(str(path))
+    assert index["source"] == "/data/src.tif"
+    assert [t["name"] for t in index["tiles"]] == ["tile_000_000.vrt", "tile_000_001.vrt"]
+    assert index["tiles"][1]["src_win"] == [200, 0, 100, 200]
+
+
+def test_sample_windows_stay_inside_raster():
+    windows = raster_tiler.sample_windows(2000, 1000, 8, 512)
+    assert len({(w.x_off, w.y_off) for w in windows}) == 8
+    assert all(w.x_off + w.width <= 2000 and w.y_off + w.height <= 1000 for w in windows)
+
+
+def test_compression_ratio_enlarges_tiles():
+    plain = raster_tiler.plan_grid(20000, 20000, 4, 50, align=False)
+    compressed = raster_tiler.plan_grid(20000, 20000, 4 * 0.25, 50, align=False)
+    assert compressed.tile_width == pytest.approx(plain.tile_width * 2, rel=0.01)
+
+
+def test_overview_levels_stop_at_one_block():
+    assert raster_tiler.overview_levels(512, 300) == []
+    assert raster_tiler.overview_levels(4000, 1000) == [2, 4, 8]
+
+
+def test_classify_block_detects_nodata_and_constant():
+    np = pytest.importorskip("numpy")
+    nodata = np.full((4, 4), -9999.0)
+    assert raster_tiler.classify_block(nodata, -9999.0) == "nodata"
+    assert raster_tiler.classify_block(np.full((4, 4), np.nan), float("nan")) == "nodata"
+
+    flat = np.full((4, 4), 7)
+    assert raster_tiler.classify_block(flat, -9999.0) is None
+    assert raster_tiler.classify_block(flat, None, skip_constant=True) == "constant"
+
+    data = np.arange(16).reshape(4, 4)
+    assert raster_tiler.classify_block(data, 0, skip_constant=True) is None
+
+
+def test_manifest_ignores_truncated_line_and_checks_files(tmp_path):
+    window = raster_tiler.TileWindow(0, 0, 0, 0, 10, 10)
+    (tmp_path / window.name).write_bytes(b"x" * 10)
+    result = raster_tiler.TileResult(
+        window, size=10, checksum=raster_tiler.file_checksum(str(tmp_path / window.name))
+    )
+    manifest = raster_tiler.TileManifest(str(tmp_path / raster_tiler.MANIFEST_FILE))
+    manifest.rewrite({"tile_size": [10, 10]}, [])
+    manifest.append(result.record(".tif"))
+    manifest.close()
+    with open(manifest.path, "a") as fh:
+        fh.write('{"name": "tile_000_0')
+
+    settings, entries = manifest.load()
+    assert settings == {"tile_size": [10, 10]}
+    entry = entries[window.name]
+    assert raster_tiler.tile_is_complete(entry, window, str(tmp_path), verify_checksum=True)
+
+    (tmp_path / window.name).write_bytes(b"y" * 10)
+    assert raster_tiler.tile_is_complete(entry, window, str(tmp_path))
+    assert not raster_tiler.tile_is_complete(entry, window, str(tmp_path), verify_checksum=True)
+    other = raster_tiler.TileWindow(0, 0, 0, 0, 20, 10)
+    assert not raster_tiler.tile_is_complete(entry, other, str(tmp_path))
+
+
+def test_plan_memory_splits_budget_between_workers():
+    mb = 1024 * 1024
+    memory = raster_tiler.plan_memory(512, 4, 4096, (256, 256), 4)
+    assert memory.per_worker_bytes == 128 * mb
+    # One row of blocks across the tile (16 x 256x256x4 = 4 MB) fits in half
+    assert memory.cache_bytes == 64 * mb
+    assert memory.cache_bytes + memory.swath_bytes == memory.per_worker_bytes
+    assert memory.strip_rows(4096, 4) == 64 * mb // (4096 * 4)
+
+    with pytest.raises(ValueError):
+        raster_tiler.plan_memory(2, 8, 4096, (256, 256), 4)
+
+
+def test_postgis_wkb_header_and_pixels():
+    gdal = raster_tiler.gdal
+    ds = gdal.GetDriverByName("MEM").Create("", 4, 3, 1, gdal.GDT_Byte)
+    ds.SetGeoTransform((100.0, 10.0, 0.0, 500.0, 0.0, -10.0))
+    ds.GetRasterBand(1).SetNoDataValue(0)
+    ds.GetRasterBand(1).Fill(7)
+
+    window = raster_tiler.TileWindow(0, 1, 2, 1, 2, 2)
+    wkb = raster_tiler.postgis_raster_wkb(ds, window, srid=31982)
+    header = raster_tiler.struct.unpack("<BHHddddddiHH", wkb[:61])
+    assert header[2] == 1
+    assert header[5:7] == (120.0, 490.0)
+    assert header[9:] == (31982, 2, 2)
+    assert wkb[61] == 4 | raster_tiler.WKB_HAS_NODATA
+    assert wkb[63:] == bytes([7] * 4)
+
+
+def test_remove_partial_files_only_touches_own_names(tmp_path):
+    windows = raster_tiler.plan_windows(20, 10, 10, 10)
+    own = ["tile_000_000.tif.part", "tile_000_001.tif.part", "manifest.jsonl.part"]
+    foreign = ["download.zip.part", "tile_009_009.tif.part"]
+    for name in own + foreign:
+        (tmp_path / name).write_bytes(b"x")
+    raster_tiler._remove_partial_files(str(tmp_path), windows, ".tif")
+    assert sorted(os.listdir(tmp_path)) == sorted(foreign)
+
+
+def test_samples_must_be_positive_and_ratio_ignores_skipped():
+    with pytest.raises(SystemExit):
+        raster_tiler.main(["in.tif", "out", "--samples", "0"])
+    report = raster_tiler.TilingReport(tiles=1, bytes_written=250, source_bytes=4000,
+                                       elapsed=1.0, workers=1, tile_source_bytes=1000)
+    assert report.actual_ratio == pytest.approx(0.25)
+
+
+def make_source(path):
+    """64×64 tiled GTiff: one nodata block, one constant block, the rest varied."""
+    gdal = raster_tiler.gdal
+    ds = gdal.GetDriverByName("GTiff").Create(
+        str(path), 64, 64, 1, gdal.GDT_Byte,
+        options=["TILED=YES", "BLOCKXSIZE=16", "BLOCKYSIZE=16"],
+    )
+    ds.SetGeoTransform((500000.0, 1.0, 0.0, 7000000.0, 0.0, -1.0))
+    band = ds.GetRasterBand(1)
+    band.SetNoDataValue(0)
+    pixels = bytearray((x * 3 + y * 5) % 250 + 1 for y in range(64) for x in range(64))
+    band.WriteRaster(0, 0, 64, 64, bytes(pixels))
+    band.WriteRaster(0, 0, 16, 16, bytes(16 * 16))       # tile_000_000: nodata
+    band.WriteRaster(32, 16, 16, 16, bytes([7] * 16 * 16))  # tile_001_002: constant
+    ds = None
+    return str(path)
+
+
+def manifest_checksums(output_dir):
+    entries = raster_tiler.TileManifest(os.path.join(output_dir, raster_tiler.MANIFEST_FILE)).load()[1]
+    return {name: entry.get("sha256") for name, entry in entries.items()}
+
+
+TILE_MB = 16 * 16 / (1024 * 1024)  # one 16×16 Byte block per tile
+
+
+def test_tile_raster_end_to_end_workers_resume_and_skip(tmp_path):
+    source = make_source(tmp_path / "src.tif")
+    serial, parallel = tmp_path / "serial", tmp_path / "parallel"
+    serial.mkdir()
+    parallel.mkdir()
+    options = dict(max_size_mb=TILE_MB, skip_empty=True, skip_constant=True)
+
+    report = raster_tiler.tile_raster(source, str(serial), workers=1, **options)
+    assert (report.tiles, report.skipped) == (14, 2)
+    raster_tiler.tile_raster(source, str(parallel), workers=2, **options)
+    checksums = manifest_checksums(serial)
+    assert len(checksums) == 16
+    assert manifest_checksums(parallel) == checksums
+
+    with open(parallel / raster_tiler.SKIPPED_FILE, encoding="utf-8") as fh:
+        skipped = {entry["name"]: entry["reason"] for entry in raster_tiler.json.load(fh)}
+    assert skipped == {"tile_000_000.tif": "nodata", "tile_001_002.tif": "constant"}
+    assert not (parallel / "tile_000_000.tif").exists()
+
+    os.remove(parallel / "tile_002_003.tif")
+    resumed = raster_tiler.tile_raster(source, str(parallel), workers=2, resume=True,
+                                       verify_checksums=True, **options)
+    assert resumed.resumed == 15
+    assert manifest_checksums(parallel) == checksums
+
+
+@pytest.mark.parametrize("profile", ["gtiff", "cog", "cog-fallback"])
+def test_tile_raster_profiles_and_virtual_output(tmp_path, monkeypatch, profile):
+    source = make_source(tmp_path / "src.tif")
+    if profile == "cog-fallback":
+        # GDAL without the COG driver: tiled GTiff with overviews built afterwards
+        fallback = raster_tiler.OutputProfile("GTiff", ("TILED=YES",), build_overviews=True)
+        monkeypatch.setattr(raster_tiler, "output_profile", lambda *args: fallback)
+        monkeypatch.setattr(raster_tiler, "overview_levels", lambda width, height: [2])
+        profile = "cog"
+    out = tmp_path / "tiles"
+    out.mkdir()
+    report = raster_tiler.tile_raster(source, str(out), max_size_mb=TILE_MB * 4,
+                                      profile=profile)
+    assert report.tiles == 4
+    tile = raster_tiler.gdal.Open(str(out / "tile_000_000.tif"))
+    assert (tile.RasterXSize, tile.RasterYSize) == (32, 32)
+
+    virtual = tmp_path / "vrt"
+    virtual.mkdir()
+    raster_tiler.tile_raster(source, str(virtual), max_size_mb=TILE_MB * 4,
+                             profile=profile, virtual=True)
+    names = sorted(os.listdir(virtual))
+    assert [n for n in names if n.endswith(".vrt")] == [
+        "tile_000_000.vrt", "tile_000_001.vrt", "tile_001_000.vrt", "tile_001_001.vrt",
+    ]
+    assert not [n for n in names if n.endswith((".ovr", ".part"))]
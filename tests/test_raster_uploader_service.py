@@ -51,3 +51,161 @@ def test_find_executables(monkeypatch):
     assert p and p.lower().endswith("raster2pgsql.exe")
     p2 = s.find_psql()
     assert p2 and p2.lower().endswith("psql.exe")
+
+def test_lz4_support_checked_once_per_server():
+    from unittest.mock import MagicMock
+    import geoifsc.raster_uploader_service as rus
+    from geoifsc.raster_upload_params import ConnectionParams, RasterUploadParams
+    s = rus.RasterUploaderService()
+    params = RasterUploadParams([], ConnectionParams("h", 5432, "db", "u", ""))
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (True,)
+    assert s._check_compression(cursor, params) == "lz4"
+    assert s._check_compression(cursor, params) == "lz4"
+    assert cursor.execute.call_count == 1
+    # PostgreSQL < 14: default_toast_compression não existe
+    cursor.fetchone.return_value = (False,)
+    params.connection.host = "antigo"
+    assert s._check_compression(cursor, params) is None
+
+
+def test_raster_sql_bytes_counts_wkb_literals():
+    import geoifsc.raster_uploader_service as rus
+    sql = ("BEGIN;\nINSERT INTO \"public\".\"t\" (\"rast\") VALUES ('0100FF'::raster);\n"
+           "INSERT INTO \"public\".\"t\" (\"rast\") VALUES ('0A0B'::raster);\nEND;\n")
+    assert rus.raster_sql_bytes(sql) == 5
+
+
+def _fake_psql_run(psql_code, psql_out):
+    calls = []
+
+    def run(command, env=None, input_text=None, cancel_check_func=None, timeout=None):
+        calls.append((command, input_text))
+        if "psql" in os.path.basename(command[0]):
+            return psql_code, psql_out, "erro" if psql_code else ""
+        return 0, "INSERT INTO \"public\".\"t\" (\"rast\") VALUES ('0100'::raster);\n", ""
+
+    return run, calls
+
+
+def _single_raster_service(monkeypatch, tmp_path, run):
+    import geoifsc.raster_uploader_service as rus
+    from geoifsc.raster_upload_params import ConnectionParams, RasterUploadParams
+    monkeypatch.setattr(rus, "run_subprocess_with_cancel", run)
+    s = rus.RasterUploaderService()
+    monkeypatch.setattr(s, "_check_gdal_environment", lambda: None)
+    monkeypatch.setattr(s, "_check_raster_file_info", lambda path: None)
+    raster = tmp_path / "r.tif"
+    raster.write_bytes(b"0" * 16)
+    params = RasterUploadParams([str(raster)], ConnectionParams("h", 5432, "db", "u", ""),
+                                raster2pgsql_path=str(bin1 / "raster2pgsql.exe"),
+                                psql_path=str(bin1 / "psql.exe"))
+    return s, str(raster), params
+
+
+def test_single_raster_loads_indexes_and_analyzes_in_one_transaction(monkeypatch, tmp_path):
+    import geoifsc.raster_uploader_service as rus
+    from geoifsc.upload_event_log import FileUploadRecord
+    out = "\n".join(f"{rus.PHASE_MARKER}|{name}|{epoch}" for name, epoch in
+                    (("start", 100.0), ("transfer", 101.0), ("index", 101.5), ("constraints", 101.75)))
+    run, calls = _fake_psql_run(0, out)
+    s, raster, params = _single_raster_service(monkeypatch, tmp_path, run)
+    record = FileUploadRecord(file=raster, table="t")
+    assert s._upload_single_raster(raster, "t", params, record)
+    r2p, psql = calls
+    assert "-e" in r2p[0] and "-M" not in r2p[0]
+    assert "--single-transaction" in psql[0] and "ON_ERROR_STOP=1" in psql[0]
+    script = psql[1]
+    assert script.index("INSERT INTO") < script.index("CREATE INDEX") < script.index("ANALYZE") \
+        < script.index("AddRasterConstraints")
+    assert record.phases["index"] == 0.5 and record.phases["constraints"] == 0.25
+
+
+def test_single_raster_failure_names_phase(monkeypatch, tmp_path):
+    import geoifsc.raster_uploader_service as rus
+    from geoifsc.upload_event_log import FileUploadRecord
+    out = f"{rus.PHASE_MARKER}|start|100.0\n{rus.PHASE_MARKER}|transfer|101.0"
+    run, calls = _fake_psql_run(3, out)
+    s, raster, params = _single_raster_service(monkeypatch, tmp_path, run)
+    record = FileUploadRecord(file=raster, table="t")
+    assert not s._upload_single_raster(raster, "t", params, record)
+    assert record.exit_codes["psql"] == 3
+    assert record.error == "psql saiu com código 3 na fase index"
+    assert "index" not in record.phases
+
+
+def _grant_service(monkeypatch, tmp_path, grant_mode, fail_on=None):
+    """Serviço com conexão simulada que registra uploads e comandos SQL em ordem."""
+    from unittest.mock import MagicMock
+    import psycopg2
+    import geoifsc.raster_uploader_service as rus
+    from geoifsc.raster_upload_params import ConnectionParams, RasterUploadParams
+
+    steps = []
+
+    def execute(query, *args):
+        text = repr(query)
+        if fail_on and fail_on in text:
+            raise psycopg2.ProgrammingError("permissão negada")
+        steps.append(("sql", text))
+
+    def upload(raster_file, table_name, params, record):
+        steps.append(("upload", table_name))
+        return True
+
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.execute.side_effect = execute
+    s = rus.RasterUploaderService(event_log=MagicMock())
+    monkeypatch.setattr(s, "_connect", lambda params: conn)
+    monkeypatch.setattr(s, "_upload_single_raster", upload)
+    for signal in ("log_message", "file_upload_success", "file_upload_error"):
+        setattr(s, signal, MagicMock())
+    files = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.tif"
+        path.write_bytes(b"0")
+        files.append(str(path))
+    params = RasterUploadParams(files, ConnectionParams("h", 5432, "db", "u", "", schema="rasters"),
+                                grant_select_to=["leitores"], grant_mode=grant_mode,
+                                use_compression=False)
+    return s, params, steps, conn
+
+
+def _logged(service):
+    return [c.args[0] for c in service.log_message.emit.call_args_list]
+
+
+def test_default_privileges_granted_before_batch(monkeypatch, tmp_path):
+    from geoifsc.raster_upload_params import GRANT_MODE_DEFAULT_PRIVILEGES
+    s, params, steps, conn = _grant_service(monkeypatch, tmp_path, GRANT_MODE_DEFAULT_PRIVILEGES)
+    s._upload_rasters_worker(params)
+    kinds = [kind for kind, _ in steps]
+    assert kinds == ["sql", "sql", "upload", "upload"]
+    assert "ALTER DEFAULT PRIVILEGES" in steps[1][1]
+    conn.commit.assert_called_once()
+    conn.close.assert_called_once()
+
+
+def test_table_grant_issued_once_after_batch(monkeypatch, tmp_path):
+    from geoifsc.raster_upload_params import GRANT_MODE_TABLES
+    s, params, steps, conn = _grant_service(monkeypatch, tmp_path, GRANT_MODE_TABLES)
+    s._upload_rasters_worker(params)
+    assert [kind for kind, _ in steps] == ["upload", "upload", "sql", "sql"]
+    grants = [text for _, text in steps if "GRANT SELECT ON TABLE" in text]
+    assert len(grants) == 1
+    assert "'a'" in grants[0] and "'b'" in grants[0]
+
+
+def test_grant_failure_keeps_uploaded_files(monkeypatch, tmp_path):
+    from geoifsc.raster_upload_params import GRANT_MODE_TABLES
+    s, params, steps, conn = _grant_service(monkeypatch, tmp_path, GRANT_MODE_TABLES,
+                                            fail_on="GRANT SELECT ON TABLE")
+    s._upload_rasters_worker(params)
+    assert any("ERRO: falha ao conceder privilégios" in message for message in _logged(s))
+    s.file_upload_error.emit.assert_not_called()
+    assert s.file_upload_success.emit.call_count == 2
+    conn.rollback.assert_called_once()
+    conn.close.assert_called_once()
+    records = [c.args[0] for c in s.event_log.file_completed.call_args_list]
+    assert [r.status for r in records] == ["success", "success"]
+    assert "grants_applied" not in [c.args[0] for c in s.event_log.event.call_args_list]
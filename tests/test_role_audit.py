@@ -0,0 +1,49 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from geoifsc import role_audit
+from geoifsc.db_manager import DBManager
+from geoifsc.models import TablePrivilege
+from geoifsc.raster_upload_params import ConnectionParams
+from geoifsc.role_graph import RoleGraph
+
+
+def test_audit_fans_out_and_merges(monkeypatch):
+    graphs = {
+        "geo1": RoleGraph([("ana", True, None, ["sig"]), ("sig", False, None, [])]),
+        "geo2": RoleGraph([("ana", True, None, []), ("sig", False, None, [])]),
+    }
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_connect(params):
+        with lock:
+            active.append(params.database)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(params.database)
+        if params.database == "down":
+            raise RuntimeError("connection refused")
+        conn = MagicMock()
+        conn.database = params.database
+        return conn
+
+    monkeypatch.setattr(DBManager, "load_role_graph", lambda self: graphs[self.conn.database])
+    monkeypatch.setattr(DBManager, "list_raster_table_privileges", lambda self: [
+        TablePrivilege("public", "dem", "sig", "SELECT")
+    ])
+    databases = [ConnectionParams("h", 5432, name, "auditor", "") for name in ("geo1", "geo2", "down")]
+
+    report = role_audit.audit_databases(databases, max_workers=3, connect_func=fake_connect)
+
+    assert max(peak) > 1
+    assert [a.database for a in report.databases] == ["h:5432/geo1", "h:5432/geo2", "h:5432/down"]
+    assert report.role_presence()["ana"] == ["h:5432/geo1", "h:5432/geo2"]
+    assert report.group_memberships() == {"sig": {"h:5432/geo1": ["ana"]}}
+    data = report.to_dict()
+    assert data["errors"] == {"h:5432/down": "connection refused"}
+    assert set(data["timing"]) == {"h:5432/geo1", "h:5432/geo2", "h:5432/down"}
+    assert data["privileges"]["h:5432/geo1"][0]["grantee"] == "sig"
@@ -0,0 +1,45 @@
+from unittest.mock import MagicMock
+
+from geoifsc.db_manager import DBManager
+from geoifsc.role_graph import RoleGraph
+from geoifsc.role_manager import RoleManager
+
+ROWS = [
+    ("ana", True, None, ["alunos"]),
+    ("bruno", True, "2026-12-31", ["alunos", "monitores"]),
+    ("alunos", False, None, ["leitores"]),
+    ("monitores", False, None, ["leitores"]),
+    ("leitores", False, None, []),
+]
+
+
+def test_transitive_and_reverse_lookups():
+    graph = RoleGraph(ROWS)
+    assert graph.members("leitores", transitive=False) == ["alunos", "monitores"]
+    assert graph.members("leitores") == ["alunos", "ana", "bruno", "monitores"]
+    assert graph.groups_of("ana") == ["alunos", "leitores"]
+    assert graph.is_member("bruno", "leitores")
+    assert not graph.is_member("bruno", "leitores", transitive=False)
+    assert graph.group_sizes() == {"alunos": 2, "leitores": 4, "monitores": 1}
+    assert graph.users() == ["ana", "bruno"]
+    assert graph.role("bruno").valid_until == "2026-12-31"
+
+
+def test_membership_cycles_terminate():
+    graph = RoleGraph([("a", False, None, ["b"]), ("b", False, None, ["a"])])
+    assert graph.groups_of("a") == ["b"]
+    assert graph.members("a") == ["b"]
+
+
+def test_role_manager_caches_graph_until_mutation():
+    conn = MagicMock()
+    dao = DBManager(conn)
+    dao.load_role_graph = MagicMock(side_effect=lambda: RoleGraph(ROWS))
+    dao.add_user_to_group = MagicMock()
+    manager = RoleManager(dao)
+
+    first = manager.role_graph()
+    assert manager.role_graph() is first
+    manager.add_user_to_group("ana", "monitores")
+    assert manager.role_graph() is not first
+    assert dao.load_role_graph.call_count == 2
@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import MagicMock
 
+from psycopg2 import sql
+
 from geoifsc.db_manager import DBManager
 from geoifsc.role_manager import RoleManager
 
@@ -8,6 +10,7 @@ from geoifsc.role_manager import RoleManager
 def make_conn():
     conn = MagicMock()
     cur = MagicMock()
+    cur.connection = conn
     conn.cursor.return_value.__enter__.return_value = cur
     return conn, cur
 
@@ -36,3 +39,192 @@ def test_create_user_rollback_on_error():
 
     conn.rollback.assert_called_once()
     conn.commit.assert_not_called()
+
+
+def test_create_users_bulk_isolates_failed_rows():
+    from geoifsc.models import NewUser
+
+    conn, cur = make_conn()
+    dao = DBManager(conn)
+    dao.insert_user = MagicMock(side_effect=[None, Exception("role exists"), None])
+    dao.add_user_to_group = MagicMock()
+    manager = RoleManager(dao)
+
+    results = manager.create_users_bulk([
+        NewUser("a", "pw", groups=["alunos"]),
+        NewUser("b", "pw"),
+        NewUser("c", "pw"),
+    ])
+
+    assert [(r.username, r.created) for r in results] == [("a", True), ("b", False), ("c", True)]
+    assert results[1].error == "role exists"
+    dao.add_user_to_group.assert_called_once_with("a", "alunos")
+    statements = [str(c.args[0]) for c in cur.execute.call_args_list]
+    assert sum("ROLLBACK TO SAVEPOINT" in s for s in statements) == 1
+    conn.commit.assert_called_once()
+    conn.rollback.assert_not_called()
+
+
+def identifiers(composable):
+    if isinstance(composable, sql.Identifier):
+        return list(composable.strings)
+    if isinstance(composable, sql.Composed):
+        return [name for part in composable.seq for name in identifiers(part)]
+    return []
+
+
+def test_add_users_to_groups_batches_identifiers():
+    conn, cur = make_conn()
+    dao = DBManager(conn)
+
+    statements = dao.add_users_to_groups(["u1", "u2", "u3", "u2"], ["g1", "g2"], chunk_size=2)
+
+    assert statements == 2
+    executed = [identifiers(c.args[0]) for c in cur.execute.call_args_list]
+    assert executed == [["g1", "g2", "u1", "u2"], ["g1", "g2", "u3"]]
+
+
+def test_role_manager_batch_membership_commits_once():
+    conn, cur = make_conn()
+    dao = DBManager(conn)
+    dao.remove_users_from_groups = MagicMock(return_value=1)
+    manager = RoleManager(dao)
+
+    manager.remove_users_from_groups(["u1", "u2"], ["g1"])
+
+    dao.remove_users_from_groups.assert_called_once_with(["u1", "u2"], ["g1"])
+    conn.commit.assert_called_once()
+
+
+def test_transaction_defers_commit_until_block_ends():
+    conn, cur = make_conn()
+    dao = DBManager(conn)
+    dao.insert_user = MagicMock()
+    dao.update_user = MagicMock()
+    dao.add_users_to_groups = MagicMock()
+    manager = RoleManager(dao)
+
+    with manager.transaction():
+        manager.create_user("ana", "pw")
+        manager.update_user("ana", valid_until="2026-12-31")
+        with manager.transaction():
+            manager.add_users_to_groups(["ana"], ["g1", "g2", "g3"])
+        conn.commit.assert_not_called()
+
+    conn.commit.assert_called_once()
+    conn.rollback.assert_not_called()
+
+
+def test_transaction_rolls_back_when_an_operation_fails():
+    conn, cur = make_conn()
+    dao = DBManager(conn)
+    dao.insert_user = MagicMock()
+    dao.add_user_to_group = MagicMock(side_effect=Exception("no such group"))
+    manager = RoleManager(dao)
+
+    with pytest.raises(Exception):
+        with manager.transaction():
+            manager.create_user("ana", "pw")
+            manager.add_user_to_group("ana", "missing")
+
+    conn.commit.assert_not_called()
+    conn.rollback.assert_called_once()
+
+    # Fora do bloco o comportamento por método continua o mesmo
+    manager.create_user("bruno", "pw")
+    conn.commit.assert_called_once()
+
+
+def test_iter_users_uses_named_cursor_with_itersize():
+    conn, cur = make_conn()
+    cur.__iter__.return_value = iter([("ana", None, True), ("g", None, False)])
+    dao = DBManager(conn)
+
+    users = list(dao.iter_users(itersize=50))
+
+    assert [u.username for u in users] == ["ana", "g"]
+    assert users[1].can_login is False
+    assert conn.cursor.call_args.kwargs["name"].startswith("geoifsc_users_")
+    assert cur.itersize == 50
+
+
+def test_list_users_page_and_find_users():
+    conn, cur = make_conn()
+    cur.fetchall.return_value = [("bruno", "2026-12-31", True)]
+    dao = DBManager(conn)
+
+    page = dao.list_users_page(after="ana", limit=10)
+    query, params = cur.execute.call_args.args
+    assert "rolname > %s" in query and "'pg_%%'" in query
+    assert params == ("ana", 10)
+    assert page[0].valid_until == "2026-12-31"
+
+    found = dao.find_users(["bruno", "bruno", "zzz"])
+    query, params = cur.execute.call_args.args
+    assert "= ANY(%s)" in query
+    assert params == (["bruno", "zzz"],)
+    assert list(found) == ["bruno"]
+    assert dao.find_users([]) == {}
+
+
+def test_hot_queries_are_prepared_once_per_session():
+    conn, cur = make_conn()
+    conn.get_backend_pid.return_value = 100
+    cur.fetchone.return_value = ("ana", None, True)
+    dao = DBManager(conn, prepared_statements=True)
+
+    dao.find_user_by_name("ana")
+    dao.find_user_by_name("bruno")
+    statements = [c.args for c in cur.execute.call_args_list]
+    assert len(statements) == 3  # PREPARE + 2 EXECUTE
+    assert "PREPARE" in repr(statements[0][0]) and "$1" in repr(statements[0][0])
+    assert statements[2][1] == ("bruno",)
+    assert dao.statements.stats()["hits"] == 1
+
+    conn.get_backend_pid.return_value = 200  # reconexão
+    dao.find_user_by_name("ana")
+    assert dao.statements.misses == 2
+    assert "PREPARE" in repr(cur.execute.call_args_list[3].args[0])
+
+
+def test_statements_are_prepared_again_after_connection_swap():
+    old_conn, _ = make_conn()
+    old_conn.get_backend_pid.return_value = 100
+    dao = DBManager(old_conn, prepared_statements=True)
+    dao.find_user_by_name("ana")
+
+    # Reconexão: a conexão antiga é fechada e não responde mais
+    old_conn.get_backend_pid.side_effect = RuntimeError("connection already closed")
+    new_conn, new_cur = make_conn()
+    new_conn.get_backend_pid.return_value = 100  # mesmo pid em outro servidor
+    new_cur.fetchone.return_value = None
+    dao.conn = new_conn
+    dao.find_user_by_name("ana")
+
+    executed = [repr(c.args[0]) for c in new_cur.execute.call_args_list]
+    assert "PREPARE" in executed[0] and "EXECUTE" in executed[1]
+    assert dao.statements.misses == 2
+
+
+def test_statement_cache_evicts_least_recently_used():
+    from geoifsc.prepared_statements import PreparedStatementCache, to_positional
+
+    assert to_positional("a = %s AND b LIKE 'x%%' AND c = %s") == ("a = $1 AND b LIKE 'x%' AND c = $2", 2)
+    conn, cur = make_conn()
+    cache = PreparedStatementCache(max_size=2)
+    for key in ("q1", "q2", "q1", "q3"):
+        cache.execute(cur, key, "SELECT 1")
+    assert cache.stats() == {"hits": 1, "misses": 3, "evictions": 1, "size": 2}
+    assert any("DEALLOCATE" in repr(c.args[0]) for c in cur.execute.call_args_list)
+
+
+def test_grant_select_on_tables_uses_one_statement_per_chunk():
+    conn, cur = make_conn()
+    dao = DBManager(conn)
+
+    statements = dao.grant_select_on_tables("rasters", ["t1", "t2", "t3"], ["analistas", "sig"])
+
+    assert statements == 2
+    executed = [identifiers(c.args[0]) for c in cur.execute.call_args_list]
+    assert executed[0] == ["rasters", "analistas", "sig"]
+    assert executed[1] == ["rasters", "t1", "rasters", "t2", "rasters", "t3", "analistas", "sig"]
@@ -0,0 +1,81 @@
+import datetime
+from unittest.mock import MagicMock
+
+from geoifsc.db_manager import DBManager
+from geoifsc.role_graph import RoleGraph
+from geoifsc.role_manager import RoleManager
+from geoifsc.role_sync import DesiredRoleState, plan_role_sync
+
+LIVE = [
+    ("ana", True, datetime.datetime(2026, 12, 31, tzinfo=datetime.timezone.utc), ["alunos"]),
+    ("bruno", False, None, ["alunos"]),
+    ("alunos", False, None, []),
+    ("externo", True, None, []),
+]
+
+
+def desired_state():
+    return DesiredRoleState(
+        users={"ana": "2026-12-31", "bruno": None, "carla": "2027-06-30"},
+        groups={"alunos", "monitores"},
+        memberships={"ana": {"alunos"}, "carla": {"alunos", "monitores"}},
+    )
+
+
+def test_plan_contains_only_needed_changes():
+    plan = plan_role_sync(desired_state(), RoleGraph(LIVE))
+    assert [c.describe() for c in plan] == [
+        "CREATE ROLE monitores NOLOGIN",
+        "CREATE ROLE carla LOGIN",
+        "ALTER ROLE bruno LOGIN",
+        "ALTER ROLE carla VALID UNTIL '2027-06-30'",
+        "GRANT alunos TO carla",
+        "GRANT monitores TO carla",
+        "REVOKE alunos FROM bruno",
+    ]
+
+
+def test_sync_dry_run_and_apply():
+    conn = MagicMock()
+    dao = DBManager(conn)
+    dao.load_role_graph = MagicMock(side_effect=lambda: RoleGraph(LIVE))
+    for name in ("create_group", "insert_user", "update_user",
+                 "add_users_to_groups", "remove_users_from_groups"):
+        setattr(dao, name, MagicMock())
+    manager = RoleManager(dao)
+
+    plan = manager.sync_roles(desired_state(), dry_run=True)
+    assert len(plan) == 7
+    dao.insert_user.assert_not_called()
+    conn.commit.assert_not_called()
+
+    manager.sync_roles(desired_state())
+    dao.insert_user.assert_called_once_with("carla", None)
+    dao.remove_users_from_groups.assert_called_once_with(["bruno"], ["alunos"])
+    dao.add_users_to_groups.assert_any_call(["carla"], ["monitores"])
+    conn.commit.assert_called_once()
+
+
+def test_repeated_sync_settles():
+    # 'infinity' volta do psycopg2 como datetime.max (com ou sem fuso)
+    infinity = {"ana": datetime.datetime.max,
+                "bruno": datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)}
+    rows = {"ana": [True, None, []], "bruno": [True, "2026-01-01", []]}
+
+    def update_user(name, can_login=None, valid_until=None):
+        if can_login is not None:
+            rows[name][0] = can_login
+        if valid_until is not None:
+            rows[name][1] = infinity[name] if valid_until == "infinity" else valid_until
+
+    dao = DBManager(MagicMock())
+    dao.load_role_graph = lambda: RoleGraph((name, *row) for name, row in rows.items())
+    dao.update_user = MagicMock(side_effect=update_user)
+    manager = RoleManager(dao)
+    desired = DesiredRoleState(users={"ana": None, "bruno": None})
+
+    assert [c.describe() for c in manager.sync_roles(desired)] == [
+        "ALTER ROLE bruno VALID UNTIL 'infinity'",
+    ]
+    rows["ana"][1] = infinity["ana"]
+    assert manager.sync_roles(desired) == []
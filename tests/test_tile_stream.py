@@ -0,0 +1,37 @@
+import pytest
+
+from geoifsc.tile_stream import TileCopyStream, UploadCancelled
+
+
+class Tile:
+    def __init__(self, data):
+        self.data = data
+
+
+def test_stream_yields_one_hex_line_per_tile_in_small_reads():
+    stream = TileCopyStream([b"\x01\x02", Tile(b"\xff")])
+    chunks = []
+    while True:
+        chunk = stream.read(3)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    assert b"".join(chunks) == b"0102\nff\n"
+    assert (stream.tiles, stream.bytes) == (2, 3)
+
+
+def test_stream_consumes_tiles_lazily_and_honours_cancel():
+    consumed = []
+
+    def tiles():
+        for i in range(100):
+            consumed.append(i)
+            yield bytes([i])
+
+    cancel = {"flag": False}
+    stream = TileCopyStream(tiles(), cancel_check=lambda: cancel["flag"])
+    stream.read(6)
+    assert len(consumed) == 2
+    cancel["flag"] = True
+    with pytest.raises(UploadCancelled):
+        stream.read(-1)
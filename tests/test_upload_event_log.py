@@ -0,0 +1,30 @@
+import json
+
+from geoifsc.upload_event_log import FileUploadRecord, UploadEventLog
+
+
+def test_events_written_as_json_lines(tmp_path):
+    log = UploadEventLog(log_dir=str(tmp_path))
+    log.start()
+    record = FileUploadRecord(file="a.tif", table="a", bytes=10, tiles=2)
+    with record.phase("encode"):
+        pass
+    record.exit_codes["raster2pgsql"] = 0
+    record.status = "success"
+    log.event("batch_started", files=1)
+    log.file_completed(record)
+    log.stop()
+
+    lines = (tmp_path / "uploads.jsonl").read_text(encoding="utf-8").splitlines()
+    events = [json.loads(line) for line in lines]
+    assert [e["event"] for e in events] == ["batch_started", "file_completed"]
+    assert events[1]["tiles"] == 2
+    assert events[1]["exit_codes"] == {"raster2pgsql": 0}
+    assert "encode" in events[1]["phases"]
+
+
+def test_events_ignored_when_inactive(tmp_path):
+    log = UploadEventLog(log_dir=str(tmp_path))
+    log.event("ignored")
+    assert not log.active
+    assert not (tmp_path / "uploads.jsonl").exists()
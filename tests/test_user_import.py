@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from geoifsc.user_import import load_users
+
+
+def test_load_users_from_csv_and_json(tmp_path):
+    csv_path = tmp_path / "alunos.csv"
+    csv_path.write_text(
+        "username,password,valid_until,groups\n"
+        "ana,s1,2026-12-31,alunos; sig\n"
+        "bruno,s2,,\n",
+        encoding="utf-8",
+    )
+    users = load_users(str(csv_path))
+    assert [u.username for u in users] == ["ana", "bruno"]
+    assert users[0].groups == ["alunos", "sig"]
+    assert users[1].valid_until is None
+
+    json_path = tmp_path / "alunos.json"
+    json_path.write_text(json.dumps([{"username": "ana", "password": "s1",
+                                      "groups": ["alunos"]}]), encoding="utf-8")
+    assert load_users(str(json_path))[0].groups == ["alunos"]
+
+
+def test_load_users_requires_password(tmp_path):
+    path = tmp_path / "u.csv"
+    path.write_text("username,password\nana,\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_users(str(path))